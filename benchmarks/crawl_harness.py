@@ -0,0 +1,261 @@
+"""
+End-to-end crawl throughput against the local replay server.
+
+Starts benchmarks.replay_server on a free port (or uses one started
+separately with --server), routes http_client through it with the response
+cache switched off so every page is really requested, then runs the
+biography crawl of cardinal_scraper or the enrichment of enhance_cardinals
+and reports wall time, requests per second, the latency percentiles seen
+by the client and the time requests waited on http_client's rate controller.
+
+Run from the repository root:
+
+    python -m benchmarks.crawl_harness scrape --concurrency 16 --latency-ms 100 --jitter-ms 50
+    python -m benchmarks.crawl_harness enhance --workers 8 --error-rate 0.05 --limit 40
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+import http_client
+import metrics
+import cardinal_scraper
+import enhance_cardinals
+from checkpoint_journal import CheckpointJournal
+from benchmarks.parsers import silence_script_loggers
+from benchmarks.replay_server import start_server, add_fault_arguments, faults_from_args, ReplayStore
+
+class RequestRecorder:
+    """
+    Wraps http_client.get and http_client.stream_text to time every request
+    the crawl makes. The time rate_controller held a request back is
+    recorded apart from its latency, and a streamed body is timed only while
+    it is being read, not while the caller works on the pieces.
+    """
+
+    def __init__(self):
+        self.samples = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.originals = {}
+
+    def _begin(self):
+        self.local.paced = 0.0
+        return time.perf_counter()
+
+    def _record(self, url, outcome, elapsed):
+        paced = getattr(self.local, 'paced', 0.0)
+        with self.lock:
+            self.samples.append((urlsplit(url).netloc, outcome, elapsed - paced, paced))
+
+    def install(self):
+        self.originals = {
+            'get': http_client.get,
+            'stream_text': http_client.stream_text,
+            'acquire': http_client.rate_controller.acquire
+        }
+        original_get = self.originals['get']
+        original_stream_text = self.originals['stream_text']
+        original_acquire = self.originals['acquire']
+
+        def timed_acquire(host, source=None):
+            started = time.perf_counter()
+            try:
+                return original_acquire(host, source)
+            finally:
+                self.local.paced = getattr(self.local, 'paced', 0.0) + time.perf_counter() - started
+
+        def timed_get(url, *args, **kwargs):
+            started = self._begin()
+            outcome = 'error'
+            try:
+                response = original_get(url, *args, **kwargs)
+                outcome = str(response.status_code)
+                return response
+            except requests.exceptions.Timeout:
+                outcome = 'timeout'
+                raise
+            finally:
+                self._record(url, outcome, time.perf_counter() - started)
+
+        def timed_stream_text(url, *args, **kwargs):
+            chunks = original_stream_text(url, *args, **kwargs)
+            self.local.paced = 0.0
+            elapsed = 0.0
+            outcome = 'error'
+            try:
+                while True:
+                    started = time.perf_counter()
+                    try:
+                        chunk = next(chunks)
+                    except StopIteration:
+                        outcome = '200'
+                        return
+                    finally:
+                        elapsed += time.perf_counter() - started
+                    yield chunk
+            except requests.exceptions.Timeout:
+                outcome = 'timeout'
+                raise
+            except requests.exceptions.HTTPError as e:
+                outcome = str(e.response.status_code)
+                raise
+            finally:
+                chunks.close()
+                self._record(url, outcome, elapsed)
+
+        http_client.get = timed_get
+        http_client.stream_text = timed_stream_text
+        http_client.rate_controller.acquire = timed_acquire
+
+    def uninstall(self):
+        if self.originals:
+            http_client.get = self.originals['get']
+            http_client.stream_text = self.originals['stream_text']
+            # acquire was shadowed on the instance; dropping that restores the method
+            del http_client.rate_controller.acquire
+            self.originals = {}
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(fraction * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def summarize(samples, wall_time):
+    """
+    Returns:
+        dict: Request count, requests per second, latency percentiles (ms),
+            seconds spent waiting on rate_controller, outcome counts, and the
+            same figures per host
+    """
+    def stats(subset):
+        latencies = sorted(elapsed for _, _, elapsed, _ in subset)
+        outcomes = {}
+        for _, outcome, _, _ in subset:
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        return {
+            'requests': len(subset),
+            'requests_per_second': len(subset) / wall_time if wall_time else 0.0,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+            'paced_seconds': sum(paced for _, _, _, paced in subset),
+            'outcomes': outcomes
+        }
+
+    report = {'wall_time': wall_time}
+    report.update(stats(samples))
+    hosts = sorted({host for host, _, _, _ in samples})
+    report['hosts'] = {host: stats([sample for sample in samples if sample[0] == host]) for host in hosts}
+    return report
+
+def run_scrape(args):
+    """Fetch the listing and every biography the way cardinal_scraper does"""
+    cardinals = cardinal_scraper.extract_cardinals()
+    if args.limit:
+        cardinals = cardinals[:args.limit]
+    journal = CheckpointJournal(os.path.join(tempfile.mkdtemp(prefix='vibepope-crawl-'), 'journal.jsonl'))
+    try:
+        if args.serial:
+            cardinal_scraper.fetch_biographies_serial(cardinals, journal)
+        else:
+            cardinal_scraper.fetch_biographies_async(
+                cardinals, journal, concurrency=args.concurrency, per_host=args.per_host,
+                host_delay=args.host_delay, parse_workers=args.parse_workers)
+    finally:
+        journal.remove()
+    return sum(1 for cardinal in cardinals if cardinal.get('biography_text'))
+
+def run_enhance(args):
+    """Enrich the archived dataset the way enhance_cardinals does"""
+    cardinals = enhance_cardinals.load_cardinals_data(args.input)
+    if args.limit:
+        cardinals = cardinals[:args.limit]
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        enhanced = list(pool.map(enhance_cardinals.enhance_cardinal_data, cardinals))
+    return len(enhanced)
+
+def print_report(report, items, unit):
+    print(f"{items} {unit} in {report['wall_time']:.2f}s")
+    print(f"{'host':24} {'requests':>8} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} {'paced':>8}  outcomes")
+    rows = list(report['hosts'].items()) + [('all', report)]
+    for host, stats in rows:
+        outcomes = ', '.join(f"{outcome}: {count}" for outcome, count in sorted(stats['outcomes'].items()))
+        print(f"{host:24} {stats['requests']:>8} {stats['requests_per_second']:>8.1f} "
+              f"{stats['p50_ms']:>7.1f}ms {stats['p95_ms']:>7.1f}ms {stats['p99_ms']:>7.1f}ms {stats['max_ms']:>7.1f}ms {stats['paced_seconds']:>7.2f}s  {outcomes}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure crawl throughput against a local replay server")
+    parser.add_argument('workload', choices=['scrape', 'enhance'], help="Which crawl to run")
+    parser.add_argument('--limit', type=int, help="Only crawl the first N cardinals")
+    parser.add_argument('--client-timeout', type=float, help="Override http_client.DEFAULT_TIMEOUT in seconds")
+    parser.add_argument('--json', dest='json_output', help="Also write the report to this JSON file")
+    parser.add_argument('--server', help="URL of a replay server running in another process; by default one is "
+                                         "started in-process, where it shares the GIL with the crawl")
+    scrape = parser.add_argument_group('scrape options')
+    scrape.add_argument('--serial', action='store_true', help="Use the serial fetch loop instead of the async one")
+    scrape.add_argument('--concurrency', type=int, default=8, help="Requests in flight overall (default: 8)")
+    scrape.add_argument('--per-host', type=int, default=4, help="Requests in flight per host (default: 4)")
+    scrape.add_argument('--host-delay', type=float, default=0.0, help="Seconds between requests to one host (default: 0)")
+    scrape.add_argument('--parse-workers', type=int, default=0, help="Parse in this many processes (default: 0)")
+    enhance = parser.add_argument_group('enhance options')
+    enhance.add_argument('--input', default='data/backup/cardinals.json',
+                         help="Cardinals to enrich (default: data/backup/cardinals.json)")
+    enhance.add_argument('--workers', type=int, default=4, help="Cardinals enriched at once (default: 4)")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    silence_script_loggers()
+    if args.client_timeout:
+        http_client.DEFAULT_TIMEOUT = args.client_timeout
+    server = None
+    if args.server:
+        http_client.set_replay_server(args.server)
+    else:
+        server = start_server(faults_from_args(args), ReplayStore(recordings_file=args.recordings))
+        http_client.set_replay_server(server.url)
+    http_client.set_cache_enabled(False)
+    enhance_cardinals.search_cache.enabled = False
+    recorder = RequestRecorder()
+    recorder.install()
+
+    try:
+        started = time.perf_counter()
+        if args.workload == 'scrape':
+            items, unit = run_scrape(args), 'biographies'
+        else:
+            items, unit = run_enhance(args), 'cardinals'
+        wall_time = time.perf_counter() - started
+    finally:
+        recorder.uninstall()
+        http_client.set_replay_server(None)
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    report = summarize(recorder.samples, wall_time)
+    report['workload'] = args.workload
+    report['items'] = items
+    if server is not None:
+        report['server_outcomes'] = server.counts
+    report['metrics'] = metrics.registry.report()
+    print_report(report, items, unit)
+
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+Check that the fast HTML parser backend extracts exactly what BeautifulSoup does.
+
+Runs every extractor over the archived pages with each html_parser backend
+and compares the results field by field: the Vatican listing and biography
+pages in data/raw (the listing also through the incremental parser
+the scraper streams it with), any Wikipedia articles in the response cache, and saved
+Google or Google News result pages given with --pages. Reports the parse
+time of each backend and fails when any page differs.
+
+Run from the repository root:
+
+    python -m benchmarks.parser_equivalence
+    python -m benchmarks.parser_equivalence --pages google:saved/google_*.html
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from urllib.parse import urlsplit
+
+import html_parser
+from response_cache import INDEX_FILE
+import cardinal_scraper
+import getdata
+import enhance_cardinals
+from benchmarks.parsers import silence_script_loggers, LISTING_FILE
+
+REFERENCE_BACKEND = 'bs4'
+
+# Piece size the streamed listing is fed in; small, so rows straddle pieces
+STREAM_CHUNK_SIZE = 512
+
+def parse_listing_stream(html, chunk_size=STREAM_CHUNK_SIZE):
+    """Cardinals of the listing page as stream_cardinals' incremental parser extracts them"""
+    parser = cardinal_scraper.ListingRowParser()
+    for start in range(0, len(html), chunk_size):
+        parser.feed(html[start:start + chunk_size])
+    parser.close()
+    return list(parser.cardinals)
+
+# Extractor run on each kind of page: (html, url) -> extracted data
+EXTRACTORS = {
+    'listing': lambda html, url: cardinal_scraper.parse_listing_html(html),
+    'listing_stream': lambda html, url: parse_listing_stream(html),
+    'biography': lambda html, url: cardinal_scraper.parse_biography_html(html),
+    'cardinal_info': lambda html, url: getdata.parse_cardinal_info(html),
+    'wikipedia': enhance_cardinals.parse_wikipedia_article,
+    'google': enhance_cardinals.parse_google_results,
+    'news': enhance_cardinals.parse_news_results,
+}
+
+# The incremental listing parser doesn't depend on the backend: it is checked
+# against the whole-page parse with the reference backend instead
+REFERENCE_EXTRACTORS = dict(EXTRACTORS, listing_stream=EXTRACTORS['listing'])
+
+def archived_pages(index_file=INDEX_FILE):
+    """
+    Returns:
+        list: (kind, path, url) for the data/raw pages and the cached Wikipedia articles
+    """
+    pages = []
+    if os.path.exists(LISTING_FILE):
+        pages.append(('listing', LISTING_FILE, None))
+        pages.append(('listing_stream', LISTING_FILE, None))
+    for path in sorted(glob.glob('data/raw/bio_*.html')) + ['data/raw/sample_bio.html']:
+        if os.path.exists(path):
+            pages.append(('biography', path, None))
+            pages.append(('cardinal_info', path, None))
+    if os.path.exists(index_file):
+        with open(index_file, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        for url, entry in sorted(index.items()):
+            parts = urlsplit(url)
+            if parts.netloc == 'en.wikipedia.org' and parts.path.startswith('/wiki/') and os.path.exists(entry['path']):
+                pages.append(('wikipedia', entry['path'], url))
+    return pages
+
+def extra_pages(specs):
+    """(kind, path, url) for each KIND:GLOB given with --pages"""
+    pages = []
+    for spec in specs:
+        kind, _, pattern = spec.partition(':')
+        if kind not in EXTRACTORS or not pattern:
+            raise ValueError(f"Invalid --pages {spec!r}: expected KIND:GLOB with KIND one of {', '.join(EXTRACTORS)}")
+        pages.extend((kind, path, None) for path in sorted(glob.glob(pattern)))
+    return pages
+
+def extract_all(pages, documents, backend):
+    """
+    Run every page's extractor with one backend
+
+    Returns:
+        tuple: (results in page order, seconds per kind)
+    """
+    html_parser.set_backend(backend)
+    extractors = REFERENCE_EXTRACTORS if backend == REFERENCE_BACKEND else EXTRACTORS
+    results = []
+    seconds = {}
+    for (kind, path, url), html in zip(pages, documents):
+        started = time.perf_counter()
+        results.append(extractors[kind](html, url or path))
+        seconds[kind] = seconds.get(kind, 0.0) + time.perf_counter() - started
+    return results, seconds
+
+def first_difference(expected, actual, where=''):
+    """Path and both values of the first place two extraction results differ, or None"""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        for key in list(expected) + [key for key in actual if key not in expected]:
+            difference = first_difference(expected.get(key), actual.get(key), f"{where}.{key}")
+            if difference:
+                return difference
+        return None
+    if isinstance(expected, list) and isinstance(actual, list):
+        for i, (left, right) in enumerate(zip(expected, actual)):
+            difference = first_difference(left, right, f"{where}[{i}]")
+            if difference:
+                return difference
+        if len(expected) != len(actual):
+            return f"{where} has {len(actual)} items instead of {len(expected)}", None, None
+        return None
+    if expected != actual:
+        return where or '(result)', expected, actual
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the HTML parser backends on the archived pages")
+    parser.add_argument('--backend', default=None,
+                        help="Backend checked against bs4 (default: the fastest one installed)")
+    parser.add_argument('--pages', action='append', default=[], metavar='KIND:GLOB',
+                        help=f"Also check these saved pages; KIND is one of {', '.join(EXTRACTORS)} (repeatable)")
+    parser.add_argument('--show', type=int, default=5, help="Differences printed per kind (default: 5)")
+    args = parser.parse_args()
+
+    backend = html_parser.resolve_backend(args.backend)
+    if backend == REFERENCE_BACKEND:
+        print("Only the bs4 backend is installed; nothing to compare (pip install selectolax)")
+        return 1
+
+    silence_script_loggers()
+    try:
+        pages = archived_pages() + extra_pages(args.pages)
+    except ValueError as e:
+        parser.error(str(e))
+    documents = []
+    for _, path, _ in pages:
+        with open(path, 'r', encoding='utf-8') as f:
+            documents.append(f.read())
+
+    expected, reference_seconds = extract_all(pages, documents, REFERENCE_BACKEND)
+    actual, backend_seconds = extract_all(pages, documents, backend)
+
+    mismatches = {}
+    for (kind, path, url), left, right in zip(pages, expected, actual):
+        difference = first_difference(left, right)
+        if difference:
+            mismatches.setdefault(kind, []).append((url or path, difference))
+
+    print(f"{'kind':14} {'pages':>6} {'differ':>7} {REFERENCE_BACKEND:>10} {backend:>11} {'speedup':>8}")
+    for kind in EXTRACTORS:
+        count = sum(1 for page in pages if page[0] == kind)
+        if not count:
+            continue
+        slow, fast = reference_seconds[kind], backend_seconds[kind]
+        print(f"{kind:14} {count:>6} {len(mismatches.get(kind, [])):>7} {slow * 1000:>8.1f}ms {fast * 1000:>9.1f}ms "
+              f"{slow / fast if fast else float('inf'):>7.1f}x")
+
+    for kind, differences in mismatches.items():
+        print(f"\n{kind}:")
+        for source, (where, left, right) in differences[:args.show]:
+            print(f"  {source} {where}")
+            if left is not None or right is not None:
+                print(f"    {REFERENCE_BACKEND}: {left!r:.200}")
+                print(f"    {backend}: {right!r:.200}")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
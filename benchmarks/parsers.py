@@ -0,0 +1,257 @@
+"""
+Parser benchmarks over the archived Vatican pages in data/raw.
+
+Times the listing and biography parsers, getdata's page extractor, name
+formatting and biography fact extraction without any network access, and
+reports throughput and peak memory for each. Results are compared with the
+stored baselines and the run fails when one of them regresses.
+
+Throughput depends on the machine, so it is compared relative to a fixed
+calibration loop (regex tokenizing and dict counting, like the parsers do)
+timed in between the repeats of each benchmark: the baselines store units
+per calibration run, not units per second, and carry over between
+machines. Peak memory is compared as is.
+
+Run from the repository root:
+
+    python -m benchmarks.parsers                     # compare with baselines
+    python -m benchmarks.parsers --update-baselines  # record new baselines
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import http_client
+import html_parser
+from response_cache import ResponseCache
+import cardinal_scraper
+import getdata
+import enhance_cardinals
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'baselines.json')
+
+LISTING_URL = 'https://press.vatican.va/content/salastampa/en/documentation/card_bio_typed/card_bio_ele.html'
+LISTING_FILE = 'data/raw/vatican_cardinals.html'
+BIO_URL_PREFIX = 'https://press.vatican.va/content/salastampa/en/documentation/cardinali_biografie/'
+
+# Input of the calibration loop; fixed, so it does the same work on every machine
+CALIBRATION_TEXT = ' '.join(f"<td class=\"c{i % 7}\">Word{i % 97} {i}</td>" for i in range(2000))
+
+def prepare_offline_corpus():
+    """
+    Point the HTTP client at a throwaway cache index that serves the data/raw
+    archive, so every parser reads its pages from disk
+
+    Returns:
+        list: Biography URLs backed by an archived page
+    """
+    index_file = os.path.join(tempfile.mkdtemp(prefix='vibepope-bench-'), 'index.json')
+    http_client.page_cache = ResponseCache(index_file=index_file)
+    http_client.set_offline()
+
+    http_client.page_cache.lookup(LISTING_URL, LISTING_FILE)
+    bio_urls = []
+    for path in sorted(glob.glob('data/raw/bio_*.html')):
+        url = BIO_URL_PREFIX + os.path.basename(path)[len('bio_'):]
+        http_client.page_cache.lookup(url, path)
+        bio_urls.append(url)
+    sample_url = BIO_URL_PREFIX + 'sample_bio.html'
+    http_client.page_cache.lookup(sample_url, 'data/raw/sample_bio.html')
+    bio_urls.append(sample_url)
+    return bio_urls
+
+def silence_script_loggers():
+    """The scripts log through a module global set up in main(); keep it quiet here"""
+    quiet = logging.getLogger('benchmarks.quiet')
+    quiet.setLevel(logging.CRITICAL)
+    quiet.propagate = False
+    for module in (cardinal_scraper, getdata, enhance_cardinals):
+        module.logger = quiet
+    logging.getLogger('vibepope').setLevel(logging.CRITICAL)
+
+def build_benchmarks(bio_urls):
+    """
+    Returns:
+        list: (name, unit, function) where function runs the workload once and
+            returns how many units it processed
+    """
+    cardinals = cardinal_scraper.extract_cardinals()
+    names = [cardinal['name'] for cardinal in cardinals]
+    texts = []
+    for url in bio_urls:
+        bio_info = cardinal_scraper.extract_cardinal_biography(url)
+        if bio_info.get('biography_text'):
+            texts.append(bio_info['biography_text'])
+
+    def listing():
+        cardinal_scraper.extract_cardinals()
+        return 1
+
+    def biographies():
+        for url in bio_urls:
+            cardinal_scraper.extract_cardinal_biography(url)
+        return len(bio_urls)
+
+    def cardinal_info():
+        for url in bio_urls:
+            getdata.extract_cardinal_info(url)
+        return len(bio_urls)
+
+    # format_cardinal_name is memoized; time the function itself, not cache hits
+    format_cardinal_name = enhance_cardinals.format_cardinal_name.__wrapped__
+
+    def name_formatting():
+        for name in names:
+            format_cardinal_name(name)
+        return len(names)
+
+    def biography_facts():
+        for text in texts:
+            enhance_cardinals.extract_info_from_biography(text)
+        return len(texts)
+
+    return [
+        ('extract_cardinals', 'pages', listing),
+        ('extract_cardinal_biography', 'pages', biographies),
+        ('getdata.extract_cardinal_info', 'pages', cardinal_info),
+        ('format_cardinal_name', 'records', name_formatting),
+        ('extract_info_from_biography', 'records', biography_facts),
+    ]
+
+def calibration_loop():
+    """One run of the reference workload the throughputs are expressed in"""
+    counts = {}
+    for token in re.findall(r'\w+', CALIBRATION_TEXT):
+        counts[token.lower()] = counts.get(token.lower(), 0) + 1
+    return sorted(counts.items())
+
+def run_benchmark(function, repeats, min_time):
+    """
+    Time a workload, repeating it until min_time has passed, then measure its
+    peak traced memory in a separate run. Every repeat is followed by a
+    calibration loop, so both see the machine in the same state.
+
+    Returns:
+        dict: throughput (units/s, best repeat), relative_throughput (units
+            per calibration loop, best repeats of both), seconds per run and
+            peak_kb
+    """
+    function()  # warm up caches and lazy imports
+    calibration_loop()
+    best = None
+    calibration = None
+    units = 0
+    started = time.perf_counter()
+    runs = 0
+    while runs < repeats or time.perf_counter() - started < min_time:
+        t0 = time.perf_counter()
+        units = function()
+        t1 = time.perf_counter()
+        calibration_loop()
+        t2 = time.perf_counter()
+        best = t1 - t0 if best is None else min(best, t1 - t0)
+        calibration = t2 - t1 if calibration is None else min(calibration, t2 - t1)
+        runs += 1
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'units': units,
+        'seconds': best,
+        'throughput': units / best if best else float('inf'),
+        'relative_throughput': units * calibration / best if best else float('inf'),
+        'calibration_seconds': calibration,
+        'peak_kb': peak / 1024
+    }
+
+def load_baselines(path=BASELINE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_baselines(results, path=BASELINE_FILE):
+    """Store results as baselines, keeping the baselines of benchmarks that weren't run"""
+    baselines = load_baselines(path)
+    for name, result in results.items():
+        baselines[name] = {'relative_throughput': round(result['relative_throughput'], 4),
+                           'peak_kb': round(result['peak_kb'], 1)}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baselines, f, indent=2)
+        f.write('\n')
+
+def find_regressions(results, baselines, tolerance):
+    """
+    Returns:
+        list: Messages for each benchmark slower or hungrier than its baseline
+            by more than the tolerance (a fraction, e.g. 0.25)
+    """
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if not baseline:
+            continue
+        if result['relative_throughput'] < baseline['relative_throughput'] * (1 - tolerance):
+            regressions.append(f"{name}: {result['relative_throughput']:.3f} units per calibration run, "
+                               f"below baseline {baseline['relative_throughput']:.3f}")
+        if result['peak_kb'] > baseline['peak_kb'] * (1 + tolerance):
+            regressions.append(f"{name}: peak memory {result['peak_kb']:.0f} KiB above baseline {baseline['peak_kb']:.0f} KiB")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the parsers against the archived data/raw pages")
+    parser.add_argument('--repeats', type=int, default=3, help="Minimum timed runs per benchmark (default: 3)")
+    parser.add_argument('--min-time', type=float, default=1.0, help="Minimum seconds spent timing each benchmark (default: 1)")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed slowdown/memory growth against the baselines as a fraction (default: 0.25)")
+    parser.add_argument('--only', action='append', default=[], help="Run only the named benchmark (repeatable)")
+    parser.add_argument('--update-baselines', action='store_true', help="Store this run's results as the new baselines")
+    parser.add_argument('--json', dest='json_output', help="Also write the results to this JSON file")
+    html_parser.add_backend_argument(parser)
+    args = parser.parse_args()
+
+    silence_script_loggers()
+    html_parser.set_backend(args.html_parser)
+    bio_urls = prepare_offline_corpus()
+    benchmarks = build_benchmarks(bio_urls)
+
+    results = {}
+    print(f"{'benchmark':32} {'throughput':>16} {'relative':>10} {'time/run':>10} {'peak mem':>12}")
+    for name, unit, function in benchmarks:
+        if args.only and name not in args.only:
+            continue
+        result = run_benchmark(function, args.repeats, args.min_time)
+        results[name] = result
+        print(f"{name:32} {result['throughput']:>10.1f} {unit}/s {result['relative_throughput']:>10.3f} "
+              f"{result['seconds'] * 1000:>8.1f}ms {result['peak_kb']:>8.0f} KiB")
+    print("\nrelative: units per calibration loop run, the figure compared with the baselines")
+
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baselines:
+        save_baselines(results)
+        print(f"Baselines written to {BASELINE_FILE}")
+        return 0
+
+    regressions = find_regressions(results, load_baselines(), args.tolerance)
+    if regressions:
+        print("\nRegressions against baselines:")
+        for message in regressions:
+            print(f"  {message}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""
+Local HTTP server replaying archived and recorded responses.
+
+Requests arrive through http_client's replay mode: the path and query are the
+ones of the original URL and the X-Replay-Host header names the original
+host. Vatican pages are answered from the data/raw archive, everything else
+from the response cache index or a recordings file; search endpoints without
+a recording get an empty result page. Latency, jitter, 429 responses and
+hung requests can be injected to see how the crawlers behave under load.
+
+Run from the repository root:
+
+    python -m benchmarks.replay_server --port 8765 --latency-ms 80 --error-rate 0.05
+
+and point the scrapers at it with VIBEPOPE_REPLAY_URL=http://127.0.0.1:8765.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from http_client import REPLAY_HOST_HEADER
+from response_cache import INDEX_FILE
+
+logger = logging.getLogger(__name__)
+
+VATICAN_HOST = 'press.vatican.va'
+LISTING_PATH = '/content/salastampa/en/documentation/card_bio_typed/card_bio_ele.html'
+LISTING_FILE = 'data/raw/vatican_cardinals.html'
+BIO_PATH_PREFIX = '/content/salastampa/en/documentation/cardinali_biografie/'
+
+# Bodies served for search endpoints that have no recording, so a crawl
+# behaves like one that simply found nothing
+EMPTY_RESULTS = {
+    ('en.wikipedia.org', '/w/api.php', 'opensearch'): ('application/json', '["", [], [], []]'),
+    ('en.wikipedia.org', '/w/api.php', 'query'): ('application/json', '{"batchcomplete": true, "query": {"pages": []}}'),
+    ('www.google.com', '/search', None): ('text/html; charset=utf-8', '<html><body><div id="search"></div></body></html>'),
+}
+
+class FaultProfile:
+    """
+    Faults injected into every response.
+
+    Each request waits latency +/- jitter seconds; a fraction error_rate of
+    them is answered with 429 and a Retry-After header, and a fraction
+    timeout_rate hangs for hang_seconds before anything is sent.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, timeout_rate=0.0,
+                 hang_seconds=30.0, retry_after=1, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def draw(self):
+        """
+        Returns:
+            tuple: (delay in seconds, fault) where fault is None, '429' or 'timeout'
+        """
+        with self.lock:
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+            roll = self.random.random()
+        if roll < self.timeout_rate:
+            return self.hang_seconds, 'timeout'
+        if roll < self.timeout_rate + self.error_rate:
+            return delay, '429'
+        return delay, None
+
+class ReplayStore:
+    """Finds the recorded response for an original URL"""
+
+    def __init__(self, index_file=INDEX_FILE, recordings_file=None):
+        self.entries = {}
+        if os.path.exists(index_file):
+            with open(index_file, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        # URL -> (status, content type, body)
+        self.recordings = {}
+        if recordings_file:
+            with open(recordings_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.recordings[record['url']] = (
+                            record.get('status', 200), record.get('content_type', 'text/html; charset=utf-8'), record['body'])
+        logger.info(f"Replaying {len(self.entries)} cached responses and {len(self.recordings)} recordings")
+
+    def find(self, host, path_and_query):
+        """
+        Returns:
+            tuple: (status, content type, body as bytes)
+        """
+        url = f"https://{host}{path_and_query}"
+        if url in self.recordings:
+            status, content_type, body = self.recordings[url]
+            return status, content_type, body.encode('utf-8')
+
+        path = urlsplit(url).path
+        archive_file = None
+        if host == VATICAN_HOST and path == LISTING_PATH:
+            archive_file = LISTING_FILE
+        elif host == VATICAN_HOST and path.startswith(BIO_PATH_PREFIX):
+            archive_file = f"data/raw/bio_{path[len(BIO_PATH_PREFIX):]}"
+        elif url in self.entries:
+            archive_file = self.entries[url]['path']
+        if archive_file and os.path.exists(archive_file):
+            content_type = 'text/html; charset=utf-8'
+            if url in self.entries:
+                content_type = self.entries[url].get('headers', {}).get('content_type') or content_type
+            with open(archive_file, 'rb') as f:
+                return 200, content_type, f.read()
+
+        action = parse_qs(urlsplit(url).query).get('action', [None])[0]
+        empty = EMPTY_RESULTS.get((host, path, action))
+        if empty:
+            content_type, body = empty
+            return 200, content_type, body.encode('utf-8')
+        return 404, 'text/plain; charset=utf-8', b'not recorded'
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        host = self.headers.get(REPLAY_HOST_HEADER, VATICAN_HOST)
+        delay, fault = server.faults.draw()
+        time.sleep(delay)
+        server.count(fault or 'ok')
+
+        if fault == 'timeout':
+            # The client gave up long ago; drop the connection without answering
+            self.close_connection = True
+            return
+        if fault == '429':
+            self.send_response(429)
+            self.send_header('Retry-After', str(server.faults.retry_after))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        status, content_type, body = server.store.find(host, self.path)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+    block_on_close = False
+
+    def __init__(self, address, store, faults):
+        super().__init__(address, ReplayHandler)
+        self.store = store
+        self.faults = faults
+        self.counts = {}
+        self.counts_lock = threading.Lock()
+
+    def count(self, outcome):
+        with self.counts_lock:
+            self.counts[outcome] = self.counts.get(outcome, 0) + 1
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+def start_server(faults=None, store=None, host='127.0.0.1', port=0):
+    """
+    Start a replay server on a background thread
+
+    Args:
+        faults (FaultProfile): Faults to inject, none by default
+        store (ReplayStore): Responses to replay, the archive and cache index by default
+        port (int): Port to listen on, 0 picks a free one
+
+    Returns:
+        ReplayServer: The running server; call shutdown() to stop it
+    """
+    server = ReplayServer((host, port), store or ReplayStore(), faults or FaultProfile())
+    thread = threading.Thread(target=server.serve_forever, name='replay-server', daemon=True)
+    thread.start()
+    logger.info(f"Replay server listening on {server.url}")
+    return server
+
+def add_fault_arguments(parser):
+    """Fault injection options shared with the crawl harness"""
+    parser.add_argument('--latency-ms', type=float, default=0, help="Added latency per response in ms (default: 0)")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="Random +/- variation of the latency in ms (default: 0)")
+    parser.add_argument('--error-rate', type=float, default=0, help="Fraction of requests answered with 429 (default: 0)")
+    parser.add_argument('--timeout-rate', type=float, default=0, help="Fraction of requests left hanging (default: 0)")
+    parser.add_argument('--hang-seconds', type=float, default=30, help="How long a hanging request is held (default: 30)")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After sent with 429 responses (default: 1)")
+    parser.add_argument('--seed', type=int, help="Seed for the fault dice, for repeatable runs")
+    parser.add_argument('--recordings', help="JSONL file of extra recorded responses ({url, status, content_type, body})")
+
+def faults_from_args(args):
+    return FaultProfile(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate,
+        hang_seconds=args.hang_seconds,
+        retry_after=args.retry_after,
+        seed=args.seed
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay archived pages and recorded search responses over HTTP")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8765, help="Port to listen on (default: 8765)")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = ReplayServer((args.host, args.port), ReplayStore(recordings_file=args.recordings), faults_from_args(args))
+    print(f"Replaying on {server.url}; set VIBEPOPE_REPLAY_URL={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Responses: {server.counts}")
+
+if __name__ == "__main__":
+    main()
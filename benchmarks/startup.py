@@ -0,0 +1,95 @@
+"""
+Startup-time benchmark of the vibepope subcommands.
+
+Runs `vibepope.py <command> --help` in fresh interpreters, which imports the
+subcommand's module and builds its argument parser but does no work, and
+reports the best and median wall time of each next to a bare interpreter.
+With --imports it also lists the slowest imports of each subcommand
+(python -X importtime).
+
+Run from the repository root:
+
+    python -m benchmarks.startup
+    python vibepope.py bench startup --repeats 20 --imports
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+COMMANDS = ['scrape', 'reparse', 'enrich', 'pipeline', 'photos', 'export', 'index', 'store']
+
+ENTRY_POINT = 'vibepope.py'
+
+def time_command(argv, repeats):
+    """
+    Returns:
+        list: Wall seconds of each run
+    """
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+def imported_modules(argv):
+    """
+    Returns:
+        dict: module -> cumulative import microseconds, for the outermost
+            imports of a run (python -X importtime)
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + argv[1:], stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True, check=True)
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented; their time is already in their parent's
+        if cumulative.strip().isdigit() and not name.startswith('  '):
+            imports[name.strip()] = int(cumulative)
+    return imports
+
+def slowest_imports(argv, count, baseline):
+    """
+    Returns:
+        list: (module, microseconds) of the imports that took longest, leaving
+            out those a bare interpreter does too
+    """
+    imports = [(name, microseconds) for name, microseconds in imported_modules(argv).items() if name not in baseline]
+    return sorted(imports, key=lambda item: -item[1])[:count]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how long each vibepope subcommand takes to start")
+    parser.add_argument('--repeats', type=int, default=10, help="Runs per command (default: 10)")
+    parser.add_argument('--only', action='append', default=[], help="Measure only the named command (repeatable)")
+    parser.add_argument('--imports', action='store_true', help="Also list the slowest imports of each command")
+    parser.add_argument('--json', dest='json_output', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    runs = [('python', [sys.executable, '-c', 'pass'])]
+    runs += [(command, [sys.executable, ENTRY_POINT, command, '--help'])
+             for command in COMMANDS if not args.only or command in args.only]
+
+    baseline = imported_modules(runs[0][1]) if args.imports else {}
+    results = {}
+    print(f"{'command':12} {'best':>9} {'median':>9}")
+    for name, argv in runs:
+        timings = time_command(argv, args.repeats)
+        results[name] = {'best_ms': round(min(timings) * 1000, 2), 'median_ms': round(statistics.median(timings) * 1000, 2)}
+        print(f"{name:12} {results[name]['best_ms']:>7.1f}ms {results[name]['median_ms']:>7.1f}ms")
+        if args.imports and name != 'python':
+            results[name]['slowest_imports'] = slowest_imports(argv, 5, baseline)
+            for module, microseconds in results[name]['slowest_imports']:
+                print(f"{'':14}{module:30} {microseconds / 1000:>7.1f}ms")
+
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
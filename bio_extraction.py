@@ -0,0 +1,209 @@
+import json
+import re
+import argparse
+import bisect
+from collections import namedtuple
+
+# Rules used on the biography_text of the scraped dataset, matched case-insensitively
+# (field, trigger keywords the pattern starts with, pattern, how matches are collected)
+#   first - value of the leftmost match (re.search)
+#   all   - values of all non-overlapping matches (re.findall)
+#   last_paragraph - leftmost match of the last paragraph that has one
+BIOGRAPHY_RULES = [
+    ('birth_place', ['born '], r'born (?:on [^,]+ )?in ([^,.]+)', 'first'),
+    ('ordination_date', ['ordained '], r'ordained (?:a )?priest (?:on|in) ([^,.]+)', 'first'),
+    ('episcopal_consecration_date', ['episcopal consecration ', 'consecrated bishop '],
+     r'(?:episcopal consecration|consecrated bishop) (?:on|in) ([^,.]+)', 'first'),
+    ('cardinal_creation_date', ['created '], r'created (?:and proclaimed )?cardinal (?:by[^,.]*)? (?:on|in) ([^,.]+)', 'first'),
+    ('education', ['doctorate in ', 'licentiate in ', 'degree in '], r'(?:doctorate|licentiate|degree) in ([^,.]+)', 'all'),
+    ('languages', ['speaks ', 'fluent in '], r'(?:speaks|fluent in) ([^,.]+)', 'first'),
+]
+
+# Separator placed between paragraphs for the last_paragraph rules; the
+# negated character classes below exclude it so no match spans two paragraphs
+PARAGRAPH_SEPARATOR = '\x1e'
+
+# Rules used by getdata.extract_cardinal_info on the paragraphs of a Vatican page, matched case-sensitively
+PAGE_RULES = [
+    ('birth_date', ['born on '], r'born on (\d{1,2} [A-Za-z]+ \d{4})', 'last_paragraph'),
+    ('birth_place', ['born in '], r'born in ([^,\.\x1e]+)', 'last_paragraph'),
+    ('ordination_date', ['ordained priest on '], r'ordained priest on (\d{1,2} [A-Za-z]+ \d{4})', 'last_paragraph'),
+    ('cardinal_creation_date', ['created cardinal on '], r'created cardinal on (\d{1,2} [A-Za-z]+ \d{4})', 'last_paragraph'),
+]
+
+# One row of the corpus table built by extract_corpus
+BiographyFacts = namedtuple('BiographyFacts', [
+    'name',
+    'biography_url',
+    'birth_place',
+    'ordination_date',
+    'episcopal_consecration_date',
+    'cardinal_creation_date',
+    'education',
+    'languages'
+])
+
+class FactExtractor:
+    """
+    Extracts facts from a document in a single scan.
+
+    Every rule pattern starts with one of its trigger keywords. The triggers
+    of all rules are compiled into one literal alternation, which the regex
+    engine scans for quickly; a rule's full pattern is only tried at the
+    positions where one of its triggers occurs. Triggers of different rules
+    must not overlap. Case-insensitive rule tables scan the lowercased text
+    with case-sensitive patterns, which is several times faster than
+    re.IGNORECASE, and slice the values out of the original text.
+    """
+
+    def __init__(self, rules, ignore_case=False):
+        self.rules = rules
+        self.ignore_case = ignore_case
+        self.rules_for_trigger = {}
+        for i, (_, triggers, _, _) in enumerate(rules):
+            for trigger in triggers:
+                self.rules_for_trigger.setdefault(trigger, []).append(i)
+        # Longest first so a trigger is never shadowed by one of its prefixes
+        ordered = sorted(self.rules_for_trigger, key=len, reverse=True)
+        alternation = '|'.join(re.escape(trigger) for trigger in ordered)
+        self.trigger_pattern = re.compile(alternation)
+        self.patterns = [re.compile(pattern) for _, _, pattern, _ in rules]
+        if ignore_case:
+            # Used when lowercasing changes the length of the text, so spans can't be mapped back
+            self.folded_trigger_pattern = re.compile(alternation, re.IGNORECASE)
+            self.folded_patterns = [re.compile(pattern, re.IGNORECASE) for _, _, pattern, _ in rules]
+
+    def scan(self, text, paragraph_separator=None):
+        """
+        Run all rules over a document
+
+        Args:
+            text (str): Document to scan
+            paragraph_separator (str): Separator between paragraphs, needed by
+                last_paragraph rules
+
+        Returns:
+            dict: field -> str for first/last_paragraph rules, list for all rules
+        """
+        scan_text = text
+        trigger_pattern = self.trigger_pattern
+        patterns = self.patterns
+        fold_keys = False
+        if self.ignore_case:
+            lowered = text.lower()
+            if len(lowered) == len(text):
+                scan_text = lowered
+            else:
+                trigger_pattern = self.folded_trigger_pattern
+                patterns = self.folded_patterns
+                fold_keys = True
+
+        found = {}
+        ends = {}
+        paragraph_of = {}
+        paragraph_starts = None
+        if paragraph_separator:
+            paragraph_starts = [i for i, char in enumerate(text) if char == paragraph_separator]
+
+        for hit in trigger_pattern.finditer(scan_text):
+            start = hit.start()
+            key = hit.group(0).lower() if fold_keys else hit.group(0)
+            for i in self.rules_for_trigger[key]:
+                field, _, _, mode = self.rules[i]
+                if mode == 'first' and field in found:
+                    continue
+                if mode == 'all' and start < ends.get(field, 0):
+                    # findall semantics: skip matches overlapping the previous one
+                    continue
+                match = patterns[i].match(scan_text, start)
+                if not match:
+                    continue
+                value = text[match.start(1):match.end(1)]
+                if mode == 'first':
+                    found[field] = value
+                elif mode == 'all':
+                    found.setdefault(field, []).append(value)
+                    ends[field] = match.end()
+                elif mode == 'last_paragraph':
+                    paragraph = bisect.bisect_right(paragraph_starts, start) if paragraph_starts is not None else 0
+                    if field not in found or paragraph > paragraph_of[field]:
+                        found[field] = value
+                        paragraph_of[field] = paragraph
+        return found
+
+biography_extractor = FactExtractor(BIOGRAPHY_RULES, ignore_case=True)
+page_extractor = FactExtractor(PAGE_RULES)
+
+def extract_facts(text):
+    """
+    Extract structured information from a biography text
+
+    Returns:
+        dict: birth_place, ordination_date, episcopal_consecration_date,
+            cardinal_creation_date, education (list) and languages (list) when found
+    """
+    found = biography_extractor.scan(text)
+    info = {}
+    for field in ('birth_place', 'ordination_date', 'episcopal_consecration_date', 'cardinal_creation_date'):
+        if field in found:
+            info[field] = found[field].strip()
+    if 'education' in found:
+        info['education'] = [match.strip() for match in found['education']]
+    if 'languages' in found:
+        languages = found['languages'].strip()
+        info['languages'] = [lang.strip() for lang in languages.split('and') if lang.strip()]
+    return info
+
+def extract_page_facts(paragraphs):
+    """
+    Extract birth date/place, ordination and creation dates from the
+    paragraphs of a Vatican biography page; when several paragraphs match a
+    rule, the last one wins
+    """
+    return page_extractor.scan(PARAGRAPH_SEPARATOR.join(paragraphs), PARAGRAPH_SEPARATOR)
+
+def extract_corpus(cardinals):
+    """
+    Extract facts for a whole corpus of cardinal records
+
+    Args:
+        cardinals (list): Cardinal dicts with biography_text
+
+    Returns:
+        list: One BiographyFacts row per cardinal with a biography
+    """
+    table = []
+    for cardinal in cardinals:
+        text = cardinal.get('biography_text')
+        if not text:
+            continue
+        info = extract_facts(text)
+        table.append(BiographyFacts(
+            name=cardinal.get('name'),
+            biography_url=cardinal.get('biography_url'),
+            birth_place=info.get('birth_place'),
+            ordination_date=info.get('ordination_date'),
+            episcopal_consecration_date=info.get('episcopal_consecration_date'),
+            cardinal_creation_date=info.get('cardinal_creation_date'),
+            education=info.get('education', []),
+            languages=info.get('languages', [])
+        ))
+    return table
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract structured facts from every biography in a cardinals dataset")
+    parser.add_argument('input', nargs='?', default='data/backup/cardinals.json',
+                        help="Cardinals JSON file (default: data/backup/cardinals.json)")
+    parser.add_argument('--output', default='data/processed/biography_facts.json',
+                        help="Where to write the facts table (default: data/processed/biography_facts.json)")
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        cardinals = json.load(f)
+    table = extract_corpus(cardinals)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump([row._asdict() for row in table], f, ensure_ascii=False, indent=2)
+    print(f"Extracted facts for {len(table)} biographies to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,43 @@
-import requests
-from bs4 import BeautifulSoup
 import os
 import json
 import time
 import logging
 from datetime import datetime
 import re
+import sys
+import argparse
+from collections import deque
+from html.parser import HTMLParser
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+from urllib.parse import urlparse
+import html_parser
+import metrics
+import log_setup
+from checkpoint_journal import CheckpointJournal
+import change_detection
+from change_detection import ChangeTracker
+import dataset_store
+import search_index
+
+# Journal of finished biographies, used to resume an interrupted crawl
+JOURNAL_FILE = 'data/raw/cardinals_journal.jsonl'
+
+# Per-item messages go to stage loggers so their verbosity can be set separately
+fetch_logger = log_setup.stage_logger('fetch')
+parse_logger = log_setup.stage_logger('parse')
+
+# Replaced by the configured logger in main(); the default lets other scripts import these functions
+logger = logging.getLogger(__name__)
+
+# http_client (and with it requests), rate_control, asyncio and the process
+# pool (multiprocessing) are imported by the functions that use them, so
+# `vibepope reparse` starts without loading the HTTP stack
 
 # Set up logging
-def setup_logging():
+def setup_logging(stage_levels=None, rate_limit=None, sample_every=None):
     """Set up logging configuration"""
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
-    
-    log_file = f'logs/cardinal_scraper_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log'
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler()
-        ]
-    )
-    return logging.getLogger(__name__)
+    return log_setup.setup_logging('cardinal_scraper', __name__, stage_levels, rate_limit, sample_every)
 
 def create_directory_structure():
     """Create the necessary directory structure for storing data"""
@@ -37,222 +52,748 @@ def create_directory_structure():
             os.makedirs(directory)
             logger.info(f"Created directory: {directory}")
 
-def get_page_content(url, retries=3, delay=1):
-    """Get the content of a page with retry mechanism"""
-    for attempt in range(retries):
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-            return response.text
-        except Exception as e:
-            logger.error(f"Error fetching {url} (attempt {attempt + 1}/{retries}): {str(e)}")
-            if attempt < retries - 1:
-                time.sleep(delay)
-            else:
-                return None
-
-def save_html_to_file(html_content, filename):
-    """Save HTML content to a file for inspection"""
+def get_page_content(url, cache_file=None, retries=3, delay=1):
+    """
+    Get the content of a page through the response cache, retrying failures
+    with exponential backoff starting at delay seconds
+    """
+    import http_client
     try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        logger.info(f"Saved HTML content to {filename}")
-        return True
+        return http_client.get_text(url, cache_file=cache_file, retries=retries, backoff=delay)
+    except http_client.OfflineCacheMiss as e:
+        logger.error(f"Offline mode: {str(e)}")
+        return None
     except Exception as e:
-        logger.error(f"Error saving HTML to {filename}: {str(e)}")
-        return False
+        fetch_logger.error(f"Error fetching {url}: {str(e)}")
+        return None
+
+# The listing of all cardinals and the archive file the response cache keeps it in
+LISTING_URL = 'https://press.vatican.va/content/salastampa/en/documentation/card_bio_typed/card_bio_ele.html'
+LISTING_FILE = 'data/raw/vatican_cardinals.html'
+
+def read_archived_listing():
+    """Cardinals of the listing page archived in data/raw, without the HTTP stack (for reparse)"""
+    if not os.path.exists(LISTING_FILE):
+        logger.error(f"No archived listing page ({LISTING_FILE})")
+        return []
+    with open(LISTING_FILE, 'r', encoding='utf-8') as f:
+        html_content = f.read()
+    with metrics.timer('parse', 'vatican'):
+        cardinals = parse_listing_html(html_content)
+    logger.info(f"Extraction complete. Found {len(cardinals)} cardinals.")
+    return cardinals
 
 def extract_cardinals():
     """Extract cardinal information directly from the webpage"""
-    url = 'https://press.vatican.va/content/salastampa/en/documentation/card_bio_typed/card_bio_ele.html'
-    html_content = get_page_content(url)
-    if not html_content:
-        return []
+    cardinals = list(stream_cardinals())
+    logger.info(f"Extraction complete. Found {len(cardinals)} cardinals.")
+    return cardinals
+
+def stream_cardinals():
+    """
+    Yield the cardinals of the listing page while it downloads
     
-    # Save the HTML content for inspection
-    save_html_to_file(html_content, 'data/raw/vatican_cardinals.html')
+    Each row is parsed as soon as its </tr> arrives, so biography fetches can
+    start before the rest of the page is in, and neither the whole page nor
+    a parse tree of it is held in memory. The page still goes to the
+    response cache (data/raw) for inspection and offline runs. If the
+    download breaks off, the page is fetched again with retries and the
+    rows not yet yielded follow from it.
     
-    # Parse the HTML content
-    soup = BeautifulSoup(html_content, 'html.parser')
+    Yields:
+        dict: name, biography_url, birth_date, appointing_pope and country of a cardinal
+    """
+    import http_client
+    parser = ListingRowParser()
+    yielded = 0
+    parse_seconds = 0.0
+    try:
+        for chunk in http_client.stream_text(LISTING_URL, cache_file=LISTING_FILE):
+            parse_started = time.perf_counter()
+            parser.feed(chunk)
+            parse_seconds += time.perf_counter() - parse_started
+            while parser.cardinals:
+                yield parser.cardinals.popleft()
+                yielded += 1
+        parser.close()
+        while parser.cardinals:
+            yield parser.cardinals.popleft()
+            yielded += 1
+    except http_client.OfflineCacheMiss as e:
+        logger.error(f"Offline mode: {str(e)}")
+    except Exception as e:
+        fetch_logger.error(f"Streaming {LISTING_URL} failed after {yielded} cardinals ({str(e)}), fetching it again")
+        html_content = get_page_content(LISTING_URL, cache_file=LISTING_FILE)
+        if html_content:
+            parse_started = time.perf_counter()
+            cardinals = parse_listing_html(html_content)
+            parse_seconds += time.perf_counter() - parse_started
+            yield from cardinals[yielded:]
+    finally:
+        metrics.observe('parse', 'vatican', parse_seconds)
+
+def listing_record(name, href, cells):
+    """
+    Build the cardinal dict of one listing entry
+    
+    Args:
+        name (str): Text of the entry's listTitle link
+        href (str): The link's href
+        cells (list): Text of the td cells of the entry's row (None when it
+            isn't in a row); the first five are used
+        
+    Returns:
+        dict: The cardinal, or None for section headers and unusable entries
+    """
+    name = name.strip()
+    
+    # Skip if this is not a cardinal (e.g., section headers)
+    if "Cardinals" in name and ("electors" in name or "80 years" in name or "Deceased" in name):
+        return None
+        
+    # Extract URL
+    if href is None:
+        return None
+    if href.startswith('/'):
+        full_url = f"https://press.vatican.va{href}"
+    else:
+        full_url = href
+    
+    if cells is None:
+        logger.warning(f"Could not find parent row for cardinal: {name}")
+        return None
+    
+    # Extract birth date, appointing pope, and country
+    birth_date = None
+    appointing_pope = None
+    country = None
+    
+    # We expect at least 5 td elements: empty, name, birth date, pope, country
+    if len(cells) >= 5:
+        # Birth date is typically in the 3rd td (index 2)
+        birth_date = cells[2].strip()
+        # Appointing pope is typically in the 4th td (index 3)
+        appointing_pope = cells[3].strip()
+        # Country is typically in the 5th td (index 4)
+        country = cells[4].strip()
+    
+    parse_logger.info(f"Extracted: {name} | Birth: {birth_date} | Pope: {appointing_pope} | Country: {country}")
+    return {
+        'name': name,
+        'biography_url': full_url,
+        'birth_date': birth_date,
+        'appointing_pope': appointing_pope,
+        'country': country
+    }
+
+def parse_listing_html(html_content):
+    """
+    Parse the whole Vatican listing page into one dict per cardinal
+    
+    The reference stream_cardinals' incremental parser is checked against
+    (python -m benchmarks.parser_equivalence).
+    
+    Returns:
+        list: name, biography_url, birth_date, appointing_pope and country of each cardinal
+    """
+    soup = html_parser.parse(html_content)
     cardinals = []
     
     # Find all div elements with class "listTitle" which contain cardinal links
-    list_titles = soup.find_all('div', class_='listTitle')
+    list_titles = soup.select('div.listTitle')
     logger.info(f"Found {len(list_titles)} elements with class 'listTitle'")
     
     # Process each cardinal
     for list_title in list_titles:
         # Get the link element
-        link = list_title.find('a')
+        link = list_title.select_one('a')
         if not link:
             continue
         
-        # Extract name from link
-        name = link.text.strip()
-        
-        # Skip if this is not a cardinal (e.g., section headers)
-        if "Cardinals" in name and ("electors" in name or "80 years" in name or "Deceased" in name):
-            continue
-            
-        # Extract URL
-        href = link['href']
-        if href.startswith('/'):
-            full_url = f"https://press.vatican.va{href}"
-        else:
-            full_url = href
-            
         # Get the parent row (tr) to extract additional information
-        tr = list_title.find_parent('tr')
-        if not tr:
-            logger.warning(f"Could not find parent row for cardinal: {name}")
-            continue
-            
-        # Find all td elements in the row
-        tds = tr.find_all('td')
-        
-        # Extract birth date, appointing pope, and country
-        birth_date = None
-        appointing_pope = None
-        country = None
-        
-        # We expect at least 5 td elements: empty, name, birth date, pope, country
-        if len(tds) >= 5:
-            # Birth date is typically in the 3rd td (index 2)
-            birth_date_td = tds[2]
-            if birth_date_td:
-                birth_date = birth_date_td.text.strip()
-                
-            # Appointing pope is typically in the 4th td (index 3)
-            pope_td = tds[3]
-            if pope_td:
-                appointing_pope = pope_td.text.strip()
-                
-            # Country is typically in the 5th td (index 4)
-            country_td = tds[4]
-            if country_td:
-                country = country_td.text.strip()
-        
-        # Add to cardinals list
-        cardinal = {
-            'name': name,
-            'biography_url': full_url,
-            'birth_date': birth_date,
-            'appointing_pope': appointing_pope,
-            'country': country
-        }
+        tr = list_title.closest('tr')
+        cells = [td.text() for td in tr.select('td')[:5]] if tr else None
         
-        cardinals.append(cardinal)
-        logger.info(f"Extracted: {name} | Birth: {birth_date} | Pope: {appointing_pope} | Country: {country}")
+        cardinal = listing_record(link.text(), link.attr('href'), cells)
+        if cardinal:
+            cardinals.append(cardinal)
     
-    logger.info(f"Extraction complete. Found {len(cardinals)} cardinals.")
     return cardinals
 
-def extract_cardinal_biography(bio_url):
+class ListingRowParser(HTMLParser):
     """
-    Extract detailed biographical information from a cardinal's individual page
+    Incremental parser for the Vatican listing page.
+    
+    feed() it the page in pieces of any size; whenever a table row is
+    complete, the cardinals of its listTitle entries are appended to
+    cardinals. Only the rows still open are kept, as the text of their cells.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.cardinals = deque()
+        # Open rows, innermost last: {'cells': [[text, ...], ...], 'open_cells': [index, ...], 'entries': [...]}
+        self.rows = []
+        # Nesting depth of divs inside the current listTitle div (0 outside one)
+        self.title_depth = 0
+        # [href, [text, ...]] of the first link in the current listTitle div
+        self.link = None
+        self.in_link = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'tr':
+            self.rows.append({'cells': [], 'open_cells': [], 'entries': []})
+        elif tag == 'td' and self.rows:
+            row = self.rows[-1]
+            row['open_cells'].append(len(row['cells']))
+            row['cells'].append([])
+        elif tag == 'div':
+            if self.title_depth:
+                self.title_depth += 1
+            elif 'listTitle' in (dict(attrs).get('class') or '').split():
+                self.title_depth = 1
+                self.link = None
+        elif tag == 'a' and self.title_depth and self.link is None:
+            self.link = [dict(attrs).get('href'), []]
+            self.in_link = True
+
+    def handle_endtag(self, tag):
+        if tag == 'a':
+            self.in_link = False
+        elif tag == 'td' and self.rows:
+            if self.rows[-1]['open_cells']:
+                self.rows[-1]['open_cells'].pop()
+        elif tag == 'div' and self.title_depth:
+            self.title_depth -= 1
+            if not self.title_depth:
+                self._end_entry()
+        elif tag == 'tr' and self.rows:
+            self._end_row(self.rows.pop())
+
+    def handle_data(self, data):
+        if self.in_link:
+            self.link[1].append(data)
+        # Cell text includes that of nested elements, nested rows included
+        for row in self.rows:
+            for index in row['open_cells']:
+                row['cells'][index].append(data)
+
+    def close(self):
+        super().close()
+        if self.title_depth:
+            self.title_depth = 0
+            self._end_entry()
+        while self.rows:
+            self._end_row(self.rows.pop())
+
+    def _end_entry(self):
+        self.in_link = False
+        if self.link is None:
+            return
+        href, text = self.link
+        self.link = None
+        if self.rows:
+            self.rows[-1]['entries'].append((''.join(text), href))
+        else:
+            cardinal = listing_record(''.join(text), href, None)
+            if cardinal:
+                self.cardinals.append(cardinal)
+
+    def _end_row(self, row):
+        if not row['entries']:
+            return
+        cells = [''.join(cell) for cell in row['cells'][:5]]
+        for name, href in row['entries']:
+            cardinal = listing_record(name, href, cells)
+            if cardinal:
+                self.cardinals.append(cardinal)
+
+def biography_archive_file(bio_url):
+    """Archive file in data/raw that caches a biography page"""
+    return f"data/raw/bio_{bio_url.split('/')[-1]}"
+
+def parse_biography_html(html_content):
+    """
+    Parse a biography page into its photo URL, biography text and lists
+    
+    This is a pure function (no logging, no I/O) so it can run in a worker
+    process of parse_biographies_parallel.
     
     Args:
-        bio_url (str): URL for the cardinal's biography page
+        html_content (str or bytes): Raw HTML of the biography page
         
     Returns:
-        dict: Dictionary containing detailed biographical information
+        dict: photo_url, biography_text and list_N fields that were found
     """
-    logger.info(f"Extracting biography from {bio_url}")
-    
-    html_content = get_page_content(bio_url)
-    if not html_content:
-        logger.error(f"Failed to get content from {bio_url}")
-        return {}
-    
-    # Save the biography page for debugging if needed
-    filename = f"data/raw/bio_{bio_url.split('/')[-1]}"
-    save_html_to_file(html_content, filename)
-    
-    soup = BeautifulSoup(html_content, 'html.parser')
+    soup = html_parser.parse(html_content)
     bio_info = {}
     
     # Extract photo URL - looking for img tag within the textimage section
-    textimage_div = soup.find('div', class_='textimage')
+    textimage_div = soup.select_one('div.textimage')
     if textimage_div:
-        img = textimage_div.find('img')
-        if img and img.has_attr('src'):
-            photo_url = img['src']
+        img = textimage_div.select_one('img')
+        if img and img.attr('src') is not None:
+            photo_url = img.attr('src')
             if photo_url.startswith('/'):
                 photo_url = f"https://press.vatican.va{photo_url}"
             bio_info['photo_url'] = photo_url
-            logger.info(f"Found photo URL: {photo_url}")
     
     # Extract biographical text - looking for text within the textimage div
     if textimage_div:
-        text_div = textimage_div.find('div', class_='text')
+        text_div = textimage_div.select_one('div.text')
         if text_div:
             # Get all paragraphs from the text div
-            paragraphs = text_div.find_all('p')
+            paragraphs = text_div.select('p')
             bio_text = []
             for p in paragraphs:
-                text = p.get_text(strip=True)
+                text = p.text(strip=True)
                 if text:
                     bio_text.append(text)
             
             if bio_text:
                 # Join paragraphs with newlines to create complete biography
                 bio_info['biography_text'] = '\n'.join(bio_text)
-                logger.info(f"Found biography text ({len(bio_text)} paragraphs)")
                 
                 # Also extract any lists that might contain positions or memberships
-                lists = text_div.find_all('ul')
+                lists = text_div.select('ul')
                 for i, ul in enumerate(lists):
-                    list_items = ul.find_all('li')
-                    items = [li.get_text(strip=True) for li in list_items]
+                    list_items = ul.select('li')
+                    items = [li.text(strip=True) for li in list_items]
                     if items:
                         bio_info[f'list_{i+1}'] = items
-                        logger.info(f"Found list {i+1} with {len(items)} items")
     
-    logger.info(f"Completed biography extraction for {bio_url}")
     return bio_info
 
+def log_biography(bio_url, bio_info):
+    """Log what was found on a biography page"""
+    if not parse_logger.isEnabledFor(logging.INFO):
+        return
+    if 'photo_url' in bio_info:
+        parse_logger.info(f"Found photo URL: {bio_info['photo_url']}")
+    if 'biography_text' in bio_info:
+        parse_logger.info(f"Found biography text ({len(bio_info['biography_text'].splitlines())} paragraphs)")
+    lists = [key for key in bio_info if key.startswith('list_')]
+    if lists:
+        parse_logger.info(f"Found {len(lists)} lists")
+    parse_logger.info(f"Completed biography extraction for {bio_url}")
+
+def page_validators(url):
+    """ETag/Last-Modified the response cache holds for a URL"""
+    import http_client
+    entry = http_client.page_cache.lookup(url)
+    return entry.get('headers') if entry else None
+
+def reuse_unchanged(changes, bio_url, html_content):
+    """Biography fields of the previous run when the page hasn't changed, else None"""
+    if changes is None:
+        return None
+    bio_info = changes.reuse(bio_url, html_content, page_validators(bio_url))
+    if bio_info is not None:
+        parse_logger.info(f"Unchanged since the last run: {bio_url}")
+    return bio_info
+
+def extract_cardinal_biography(bio_url, changes=None):
+    """
+    Extract detailed biographical information from a cardinal's individual page
+    
+    Args:
+        bio_url (str): URL for the cardinal's biography page
+        changes (ChangeTracker): When given, a page whose content hash is
+            unchanged since the last run is not parsed again
+        
+    Returns:
+        dict: Dictionary containing detailed biographical information
+    """
+    fetch_logger.info(f"Extracting biography from {bio_url}")
+    
+    # The biography page is cached in data/raw for debugging and offline runs
+    html_content = get_page_content(bio_url, cache_file=biography_archive_file(bio_url))
+    if not html_content:
+        fetch_logger.error(f"Failed to get content from {bio_url}")
+        return {}
+    
+    bio_info = reuse_unchanged(changes, bio_url, html_content)
+    if bio_info is not None:
+        return bio_info
+    
+    with metrics.timer('parse', 'vatican'):
+        bio_info = parse_biography_html(html_content)
+    log_biography(bio_url, bio_info)
+    return bio_info
+
+def parse_biographies_parallel(pages, workers=None):
+    """
+    Parse biography pages in a process pool
+    
+    Args:
+        pages (list): (key, html) pairs; html may be str or raw bytes
+        workers (int): Number of worker processes (default: one per CPU)
+        
+    Returns:
+        dict: key -> parsed bio_info
+    """
+    keys = [key for key, _ in pages]
+    documents = [html for _, html in pages]
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(documents) // (workers * 4))
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(metrics.timed_call, repeat(parse_biography_html), documents, chunksize=chunksize)
+        parsed = {}
+        for key, (bio_info, seconds) in zip(keys, results):
+            metrics.observe('parse', 'vatican', seconds)
+            parsed[key] = bio_info
+        return parsed
+
+def reparse_archive(cardinals, workers=None):
+    """
+    Re-parse the archived data/raw/bio_*.html pages of all cardinals without
+    touching the network, updating the cardinal dicts in place
+    """
+    pages = []
+    for cardinal in cardinals:
+        bio_url = cardinal.get('biography_url')
+        if not bio_url:
+            continue
+        archive_file = biography_archive_file(bio_url)
+        if not os.path.exists(archive_file):
+            logger.warning(f"No archived page for {cardinal['name']} ({archive_file})")
+            continue
+        with open(archive_file, 'rb') as f:
+            pages.append((bio_url, f.read()))
+    
+    logger.info(f"Re-parsing {len(pages)} archived biography pages with {workers or os.cpu_count()} workers")
+    parsed = parse_biographies_parallel(pages, workers)
+    for cardinal in cardinals:
+        bio_info = parsed.get(cardinal.get('biography_url'))
+        if bio_info is not None:
+            cardinal.update(bio_info)
+    logger.info(f"Re-parsed {len(parsed)} biography pages")
+
+def record_biography(journal, cardinal, bio_info):
+    """Merge a finished biography into its cardinal dict and append it to the journal"""
+    cardinal.update(bio_info)
+    # Failed fetches are not journaled so a resumed run retries them
+    if bio_info:
+        journal.append(cardinal['biography_url'], bio_info)
+
+def checkpoint(journal, done, total):
+    """Sync the journal and the response cache index every 10 cardinals"""
+    if done % 10 == 0 or done == total:
+        import http_client
+        journal.sync()
+        http_client.save_cache()
+        logger.info(f"Checkpointed progress ({done}/{total}) to {journal.path}")
+
+def resume_from_journal(cardinals, journal, listed=None):
+    """
+    Apply biographies finished by an earlier, interrupted run
+    
+    Args:
+        cardinals (iterable): Listing rows, possibly still streaming in
+        journal (CheckpointJournal): Journal of the interrupted run
+        listed (list): When given, every listing row is appended to it
+        
+    Yields:
+        dict: Cardinals whose biography still has to be fetched
+    """
+    finished = journal.load()
+    done = pending = 0
+    for cardinal in cardinals:
+        if listed is not None:
+            listed.append(cardinal)
+        bio_url = cardinal.get('biography_url')
+        if bio_url in finished:
+            cardinal.update(finished[bio_url])
+            done += 1
+        elif bio_url:
+            pending += 1
+            yield cardinal
+    if finished:
+        logger.info(f"Resumed: {done} biographies were already finished, {pending} fetched")
+
+def merge_journal(cardinals, journal):
+    """
+    Merge the journal into the listing rows; the journal is kept until the
+    dataset has been stored
+    """
+    journal.close()
+    finished = journal.load()
+    for cardinal in cardinals:
+        bio_info = finished.get(cardinal.get('biography_url'))
+        if bio_info:
+            cardinal.update(bio_info)
+    logger.info(f"Merged {len(finished)} journal records")
+
+def write_dataset_file(cardinals, output_file):
+    """Write the dataset as one JSON file"""
+    tmp_file = f"{output_file}.tmp"
+    with metrics.timer('serialize'):
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(cardinals, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, output_file)
+
+def fetch_biographies_serial(cardinals, journal, changes=None):
+    """Fetch every biography page one at a time, paced by http_client's rate controller"""
+    total_cardinals = len(cardinals)
+    for i, cardinal in enumerate(cardinals):
+        fetch_logger.info(f"Processing biography {i+1}/{total_cardinals} ({cardinal['name']})")
+        bio_url = cardinal.get('biography_url')
+        if bio_url:
+            bio_info = extract_cardinal_biography(bio_url, changes)
+            # Update the cardinal dict with biographical information
+            record_biography(journal, cardinal, bio_info)
+            checkpoint(journal, i + 1, total_cardinals)
+
+class HostLimiter:
+    """
+    Politeness limit for a single host: caps the number of in-flight requests.
+    The spacing between requests is left to http_client's rate controller.
+    """
+
+    def __init__(self, max_in_flight):
+        import asyncio
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+
+def configure_host_delay(host_delay):
+    """
+    Cap the adaptive request rate at one request per host_delay seconds; with
+    no delay, hosts are not paced until they push back
+    """
+    import http_client
+    import rate_control
+    if host_delay:
+        http_client.configure_rate_control(max_rate=1.0 / host_delay)
+    else:
+        http_client.configure_rate_control(rate=rate_control.UNLIMITED_RATE, max_rate=rate_control.UNLIMITED_RATE)
+
+async def _fetch_biographies_async(cardinals, journal, concurrency, per_host, parse_workers, changes):
+    """Fetch biographies concurrently, updating each cardinal dict as its page arrives"""
+    import asyncio
+    loop = asyncio.get_running_loop()
+    global_limit = asyncio.Semaphore(concurrency)
+    host_limiters = {}
+    # Unknown while the listing is still streaming in
+    total_cardinals = len(cardinals) if hasattr(cardinals, '__len__') else None
+    completed = 0
+
+    async def fetch_one(cardinal):
+        nonlocal completed
+        bio_url = cardinal.get('biography_url')
+        if not bio_url:
+            return
+        host = urlparse(bio_url).netloc
+        if host not in host_limiters:
+            host_limiters[host] = HostLimiter(per_host)
+        limiter = host_limiters[host]
+
+        async with global_limit, limiter.semaphore:
+            if parse_pool is None:
+                bio_info = await loop.run_in_executor(executor, extract_cardinal_biography, bio_url, changes)
+            else:
+                html_content = await loop.run_in_executor(
+                    executor, get_page_content, bio_url, biography_archive_file(bio_url))
+                bio_info = {}
+        
+        # Parse outside the fetch slot so CPU work doesn't hold up the next request
+        if parse_pool is not None and html_content:
+            bio_info = await loop.run_in_executor(executor, reuse_unchanged, changes, bio_url, html_content)
+        if parse_pool is not None and not bio_info:
+            if html_content:
+                bio_info, seconds = await loop.run_in_executor(
+                    parse_pool, metrics.timed_call, parse_biography_html, html_content)
+                metrics.observe('parse', 'vatican', seconds)
+                log_biography(bio_url, bio_info)
+            else:
+                fetch_logger.error(f"Failed to get content from {bio_url}")
+
+        # Update the cardinal dict in place so the list keeps its original order
+        record_biography(journal, cardinal, bio_info)
+        completed += 1
+        fetch_logger.info(f"Processed biography {completed}/{total_cardinals or '?'} ({cardinal['name']})")
+        checkpoint(journal, completed, total_cardinals)
+
+    from concurrent.futures import ProcessPoolExecutor
+    parse_pool = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers else None
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor, \
+                ThreadPoolExecutor(max_workers=1, thread_name_prefix='listing') as listing_executor:
+            # Start each fetch as soon as its row comes out of the (possibly streaming) listing
+            rows = iter(cardinals)
+            tasks = []
+            while True:
+                cardinal = await loop.run_in_executor(listing_executor, next, rows, None)
+                if cardinal is None:
+                    break
+                tasks.append(asyncio.create_task(fetch_one(cardinal)))
+            await asyncio.gather(*tasks)
+    finally:
+        if parse_pool is not None:
+            parse_pool.shutdown()
+
+def fetch_biographies_async(cardinals, journal, concurrency=8, per_host=4, host_delay=0.25, parse_workers=0, changes=None):
+    """
+    Fetch all biography pages with bounded concurrency
+    
+    Args:
+        cardinals (list): Cardinal dicts from extract_cardinals, updated in place
+        journal (CheckpointJournal): Journal each finished biography is appended to
+        concurrency (int): Maximum number of requests in flight overall
+        per_host (int): Maximum number of requests in flight per host
+        host_delay (float): Minimum seconds between two requests to the same
+            host; the rate adapts below that cap (0 leaves hosts unpaced
+            until they push back)
+        parse_workers (int): Parse pages in this many worker processes instead
+            of on the fetch threads (0 parses on the fetch threads)
+        changes (ChangeTracker): Skip parsing pages unchanged since the last run
+    """
+    import asyncio
+    configure_host_delay(host_delay)
+    asyncio.run(_fetch_biographies_async(cardinals, journal, concurrency, per_host, parse_workers, changes))
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Scrape cardinal electors from the Vatican press office")
+    parser.add_argument('--skip-bios', action='store_true',
+                        help="Only extract the listing, do not fetch biography pages")
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help="Fetch biography pages concurrently with asyncio")
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help="Maximum concurrent requests in async mode (default: 8)")
+    parser.add_argument('--per-host', type=int, default=4,
+                        help="Maximum concurrent requests per host in async mode (default: 4)")
+    parser.add_argument('--host-delay', type=float, default=0.25,
+                        help="Minimum seconds between requests to the same host; the adaptive rate "
+                             "stays below this cap (default: 0.25)")
+    parser.add_argument('--offline', action='store_true',
+                        help="Run entirely from the response cache in data/raw without network access")
+    parser.add_argument('--cache-max-mb', type=int, default=None,
+                        help="Evict least recently used cached pages beyond this size")
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help="Parse biography pages in this many worker processes (async and reparse modes)")
+    parser.add_argument('--reparse', action='store_true',
+                        help="Re-parse the archived data/raw pages in a process pool without any network access")
+    parser.add_argument('--fresh', action='store_true',
+                        help="Ignore the checkpoint journal of an interrupted run and start over")
+    parser.add_argument('--reprocess-all', action='store_true',
+                        help="Parse every biography page even if its content is unchanged since the last run")
+    parser.add_argument('--output', default=None,
+                        help="Also write the dataset to this JSON file; every run is kept in the store "
+                             "(python dataset_store.py checkout scrape -o FILE)")
+    parser.add_argument('--metrics-file', default=None,
+                        help="Where to write the JSON run report (default: logs/cardinal_scraper_metrics_<timestamp>.json)")
+    parser.add_argument('--prometheus-file', default=None,
+                        help="Also write the run metrics in Prometheus text format to this file")
+    html_parser.add_backend_argument(parser)
+    log_setup.add_logging_arguments(parser)
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+
     # Set up logging
     global logger
-    logger = setup_logging()
+    logger = setup_logging(args.log_level, args.log_rate, args.log_sample)
+    html_parser.set_backend(args.html_parser)
     logger.info("Starting cardinal data extraction")
     
     # Create directory structure
     create_directory_structure()
     
-    # Extract cardinal information from main page
-    cardinals = extract_cardinals()
+    # Reparse reads the archive directly and never loads the HTTP stack
+    http_client = None
+    if not args.reparse:
+        import http_client
+        if args.cache_max_mb is not None:
+            http_client.configure_cache(max_bytes=args.cache_max_mb * 1024 * 1024)
+        if args.offline:
+            logger.info("Offline mode: reading all pages from the response cache")
+            http_client.set_offline()
     
     # Should we process biography pages?
-    process_bios = True  # Set to False to skip biography processing
+    process_bios = not args.skip_bios
+    
+    # The async fetcher reads the listing as it streams in, so biography
+    # fetches start before the whole page has arrived
+    streaming = process_bios and args.use_async and not args.reparse
     
-    if process_bios and cardinals:
+    # Extract cardinal information from main page
+    if args.reparse:
+        cardinals = read_archived_listing()
+    else:
+        cardinals = [] if streaming else extract_cardinals()
+    
+    # A failed listing fetch must not replace the dataset, diff and manifest with empty ones
+    if not cardinals and not streaming:
+        logger.error("No cardinals were listed; leaving the previous dataset in place")
+        return 1
+    
+    started_at = datetime.now()
+    journal = None
+    # Every scrape writes a diff against the previous snapshot; --reprocess-all
+    # only stops unchanged pages from being reused instead of parsed
+    changes = ChangeTracker.load(reuse_pages=not args.reprocess_all) if process_bios else None
+    
+    if args.reparse:
+        reparse_archive(cardinals, args.parse_workers or None)
+    elif process_bios:
         logger.info("Starting biography page extraction")
-        # Process all cardinals
-        total_cardinals = len(cardinals)
-        for i, cardinal in enumerate(cardinals):
-            logger.info(f"Processing biography {i+1}/{total_cardinals} ({cardinal['name']})")
-            bio_url = cardinal.get('biography_url')
-            if bio_url:
-                bio_info = extract_cardinal_biography(bio_url)
-                # Update the cardinal dict with biographical information
-                cardinal.update(bio_info)
-                # Save progress periodically (every 10 cardinals)
-                if (i + 1) % 10 == 0 or (i + 1) == total_cardinals:
-                    progress_file = f'data/raw/cardinals_progress_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-                    with open(progress_file, 'w', encoding='utf-8') as f:
-                        json.dump(cardinals, f, ensure_ascii=False, indent=2)
-                    logger.info(f"Saved progress ({i+1}/{total_cardinals}) to {progress_file}")
-                # Add a small delay to avoid overwhelming the server
-                time.sleep(1)
-    
-    # Save the final data
-    output_file = f'data/raw/cardinals_complete_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(cardinals, f, ensure_ascii=False, indent=2)
-    
-    logger.info(f"Extraction complete. Processed {len(cardinals)} cardinals")
-    logger.info(f"Final data saved to {output_file}")
+        journal = CheckpointJournal(JOURNAL_FILE)
+        if args.fresh:
+            journal.remove()
+        # Skip biographies finished by an interrupted run; streamed rows are collected in cardinals
+        if streaming:
+            pending = resume_from_journal(stream_cardinals(), journal, cardinals)
+        else:
+            pending = list(resume_from_journal(cardinals, journal))
+        if args.use_async:
+            logger.info(f"Using async fetcher (concurrency={args.concurrency}, per host={args.per_host})")
+            host_delay = 0 if args.offline else args.host_delay
+            fetch_biographies_async(pending, journal, args.concurrency, args.per_host, host_delay, args.parse_workers, changes)
+        else:
+            configure_host_delay(args.host_delay)
+            fetch_biographies_serial(pending, journal, changes)
+        
+        if not cardinals:
+            journal.close()
+            logger.error("No cardinals were listed; leaving the previous dataset in place")
+            return 1
+        
+        merge_journal(cardinals, journal)
+    
+    if http_client is not None:
+        http_client.save_cache()
+    
+    # The store keeps every version, and unchanged records take no extra space
+    snapshot = dataset_store.commit_dataset('scrape' if process_bios else 'listing', cardinals, source=args.output or 'cardinal_scraper.py')
+    if journal is not None:
+        journal.remove()
+    
+    # Keep the search index in step with the dataset; only changed records are re-tokenized
+    if process_bios:
+        stats = search_index.build_index(cardinals, dataset=snapshot)
+        logger.info(f"Search index updated: {stats['added']} added, {stats['changed']} changed, "
+                    f"{stats['removed']} removed")
+    
+    # Write the added/removed/modified diff against the previous snapshot
+    if changes is not None:
+        changes.finish(cardinals, snapshot, change_detection.DIFF_FILE_FORMAT.format(
+            timestamp=started_at.strftime("%Y%m%d_%H%M%S")))
+    
+    if args.output:
+        write_dataset_file(cardinals, args.output)
+        logger.info(f"Dataset written to {args.output}")
+    
+    logger.info(f"Extraction complete. Processed {len(cardinals)} cardinals, stored as snapshot {snapshot}")
+    
+    # Write the run report
+    metrics_file = args.metrics_file or metrics.default_report_file('cardinal_scraper')
+    metrics.write_report(metrics_file, {'script': 'cardinal_scraper', 'cardinals': len(cardinals), 'output_file': args.output,
+                                        'snapshot': snapshot,
+                                        'hosts': http_client.rate_controller.snapshot() if http_client else {}})
+    logger.info(f"Run metrics saved to {metrics_file}")
+    if args.prometheus_file:
+        metrics.write_prometheus(args.prometheus_file)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    sys.exit(main()) 
\ No newline at end of file
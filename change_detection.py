@@ -0,0 +1,167 @@
+import glob
+import json
+import os
+import threading
+import logging
+from datetime import datetime
+import dataset_store
+from dataset_store import content_hash, record_key
+
+logger = logging.getLogger(__name__)
+
+# Hashes and validators of every listing row and biography page seen by the last run
+MANIFEST_FILE = 'data/raw/cardinals_manifest.json'
+
+# Where the scraper writes the diff of each run
+DIFF_FILE_FORMAT = 'data/raw/cardinals_diff_{timestamp}.json'
+
+# Fields that come from the listing page; everything else comes from the biography page
+LISTING_FIELDS = ['name', 'biography_url', 'birth_date', 'appointing_pope', 'country']
+
+def find_latest_dataset(directory='data/raw'):
+    """Most recent cardinals_complete_*.json (written before the store existed), or None"""
+    files = sorted(glob.glob(os.path.join(directory, 'cardinals_complete_*.json')))
+    return files[-1] if files else None
+
+def diff_datasets(previous, current):
+    """
+    Compare two versions of the dataset record by record
+
+    Args:
+        previous (list): Cardinal dicts of the earlier run
+        current (list): Cardinal dicts of this run
+
+    Returns:
+        dict: added and removed (lists of keys) and modified (list of
+            {key, name, fields} with the names of the fields that changed)
+    """
+    old = {record_key(cardinal): cardinal for cardinal in previous}
+    new = {record_key(cardinal): cardinal for cardinal in current}
+    modified = []
+    for key, cardinal in new.items():
+        before = old.get(key)
+        if before is None or before == cardinal:
+            continue
+        fields = sorted(field for field in set(before) | set(cardinal) if before.get(field) != cardinal.get(field))
+        modified.append({'key': key, 'name': cardinal.get('name'), 'fields': fields})
+    return {
+        'added': [key for key in new if key not in old],
+        'removed': [key for key in old if key not in new],
+        'modified': modified
+    }
+
+def load_diff(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def changed_keys(diff):
+    """Keys of the records a downstream stage has to process again"""
+    return set(diff['added']) | {entry['key'] for entry in diff['modified']}
+
+class ChangeTracker:
+    """
+    Decides which biography pages have to be parsed again.
+
+    The manifest holds, per cardinal, the hash of its biography page plus
+    the page's ETag/Last-Modified. When a fetched page hashes the same as
+    last time, the biography fields of the previous dataset are reused
+    instead of parsing the page again, unless reuse_pages is off; page
+    hashes are recorded and the diff is written either way.
+    """
+
+    def __init__(self, manifest_file=MANIFEST_FILE, reuse_pages=True):
+        self.manifest_file = manifest_file
+        self.reuse_pages = reuse_pages
+        self.entries = {}
+        self.previous_dataset = None
+        self.previous_records = {}
+        self.reused = 0
+        self.parsed = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, manifest_file=MANIFEST_FILE, reuse_pages=True):
+        tracker = cls(manifest_file, reuse_pages)
+        if os.path.exists(manifest_file):
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            tracker.entries = manifest.get('entries', {})
+            tracker.previous_dataset = manifest.get('dataset')
+        records = dataset_store.read_dataset(tracker.previous_dataset) if tracker.previous_dataset else None
+        # Without a manifest the latest snapshot, or else the latest file, still serves as the diff baseline
+        if records is None:
+            records, tracker.previous_dataset = dataset_store.latest_records('scrape')
+        if records is None:
+            tracker.previous_dataset = find_latest_dataset()
+            records = dataset_store.read_dataset(tracker.previous_dataset) if tracker.previous_dataset else None
+        tracker.previous_records = {record_key(c): c for c in records or []}
+        if tracker.previous_dataset:
+            logger.info(f"Detecting changes against {tracker.previous_dataset}")
+        return tracker
+
+    def reuse(self, bio_url, html_content, validators=None):
+        """
+        Record the hash of a fetched page and return the biography fields of
+        the previous run if the page is unchanged
+
+        Args:
+            bio_url (str): Biography page URL
+            html_content (str or bytes): Page body
+            validators (dict): etag/last_modified of the response, if any
+
+        Returns:
+            dict: Previous biography fields, or None if the page must be parsed
+        """
+        page_hash = content_hash(html_content)
+        with self.lock:
+            entry = self.entries.setdefault(bio_url, {})
+            unchanged = entry.get('page_hash') == page_hash
+            entry['page_hash'] = page_hash
+            entry['checked_at'] = datetime.now().isoformat()
+            if validators:
+                entry['etag'] = validators.get('etag')
+                entry['last_modified'] = validators.get('last_modified')
+            previous = self.previous_records.get(bio_url)
+            if unchanged and previous is not None and self.reuse_pages:
+                bio_info = {field: value for field, value in previous.items() if field not in LISTING_FIELDS}
+                if bio_info:
+                    self.reused += 1
+                    return bio_info
+            self.parsed += 1
+            return None
+
+    def finish(self, cardinals, dataset, diff_file):
+        """
+        Write the diff against the previous dataset to diff_file and save the
+        manifest
+
+        Args:
+            cardinals (list): Cardinal dicts of this run
+            dataset (str): Store snapshot reference (or file) of this run's
+                dataset, the baseline of the next run
+            diff_file (str): Where to write the diff
+
+        Returns:
+            dict: The diff
+        """
+        current_keys = {record_key(cardinal) for cardinal in cardinals}
+        self.entries = {key: entry for key, entry in self.entries.items() if key in current_keys}
+
+        diff = diff_datasets(list(self.previous_records.values()), cardinals)
+        diff.update({
+            'dataset': dataset,
+            'previous_dataset': self.previous_dataset,
+            'pages_parsed': self.parsed,
+            'pages_reused': self.reused
+        })
+        with open(diff_file, 'w', encoding='utf-8') as f:
+            json.dump(diff, f, ensure_ascii=False, indent=2)
+
+        tmp_file = f"{self.manifest_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'dataset': dataset, 'entries': self.entries}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.manifest_file)
+        logger.info(f"Changes since the last run: {len(diff['added'])} added, {len(diff['removed'])} removed, "
+                    f"{len(diff['modified'])} modified ({self.parsed} pages parsed, {self.reused} reused); "
+                    f"diff saved to {diff_file}")
+        return diff
@@ -0,0 +1,97 @@
+import json
+import os
+import threading
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+class CheckpointJournal:
+    """
+    Append-only JSONL journal holding one record per finished item.
+
+    Each line is {"key": ..., "data": {...}, "finished_at": ...}. Lines are
+    flushed as they are written and fsynced every fsync_every records, so a
+    killed run loses at most the last unsynced batch. A torn final line left
+    by a crash is ignored when the journal is read back.
+    """
+
+    def __init__(self, path, fsync_every=10):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.file = None
+        self.unsynced = 0
+        self.lock = threading.Lock()
+
+    def load(self):
+        """
+        Read the finished records back
+
+        Returns:
+            dict: key -> data for every complete line (later lines win)
+        """
+        records = {}
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping incomplete journal line {line_number} in {self.path}")
+                    continue
+                records[record['key']] = record['data']
+        logger.info(f"Loaded {len(records)} finished records from {self.path}")
+        return records
+
+    def append(self, key, data):
+        """Append one finished record"""
+        line = json.dumps({
+            'key': key,
+            'data': data,
+            'finished_at': datetime.now().isoformat()
+        }, ensure_ascii=False)
+        with self.lock:
+            if self.file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self.file = open(self.path, 'a', encoding='utf-8')
+                # Terminate a torn line left by a crash so it can't swallow the next record
+                if self.file.tell() > 0:
+                    with open(self.path, 'rb') as existing:
+                        existing.seek(-1, os.SEEK_END)
+                        if existing.read(1) != b'\n':
+                            self.file.write('\n')
+            self.file.write(line + '\n')
+            self.file.flush()
+            self.unsynced += 1
+            if self.unsynced >= self.fsync_every:
+                self._sync()
+
+    def _sync(self):
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+
+    def sync(self):
+        """Force any unsynced records to disk"""
+        with self.lock:
+            if self.file is not None and self.unsynced:
+                self._sync()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                if self.unsynced:
+                    self._sync()
+                self.file.close()
+                self.file = None
+
+    def remove(self):
+        """Delete the journal once its records have been compacted"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,308 @@
+"""
+Columnar export of the cardinals dataset.
+
+The small fields every request needs are kept apart from the large text
+fields so a reader can load the former without touching the latter.
+Two output formats are supported:
+
+columns (default, no dependencies) - a directory holding
+    manifest.json   {"format": "vibepope-columnar", "version": 2, "rows": N,
+                     "columns": {name: {"kind": ..., "absent_rows": [...], ...}}};
+                    absent_rows lists the rows whose record has no such
+                    field, as opposed to a null value
+    columns.json    the small columns, {name: [value per row]}; dictionary
+                    columns are {"dictionary": [distinct values],
+                    "indices": [index per row, -1 for null]}
+    <name>.bin      large column values (kind "blob"): the UTF-8 bytes of all
+                    rows back to back; "type" is "string" or "json" (lists
+                    and dicts)
+    <name>.offsets  row boundaries in <name>.bin as rows + 1 little-endian
+                    uint32; row i is bin[offsets[i]:offsets[i + 1]]. Rows
+                    without a value are listed in the column's "null_rows".
+parquet (needs pyarrow) - cardinals.parquet with the small columns, the
+    dictionary columns stored as Arrow dictionary arrays, and
+    cardinals_text.parquet with the large ones, row-aligned. Large columns
+    holding anything but strings or lists of strings are stored as JSON
+    text; the schema metadata key "json_columns" lists them.
+"""
+import argparse
+import importlib.util
+import json
+import mmap
+import os
+import sys
+from array import array
+
+FORMAT_NAME = 'vibepope-columnar'
+FORMAT_VERSION = 2
+
+# Columns with few distinct values, stored as a dictionary plus one index per row
+DICTIONARY_COLUMNS = ['country', 'appointing_pope']
+
+# Small columns loaded eagerly; every other field is a lazily loaded blob column
+SMALL_COLUMNS = ['name', 'biography_url', 'birth_date', 'appointing_pope', 'country', 'photo_url']
+
+def column_names(cardinals):
+    """Small columns first, then the large ones in order of first appearance"""
+    names = list(SMALL_COLUMNS)
+    for cardinal in cardinals:
+        for key in cardinal:
+            if key not in names:
+                names.append(key)
+    return names
+
+def dictionary_encode(values):
+    """
+    Returns:
+        tuple: (dictionary, indices) with -1 for None
+    """
+    dictionary = []
+    positions = {}
+    indices = []
+    for value in values:
+        if value is None:
+            indices.append(-1)
+            continue
+        if value not in positions:
+            positions[value] = len(dictionary)
+            dictionary.append(value)
+        indices.append(positions[value])
+    return dictionary, indices
+
+def write_blob_column(output_dir, name, values):
+    """
+    Write one large column as <name>.bin and <name>.offsets
+
+    Returns:
+        dict: The column's manifest entry
+    """
+    value_type = 'json' if any(isinstance(value, (list, dict)) for value in values) else 'string'
+    offsets = array('I', [0])
+    null_rows = []
+    with open(os.path.join(output_dir, f"{name}.bin"), 'wb') as f:
+        position = 0
+        for row, value in enumerate(values):
+            if value is None:
+                null_rows.append(row)
+            else:
+                text = json.dumps(value, ensure_ascii=False) if value_type == 'json' else value
+                data = text.encode('utf-8')
+                f.write(data)
+                position += len(data)
+            offsets.append(position)
+    if offsets.itemsize != 4:
+        raise RuntimeError("array('I') is not 32 bits on this platform")
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+    with open(os.path.join(output_dir, f"{name}.offsets"), 'wb') as f:
+        offsets.tofile(f)
+    return {
+        'kind': 'blob',
+        'type': value_type,
+        'data': f"{name}.bin",
+        'offsets': f"{name}.offsets",
+        'null_rows': null_rows
+    }
+
+def export_columns(cardinals, output_dir):
+    """
+    Write the dataset in the dependency-free columns format
+
+    Returns:
+        dict: The manifest
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    # The manifest is removed first and written last, so a reader never takes
+    # a half-written export for a complete one
+    manifest_file = os.path.join(output_dir, 'manifest.json')
+    if os.path.exists(manifest_file):
+        os.remove(manifest_file)
+    names = column_names(cardinals)
+    small = {}
+    manifest_columns = {}
+    for name in names:
+        values = [cardinal.get(name) for cardinal in cardinals]
+        absent_rows = [row for row, cardinal in enumerate(cardinals) if name not in cardinal]
+        if name in DICTIONARY_COLUMNS:
+            dictionary, indices = dictionary_encode(values)
+            small[name] = {'dictionary': dictionary, 'indices': indices}
+            manifest_columns[name] = {'kind': 'dictionary', 'type': 'string'}
+        elif name in SMALL_COLUMNS:
+            small[name] = values
+            manifest_columns[name] = {'kind': 'plain', 'type': 'string'}
+        else:
+            manifest_columns[name] = write_blob_column(output_dir, name, values)
+        manifest_columns[name]['absent_rows'] = absent_rows
+
+    with open(os.path.join(output_dir, 'columns.json'), 'w', encoding='utf-8') as f:
+        json.dump(small, f, ensure_ascii=False, separators=(',', ':'))
+    manifest = {
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'rows': len(cardinals),
+        'columns': manifest_columns
+    }
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+def parquet_available():
+    """Whether pyarrow is installed, without paying for importing it"""
+    return importlib.util.find_spec('pyarrow') is not None
+
+def export_parquet(cardinals, output_dir):
+    """Write cardinals.parquet (small columns) and cardinals_text.parquet (large ones)"""
+    # pyarrow is optional and slow to import, so only this format imports it
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("The parquet format needs pyarrow (pip install pyarrow)")
+    os.makedirs(output_dir, exist_ok=True)
+    small_arrays = {}
+    large_arrays = {}
+    json_columns = []
+    for name in column_names(cardinals):
+        values = [cardinal.get(name) for cardinal in cardinals]
+        present = [value for value in values if value is not None]
+        if name in DICTIONARY_COLUMNS:
+            small_arrays[name] = pa.array(values, type=pa.string()).dictionary_encode()
+        elif name in SMALL_COLUMNS:
+            small_arrays[name] = pa.array(values, type=pa.string())
+        elif all(isinstance(value, str) for value in present):
+            large_arrays[name] = pa.array(values, type=pa.string())
+        elif all(isinstance(value, list) and all(isinstance(item, str) for item in value) for value in present):
+            large_arrays[name] = pa.array(values, type=pa.list_(pa.string()))
+        else:
+            # Dicts and mixed values have no single Arrow type: store them as JSON, like the blob columns
+            json_columns.append(name)
+            large_arrays[name] = pa.array([None if value is None else json.dumps(value, ensure_ascii=False)
+                                           for value in values], type=pa.string())
+    pq.write_table(pa.table(small_arrays), os.path.join(output_dir, 'cardinals.parquet'))
+    large_table = pa.table(large_arrays).replace_schema_metadata({'json_columns': json.dumps(json_columns)})
+    pq.write_table(large_table, os.path.join(output_dir, 'cardinals_text.parquet'))
+
+class ColumnarDataset:
+    """
+    Reader for the columns format. The small columns are loaded when the
+    dataset is opened; blob columns are memory-mapped on first use and only
+    the requested rows are decoded.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'manifest.json'), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format') != FORMAT_NAME or self.manifest.get('version') != FORMAT_VERSION:
+            raise ValueError(f"{directory} is not a {FORMAT_NAME} v{FORMAT_VERSION} export")
+        self.rows = self.manifest['rows']
+        with open(os.path.join(directory, 'columns.json'), 'r', encoding='utf-8') as f:
+            self.small = json.load(f)
+        self.blobs = {}
+
+    @property
+    def columns(self):
+        return list(self.manifest['columns'])
+
+    def _blob(self, name):
+        if name not in self.blobs:
+            entry = self.manifest['columns'][name]
+            offsets = array('I')
+            with open(os.path.join(self.directory, entry['offsets']), 'rb') as f:
+                offsets.frombytes(f.read())
+            if sys.byteorder != 'little':
+                offsets.byteswap()
+            with open(os.path.join(self.directory, entry['data']), 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if offsets[-1] else b''
+            self.blobs[name] = (entry, offsets, data, set(entry['null_rows']))
+        return self.blobs[name]
+
+    def value(self, name, row):
+        """Value of one column in one row (None when absent)"""
+        entry = self.manifest['columns'][name]
+        if entry['kind'] == 'dictionary':
+            column = self.small[name]
+            index = column['indices'][row]
+            return column['dictionary'][index] if index >= 0 else None
+        if entry['kind'] == 'plain':
+            return self.small[name][row]
+        entry, offsets, data, null_rows = self._blob(name)
+        if row in null_rows:
+            return None
+        text = data[offsets[row]:offsets[row + 1]].decode('utf-8')
+        return json.loads(text) if entry['type'] == 'json' else text
+
+    def column(self, name):
+        """All values of a column, dictionary columns decoded"""
+        entry = self.manifest['columns'][name]
+        if entry['kind'] == 'dictionary':
+            dictionary = self.small[name]['dictionary']
+            return [dictionary[index] if index >= 0 else None for index in self.small[name]['indices']]
+        if entry['kind'] == 'plain':
+            return list(self.small[name])
+        return [self.value(name, row) for row in range(self.rows)]
+
+    def records(self, columns=None):
+        """
+        Rebuild cardinal dicts; fields a record didn't have are left out
+
+        Args:
+            columns (list): Columns to include (default: all)
+        """
+        columns = columns or self.columns
+        data = {name: self.column(name) for name in columns}
+        absent = {name: set(self.manifest['columns'][name]['absent_rows']) for name in columns}
+        records = []
+        for row in range(self.rows):
+            record = {}
+            for name in columns:
+                if row in absent[name]:
+                    continue
+                record[name] = data[name][row]
+            records.append(record)
+        return records
+
+    def close(self):
+        for _, _, data, _ in self.blobs.values():
+            if isinstance(data, mmap.mmap):
+                data.close()
+        self.blobs = {}
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the cardinals dataset in a columnar layout")
+    parser.add_argument('input', nargs='?', default='data/backup/cardinals.json',
+                        help="Cardinals JSON file (default: data/backup/cardinals.json)")
+    parser.add_argument('--output-dir', default='data/processed/columnar',
+                        help="Directory to write the export to (default: data/processed/columnar)")
+    parser.add_argument('--format', choices=['columns', 'parquet'], default='columns',
+                        help="columns: manifest + JSON small columns + binary text columns; parquet: needs pyarrow")
+    parser.add_argument('--verify', action='store_true',
+                        help="Read the columns export back and check it matches the input")
+    args = parser.parse_args()
+    if args.format == 'parquet' and not parquet_available():
+        parser.error("the parquet format needs pyarrow (pip install pyarrow)")
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        cardinals = json.load(f)
+
+    if args.format == 'parquet':
+        export_parquet(cardinals, args.output_dir)
+        print(f"Exported {len(cardinals)} cardinals to {args.output_dir} (parquet)")
+        return
+
+    manifest = export_columns(cardinals, args.output_dir)
+    small_size = os.path.getsize(os.path.join(args.output_dir, 'columns.json'))
+    print(f"Exported {len(cardinals)} cardinals to {args.output_dir}: small columns {small_size / 1024:.1f} KiB, "
+          f"{sum(1 for c in manifest['columns'].values() if c['kind'] == 'blob')} lazily loaded columns")
+
+    if args.verify:
+        dataset = ColumnarDataset(args.output_dir)
+        records = dataset.records()
+        dataset.close()
+        mismatches = sum(1 for original, record in zip(cardinals, records) if original != record)
+        if mismatches or len(records) != len(cardinals):
+            raise SystemExit(f"Verification failed: {mismatches} records differ")
+        print("Verified: the export reads back identical to the input")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,573 @@
+"""
+Content-addressed, versioned store of the cardinals dataset.
+
+Each distinct cardinal record is stored once, as an object named after its
+content hash; a snapshot is a small manifest listing the (key, hash) of
+every record of one version of a dataset:
+
+    data/store/objects/ab/abcdef....json
+    data/store/snapshots/<dataset>/<YYYYmmdd_HHMMSS>.json
+
+A run that changes five cardinals adds five objects and one manifest
+instead of another full copy, so disk use and backup time (the objects
+never change once written) grow with the amount of change, not with the
+number of runs. Snapshots are referred to as:
+
+    scrape                      the latest snapshot of the scrape dataset
+    scrape~2                    two snapshots before the latest
+    scrape@2025-04-26T22:57     the latest one taken at or before that time
+    scrape/20250426_225735      exactly that snapshot
+
+Run from the repository root:
+
+    python dataset_store.py list
+    python dataset_store.py diff scrape~1 scrape
+    python dataset_store.py checkout enhance -o data/backup/cardinals.json
+    python dataset_store.py import --remove
+    python dataset_store.py gc --keep 10
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = 'data/store'
+
+# Snapshot ids are their creation time; they sort chronologically
+SNAPSHOT_ID_FORMAT = '%Y%m%d_%H%M%S'
+
+# Objects written more recently than this are never garbage collected, so a
+# run still writing its snapshot doesn't lose records it has already stored
+GC_GRACE = 3600
+
+# Full dataset copies written before the store existed, and the dataset each one belongs to
+LEGACY_FILES = [
+    ('data/raw/cardinals_complete_*.json', 'scrape'),
+    ('data/raw/cardinals_progress_*.json', 'scrape_progress'),
+    ('data/raw/cardinals_raw_*.json', 'getdata'),
+    ('data/raw/cardinals_[0-9]*.json', 'listing'),
+    ('data/enhanced/cardinals_enhanced_progress_*.json', 'enhance_progress'),
+    ('data/enhanced/cardinals_enhanced_[0-9]*.json', 'enhance'),
+    ('data/backup/cardinals.json', 'backup'),
+]
+
+# Legacy files import --remove leaves in place: the server reads the backup
+KEEP_LEGACY_DATASETS = {'backup'}
+
+def content_hash(content):
+    """sha256 of a page body or any JSON-serialisable value"""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    elif not isinstance(content, bytes):
+        content = json.dumps(content, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(content).hexdigest()
+
+def record_key(cardinal):
+    """Stable identity of a cardinal record across runs and dataset versions"""
+    return cardinal.get('biography_url') or cardinal.get('name')
+
+def parse_time(value):
+    """
+    Snapshot id matching a point in time: YYYYmmdd_HHMMSS, YYYYmmdd or an
+    ISO date or datetime (a bare date means the end of that day)
+
+    Raises:
+        ValueError: value isn't a time in one of these forms
+    """
+    if re.fullmatch(r'\d{8}_\d{6}', value):
+        return value
+    if re.fullmatch(r'\d{8}', value):
+        return f"{value}_235959"
+    moment = datetime.fromisoformat(value)
+    if re.fullmatch(r'\d{4}-\d{2}-\d{2}', value):
+        moment = moment.replace(hour=23, minute=59, second=59)
+    return moment.strftime(SNAPSHOT_ID_FORMAT)
+
+def legacy_time(path):
+    """Creation time of a legacy file: the timestamp in its name, else its modification time"""
+    match = re.search(r'(\d{8}_\d{6})', os.path.basename(path))
+    if match:
+        return datetime.strptime(match.group(1), SNAPSHOT_ID_FORMAT)
+    return datetime.fromtimestamp(os.path.getmtime(path))
+
+class SnapshotWriter:
+    """
+    Builds a snapshot record by record, storing each record as it is added,
+    for writers that stream their output (the pipeline)
+    """
+
+    def __init__(self, store, dataset, created_at=None):
+        self.store = store
+        self.dataset = dataset
+        self.created_at = created_at
+        self.records = []
+
+    def add(self, record):
+        self.records.append([record_key(record), self.store.put(record)])
+
+    def commit(self, source=None):
+        """
+        Write the manifest
+
+        Returns:
+            str: Reference of the new snapshot, or of the previous one when
+                nothing changed since
+        """
+        return self.store.write_manifest(self.dataset, self.records, source, self.created_at)
+
+class DatasetStore:
+    """
+    Deduplicated, versioned storage of cardinal records.
+
+    Records are hashed with content_hash (key order doesn't
+    matter) and written once; objects keep the key order of the first copy
+    stored. A snapshot identical to the dataset's previous one isn't written
+    again. Objects and manifests are written to a temporary file and renamed,
+    so a crash never leaves a half-written one behind.
+    """
+
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.snapshots_dir = os.path.join(root, 'snapshots')
+        self.lock = threading.Lock()
+
+    def object_path(self, record_hash):
+        return os.path.join(self.objects_dir, record_hash[:2], f"{record_hash}.json")
+
+    def put(self, record):
+        """
+        Store a record unless an identical one is stored already
+
+        Returns:
+            str: The record's hash
+        """
+        record_hash = content_hash(record)
+        path = self.object_path(record_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_file = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(record, f, ensure_ascii=False)
+            os.replace(tmp_file, path)
+        return record_hash
+
+    def get(self, record_hash):
+        with open(self.object_path(record_hash), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def snapshot(self, dataset, created_at=None):
+        """SnapshotWriter adding records to a new snapshot of dataset"""
+        return SnapshotWriter(self, dataset, created_at)
+
+    def commit(self, dataset, records, source=None, created_at=None):
+        """
+        Store a version of a dataset
+
+        Args:
+            dataset (str): Dataset name (scrape, enhance, ...)
+            records (list): Cardinal dicts, in order
+            source (str): File or script the records came from
+            created_at (datetime): Time of the version (default: now)
+
+        Returns:
+            str: Reference of the new snapshot, or of the previous one when
+                nothing changed since
+        """
+        writer = self.snapshot(dataset, created_at)
+        for record in records:
+            writer.add(record)
+        return writer.commit(source)
+
+    def write_manifest(self, dataset, records, source=None, created_at=None):
+        created_at = created_at or datetime.now()
+        snapshot_id = created_at.strftime(SNAPSHOT_ID_FORMAT)
+        with self.lock:
+            previous = self._at(dataset, snapshot_id)
+            if previous and self.manifest(dataset, previous)['records'] == records:
+                logger.info(f"{dataset} is unchanged since snapshot {dataset}/{previous}")
+                return f"{dataset}/{previous}"
+            directory = os.path.join(self.snapshots_dir, dataset)
+            os.makedirs(directory, exist_ok=True)
+            # Two versions within one second: keep both, the later one wins
+            base_id, suffix = snapshot_id, 1
+            while os.path.exists(os.path.join(directory, f"{snapshot_id}.json")):
+                snapshot_id = f"{base_id}_{suffix}"
+                suffix += 1
+            manifest = {
+                'dataset': dataset,
+                'id': snapshot_id,
+                'created_at': created_at.isoformat(timespec='seconds'),
+                'source': source,
+                'records': records
+            }
+            path = os.path.join(directory, f"{snapshot_id}.json")
+            with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(f"{path}.tmp", path)
+        logger.info(f"Stored snapshot {dataset}/{snapshot_id} with {len(records)} records")
+        return f"{dataset}/{snapshot_id}"
+
+    def datasets(self):
+        if not os.path.isdir(self.snapshots_dir):
+            return []
+        return sorted(name for name in os.listdir(self.snapshots_dir)
+                      if os.path.isdir(os.path.join(self.snapshots_dir, name)))
+
+    def snapshot_ids(self, dataset):
+        """Ids of a dataset's snapshots, oldest first"""
+        directory = os.path.join(self.snapshots_dir, dataset)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-len('.json')] for name in os.listdir(directory) if name.endswith('.json'))
+
+    def _at(self, dataset, snapshot_id):
+        """Latest snapshot id of dataset at or before snapshot_id, or None"""
+        earlier = [other for other in self.snapshot_ids(dataset) if other[:15] <= snapshot_id[:15]]
+        return earlier[-1] if earlier else None
+
+    def manifest(self, dataset, snapshot_id):
+        with open(os.path.join(self.snapshots_dir, dataset, f"{snapshot_id}.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def resolve(self, ref):
+        """
+        Manifest of the snapshot a reference points at
+
+        Raises:
+            KeyError: No such snapshot
+            ValueError: Malformed reference
+        """
+        dataset, snapshot_id = ref, None
+        if '/' in ref:
+            dataset, snapshot_id = ref.split('/', 1)
+        elif '@' in ref:
+            dataset, moment = ref.split('@', 1)
+            snapshot_id = self._at(dataset, parse_time(moment))
+            if snapshot_id is None:
+                raise KeyError(f"No snapshot of {dataset} at or before {moment}")
+        else:
+            back = 0
+            if '~' in ref:
+                dataset, back = ref.split('~', 1)
+                back = int(back)
+            ids = self.snapshot_ids(dataset)
+            if back >= len(ids):
+                raise KeyError(f"No snapshot {ref} ({len(ids)} snapshots of {dataset})")
+            snapshot_id = ids[-1 - back]
+        if snapshot_id not in self.snapshot_ids(dataset):
+            raise KeyError(f"No snapshot {dataset}/{snapshot_id}")
+        return self.manifest(dataset, snapshot_id)
+
+    def latest(self, dataset):
+        """Manifest of the latest snapshot of dataset, or None"""
+        ids = self.snapshot_ids(dataset)
+        return self.manifest(dataset, ids[-1]) if ids else None
+
+    def read(self, ref):
+        """
+        The records of a snapshot, in order
+
+        Args:
+            ref (str or dict): Snapshot reference or manifest
+        """
+        manifest = self.resolve(ref) if isinstance(ref, str) else ref
+        return [self.get(record_hash) for _, record_hash in manifest['records']]
+
+    def diff(self, old_ref, new_ref):
+        """
+        Compare two snapshots record by record
+
+        Only records whose hash differs are read, so comparing two snapshots
+        costs as much as the change between them.
+
+        Returns:
+            dict: added, removed and modified as in change_detection.diff_datasets
+        """
+        old_manifest, new_manifest = self.resolve(old_ref), self.resolve(new_ref)
+        old = dict((key, record_hash) for key, record_hash in old_manifest['records'])
+        new = dict((key, record_hash) for key, record_hash in new_manifest['records'])
+        modified = []
+        for key, record_hash in new.items():
+            if key not in old or old[key] == record_hash:
+                continue
+            before, after = self.get(old[key]), self.get(record_hash)
+            fields = sorted(field for field in set(before) | set(after) if before.get(field) != after.get(field))
+            modified.append({'key': key, 'name': after.get('name'), 'fields': fields})
+        return {
+            'from': f"{old_manifest['dataset']}/{old_manifest['id']}",
+            'to': f"{new_manifest['dataset']}/{new_manifest['id']}",
+            'added': [key for key in new if key not in old],
+            'removed': [key for key in old if key not in new],
+            'modified': modified
+        }
+
+    def _object_files(self):
+        for path in glob.glob(os.path.join(self.objects_dir, '*', '*')):
+            yield path
+
+    def stats(self):
+        """
+        Returns:
+            dict: snapshots, records (summed over snapshots), objects, bytes
+                on disk and the bytes the snapshots would take as full copies
+        """
+        sizes = {}
+        for path in self._object_files():
+            if path.endswith('.json'):
+                sizes[os.path.basename(path)[:-len('.json')]] = os.path.getsize(path)
+        snapshots = records = full_bytes = 0
+        stored_bytes = sum(sizes.values())
+        for dataset in self.datasets():
+            for snapshot_id in self.snapshot_ids(dataset):
+                manifest = self.manifest(dataset, snapshot_id)
+                snapshots += 1
+                records += len(manifest['records'])
+                full_bytes += sum(sizes.get(record_hash, 0) for _, record_hash in manifest['records'])
+                stored_bytes += os.path.getsize(os.path.join(self.snapshots_dir, dataset, f"{snapshot_id}.json"))
+        return {'snapshots': snapshots, 'records': records, 'objects': len(sizes),
+                'stored_bytes': stored_bytes, 'full_copy_bytes': full_bytes}
+
+    def gc(self, keep=None, older_than_days=None, dry_run=False):
+        """
+        Drop old snapshots and delete the objects no snapshot refers to
+
+        The latest snapshot of every dataset is always kept.
+
+        Args:
+            keep (int): Keep only this many snapshots per dataset
+            older_than_days (float): Drop snapshots older than this
+            dry_run (bool): Only report what would be deleted
+
+        Returns:
+            dict: snapshots_removed, objects_removed and bytes_freed
+        """
+        cutoff = None
+        if older_than_days is not None:
+            cutoff = datetime.fromtimestamp(time.time() - older_than_days * 86400).strftime(SNAPSHOT_ID_FORMAT)
+        removed_snapshots = 0
+        bytes_freed = 0
+        referenced = set()
+        with self.lock:
+            for dataset in self.datasets():
+                ids = self.snapshot_ids(dataset)
+                for position, snapshot_id in enumerate(ids):
+                    latest = position == len(ids) - 1
+                    expired = (keep is not None and position < len(ids) - keep) or \
+                              (cutoff is not None and snapshot_id[:15] < cutoff)
+                    path = os.path.join(self.snapshots_dir, dataset, f"{snapshot_id}.json")
+                    if expired and not latest:
+                        removed_snapshots += 1
+                        bytes_freed += os.path.getsize(path)
+                        if not dry_run:
+                            os.remove(path)
+                        continue
+                    referenced.update(record_hash for _, record_hash in self.manifest(dataset, snapshot_id)['records'])
+
+            removed_objects = 0
+            grace_start = time.time() - GC_GRACE
+            for path in self._object_files():
+                name = os.path.basename(path)
+                unreferenced = name.endswith('.json') and name[:-len('.json')] not in referenced
+                # Leftovers of writes interrupted by a crash
+                abandoned = name.endswith('.tmp')
+                if (unreferenced or abandoned) and os.path.getmtime(path) < grace_start:
+                    if unreferenced:
+                        removed_objects += 1
+                    bytes_freed += os.path.getsize(path)
+                    if not dry_run:
+                        os.remove(path)
+        logger.info(f"Garbage collection {'would remove' if dry_run else 'removed'} {removed_snapshots} snapshots "
+                    f"and {removed_objects} objects ({bytes_freed / 1024:.1f} KiB)")
+        return {'snapshots_removed': removed_snapshots, 'objects_removed': removed_objects, 'bytes_freed': bytes_freed}
+
+    def verify(self):
+        """
+        Check that every object matches its hash and every referenced object exists
+
+        Returns:
+            list: Descriptions of the problems found
+        """
+        problems = []
+        for path in self._object_files():
+            name = os.path.basename(path)
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    record = json.load(f)
+            except (OSError, ValueError) as e:
+                problems.append(f"{path}: unreadable ({str(e)})")
+                continue
+            if content_hash(record) != name[:-len('.json')]:
+                problems.append(f"{path}: content doesn't match its hash")
+        for dataset in self.datasets():
+            for snapshot_id in self.snapshot_ids(dataset):
+                missing = [record_hash for _, record_hash in self.manifest(dataset, snapshot_id)['records']
+                           if not os.path.exists(self.object_path(record_hash))]
+                if missing:
+                    problems.append(f"{dataset}/{snapshot_id}: {len(missing)} records missing")
+        return problems
+
+    def import_legacy(self, patterns=LEGACY_FILES, remove=False):
+        """
+        Store the full dataset copies written before the store existed as
+        snapshots dated by their file names
+
+        Args:
+            patterns (list): (glob, dataset) of the files to import
+            remove (bool): Delete each timestamped file once its snapshot
+                reads back identical (the backup is always kept)
+
+        Returns:
+            list: (path, snapshot reference) of the imported files
+        """
+        files = []
+        seen = set()
+        for pattern, dataset in patterns:
+            for path in glob.glob(pattern):
+                if path in seen or os.path.basename(path).startswith('cardinals_diff_'):
+                    continue
+                seen.add(path)
+                files.append((legacy_time(path), path, dataset))
+
+        imported = []
+        for created_at, path, dataset in sorted(files):
+            with open(path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+            if not isinstance(records, list):
+                logger.warning(f"Skipping {path}: not a list of cardinals")
+                continue
+            records = [record for record in records if record is not None]
+            ref = self.commit(dataset, records, source=path, created_at=created_at)
+            imported.append((path, ref))
+            if remove and dataset not in KEEP_LEGACY_DATASETS:
+                if self.read(ref) != records:
+                    raise RuntimeError(f"Snapshot {ref} doesn't read back identical to {path}; not removing it")
+                os.remove(path)
+                logger.info(f"Removed {path}, now stored as {ref}")
+        return imported
+
+def commit_dataset(dataset, records, source=None, root=STORE_DIR):
+    """Store a version of a dataset in the default store; returns the snapshot reference"""
+    return DatasetStore(root).commit(dataset, records, source)
+
+def latest_records(dataset, root=STORE_DIR):
+    """
+    Returns:
+        tuple: (records, snapshot reference) of the latest snapshot of
+            dataset, or (None, None) when there is none
+    """
+    store = DatasetStore(root)
+    manifest = store.latest(dataset)
+    if manifest is None:
+        return None, None
+    return store.read(manifest), f"{dataset}/{manifest['id']}"
+
+def read_dataset(reference, root=STORE_DIR):
+    """
+    Records of a dataset file or of a snapshot reference
+
+    Returns:
+        list: Cardinal dicts, or None when the file or snapshot is gone
+    """
+    if os.path.exists(reference):
+        with open(reference, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    try:
+        return DatasetStore(root).read(reference)
+    except (KeyError, ValueError, OSError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Versioned, deduplicated store of the cardinals dataset")
+    parser.add_argument('--store', default=STORE_DIR, help=f"Store directory (default: {STORE_DIR})")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help="List the snapshots and how much space the store saves")
+    show = subparsers.add_parser('show', help="Print the records of a snapshot as JSON")
+    show.add_argument('ref', help="Snapshot (dataset, dataset~N, dataset@TIME or dataset/ID)")
+    checkout = subparsers.add_parser('checkout', help="Write a snapshot to a JSON file")
+    checkout.add_argument('ref', help="Snapshot (dataset, dataset~N, dataset@TIME or dataset/ID)")
+    checkout.add_argument('-o', '--output', required=True, help="File to write")
+    diff = subparsers.add_parser('diff', help="Show the records added, removed and modified between two snapshots")
+    diff.add_argument('old', help="Earlier snapshot")
+    diff.add_argument('new', help="Later snapshot")
+    commit = subparsers.add_parser('commit', help="Store a dataset file as a new snapshot")
+    commit.add_argument('dataset', help="Dataset name (scrape, enhance, backup, ...)")
+    commit.add_argument('input', help="Cardinals JSON file")
+    import_files = subparsers.add_parser('import', help="Store the timestamped dataset copies in data/ as snapshots")
+    import_files.add_argument('--remove', action='store_true',
+                              help="Delete each copy once stored (data/backup/cardinals.json is kept)")
+    gc = subparsers.add_parser('gc', help="Drop old snapshots and the records only they refer to")
+    gc.add_argument('--keep', type=int, default=None, help="Snapshots kept per dataset")
+    gc.add_argument('--older-than', type=float, default=None, metavar='DAYS',
+                    help="Drop snapshots older than this many days")
+    gc.add_argument('--dry-run', action='store_true', help="Only report what would be deleted")
+    subparsers.add_parser('verify', help="Check every record against its hash")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s - %(message)s')
+
+    store = DatasetStore(args.store)
+    try:
+        if args.command == 'list':
+            for dataset in store.datasets():
+                for snapshot_id in store.snapshot_ids(dataset):
+                    manifest = store.manifest(dataset, snapshot_id)
+                    print(f"{dataset + '/' + snapshot_id:36} {len(manifest['records']):>5} records  {manifest.get('source') or ''}")
+            stats = store.stats()
+            print(f"{stats['snapshots']} snapshots of {stats['records']} records stored as {stats['objects']} objects: "
+                  f"{stats['stored_bytes'] / 1024:.1f} KiB ({stats['full_copy_bytes'] / 1024:.1f} KiB as full copies)")
+        elif args.command == 'show':
+            print(json.dumps(store.read(args.ref), ensure_ascii=False, indent=2))
+        elif args.command == 'checkout':
+            records = store.read(args.ref)
+            tmp_file = f"{args.output}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(records, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, args.output)
+            print(f"Wrote {len(records)} records of {args.ref} to {args.output}")
+        elif args.command == 'diff':
+            changes = store.diff(args.old, args.new)
+            print(f"{changes['from']} -> {changes['to']}: {len(changes['added'])} added, "
+                  f"{len(changes['removed'])} removed, {len(changes['modified'])} modified")
+            for key in changes['added']:
+                print(f"  + {key}")
+            for key in changes['removed']:
+                print(f"  - {key}")
+            for entry in changes['modified']:
+                print(f"  ~ {entry['name'] or entry['key']}: {', '.join(entry['fields'])}")
+        elif args.command == 'commit':
+            with open(args.input, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+            print(f"Stored {args.input} as {store.commit(args.dataset, records, source=args.input)}")
+        elif args.command == 'import':
+            imported = store.import_legacy(remove=args.remove)
+            for path, ref in imported:
+                print(f"{path} -> {ref}")
+            stats = store.stats()
+            print(f"Imported {len(imported)} files; the store holds {stats['objects']} distinct records "
+                  f"in {stats['stored_bytes'] / 1024:.1f} KiB ({stats['full_copy_bytes'] / 1024:.1f} KiB as full copies)")
+        elif args.command == 'gc':
+            result = store.gc(args.keep, args.older_than, args.dry_run)
+            print(f"{'Would remove' if args.dry_run else 'Removed'} {result['snapshots_removed']} snapshots and "
+                  f"{result['objects_removed']} records, {result['bytes_freed'] / 1024:.1f} KiB")
+        else:
+            problems = store.verify()
+            for problem in problems:
+                print(problem)
+            print(f"{len(problems)} problems found")
+            return 1 if problems else 0
+    except (KeyError, ValueError) as e:
+        parser.error(str(e).strip('"\''))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,28 +1,56 @@
 import json
 import os
-import time
 import logging
 from datetime import datetime
 import requests
-from bs4 import BeautifulSoup
 import re
+import glob
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from urllib.parse import urlencode, quote, unquote
+import http_client
+import html_parser
+import metrics
+import log_setup
+import bio_extraction
+import change_detection
+import dataset_store
+from dataset_store import record_key
+import search_index
+from search_cache import SearchCache
+
+# Online sources queried for each cardinal, with the additional_info key each one fills
+SOURCES = {
+    'wikipedia': 'wikipedia',
+    'news': 'recent_news',
+    'google': 'google_results'
+}
+
+# Maximum concurrent requests per source, so a throttled source can't hold up the others
+SOURCE_CONCURRENCY = {
+    'wikipedia': 4,
+    'news': 2,
+    'google': 2
+}
+
+_source_pools = {}
+_source_pools_lock = threading.Lock()
+
+# Search results reused across cardinals and runs (Google, Google News and Wikipedia)
+search_cache = SearchCache()
+
+# Per-item search messages go to the enrich stage logger so their verbosity can be set separately
+enrich_logger = log_setup.stage_logger('enrich')
+
+# Replaced by the configured logger in main(); the default lets other scripts import these functions
+logger = logging.getLogger(__name__)
 
 # Set up logging
-def setup_logging():
+def setup_logging(stage_levels=None, rate_limit=None, sample_every=None):
     """Set up logging configuration"""
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
-    
-    log_file = f'logs/enhance_cardinals_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log'
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler()
-        ]
-    )
-    return logging.getLogger(__name__)
+    return log_setup.setup_logging('enhance_cardinals', __name__, stage_levels, rate_limit, sample_every)
 
 def create_directory_structure():
     """Create the necessary directory structure for storing data"""
@@ -47,8 +75,14 @@ def load_cardinals_data(file_path):
         logger.error(f"Error loading cardinals data from {file_path}: {str(e)}")
         return []
 
+@lru_cache(maxsize=None)
 def format_cardinal_name(name):
-    """Format the cardinal's name for better search results"""
+    """
+    Format the cardinal's name for better search results
+    
+    Memoized since every source formats the same names; treat the returned
+    dict as read-only.
+    """
     # Remove "Card." prefix
     name = re.sub(r'Card\.\s+', '', name)
     
@@ -98,15 +132,158 @@ def format_cardinal_name(name):
         'distinctive_name': distinctive_name
     }
 
+def parse_html(text, url):
+    """Parse a fetched page with the html_parser backend, timed as the parse stage of its source"""
+    with metrics.timer('parse', metrics.source_for_url(url)):
+        return html_parser.parse(text)
+
+def wikipedia_opensearch(search_query, headers=None, timeout=5):
+    """
+    Article URL of the first opensearch hit for a query, through the search cache
+
+    Returns:
+        str: The URL, '' when nothing matched, or None when the request failed
+    """
+    def fetch():
+        search_url = f"https://en.wikipedia.org/w/api.php?action=opensearch&search={search_query.replace(' ', '+')}&limit=1&namespace=0&format=json"
+        enrich_logger.info(f"Wikipedia search URL: {search_url}")
+        search_response = http_client.get(search_url, headers=headers, timeout=timeout, cache=True)
+        if search_response.status_code != 200:
+            return None
+        search_data = search_response.json()
+        if enrich_logger.isEnabledFor(logging.DEBUG):
+            enrich_logger.debug(f"Wikipedia API response: {str(search_data)[:200]}...")
+        if search_data and len(search_data) > 3 and search_data[1] and search_data[3]:
+            return search_data[3][0]
+        return ''
+    return search_cache.get_or_fetch('wikipedia', search_query, fetch)
+
+def find_wikipedia_url(cardinal_name, country=None, headers=None, timeout=5):
+    """
+    Find a cardinal's Wikipedia article URL with opensearch, trying progressively simpler names
+    
+    Returns:
+        str: The article URL, '' when every search completed without finding
+            one, or None when a search failed and nothing was found
+    """
+    name_formats = format_cardinal_name(cardinal_name)
+    formatted_name = name_formats['full_name']
+    simple_name = name_formats['simple_name']
+    distinctive_name = name_formats['distinctive_name']
+    
+    # Try several search approaches
+    wiki_url = None
+    failed = False
+
+    # Approach 1: Direct API search with full name and "cardinal"
+    try:
+        wiki_url = wikipedia_opensearch(f"{formatted_name} cardinal", headers, timeout)
+        if wiki_url:
+            enrich_logger.info(f"Found Wikipedia URL: {wiki_url}")
+    except requests.exceptions.RequestException as e:
+        enrich_logger.warning(f"Error with first Wikipedia search approach: {str(e)}")
+    failed = failed or wiki_url is None
+
+    # Approach 2: Try with simple name if full name didn't work
+    if not wiki_url:
+        try:
+            search_query = f"{simple_name} cardinal"
+            if country:
+                search_query += f" {country}"
+            wiki_url = None
+            wiki_url = wikipedia_opensearch(search_query, headers, timeout)
+            if wiki_url:
+                enrich_logger.info(f"Found Wikipedia URL with simple name: {wiki_url}")
+        except requests.exceptions.RequestException as e:
+            enrich_logger.warning(f"Error with second Wikipedia search approach: {str(e)}")
+        failed = failed or wiki_url is None
+
+    # Approach 3: Try with just the distinctive part of the name
+    if not wiki_url:
+        try:
+            search_query = f"{distinctive_name} cardinal"
+            if country:
+                search_query += f" {country}"
+            wiki_url = None
+            wiki_url = wikipedia_opensearch(search_query, headers, timeout)
+            if wiki_url:
+                enrich_logger.info(f"Found Wikipedia URL with distinctive name: {wiki_url}")
+        except requests.exceptions.RequestException as e:
+            enrich_logger.warning(f"Error with third Wikipedia search approach: {str(e)}")
+        failed = failed or wiki_url is None
+
+    if wiki_url:
+        return wiki_url
+    return None if failed else ''
+
+def fetch_wikipedia_article(wiki_url, headers=None, timeout=5):
+    """
+    Summary, infobox and image of a Wikipedia article, through the search cache
+
+    Returns:
+        dict: wiki_info, or None when the page could not be fetched
+    """
+    enrich_logger.info(f"Fetching Wikipedia page: {wiki_url}")
+    page_response = http_client.get(wiki_url, headers=headers, timeout=timeout, cache=True)
+    if page_response.status_code != 200:
+        return None
+    return parse_wikipedia_article(page_response.text, wiki_url)
+
+def parse_wikipedia_article(html, wiki_url):
+    """Summary, infobox and image of a Wikipedia article page"""
+    soup = parse_html(html, wiki_url)
+    
+    # Get the first paragraph (usually contains a brief biography)
+    first_para = None
+    for p in soup.select('p'):
+        if p.text().strip():
+            first_para = p.text().strip()
+            break
+    
+    # Get the infobox data (right sidebar with key facts)
+    infobox = soup.select_one('table.infobox')
+    infobox_data = {}
+    
+    if infobox:
+        rows = infobox.select('tr')
+        for row in rows:
+            header = row.select_one('th')
+            value = row.select_one('td')
+            if header and value:
+                header_text = header.text().strip()
+                value_text = value.text().strip()
+                infobox_data[header_text] = value_text
+    
+    # Get the image URL if available
+    image_url = None
+    if infobox:
+        image = infobox.select_one('img')
+        if image and image.attr('src') is not None:
+            src = image.attr('src')
+            image_url = f"https:{src}" if src.startswith('//') else src
+    
+    # Compile the results
+    return {
+        'wikipedia_url': wiki_url,
+        'wikipedia_summary': first_para,
+        'wikipedia_infobox': infobox_data,
+        'wikipedia_image': image_url
+    }
+
 def search_wikipedia(cardinal_name, country=None):
-    """Search Wikipedia for information about a cardinal"""
+    """
+    Search Wikipedia for information about a cardinal
+    
+    Returns:
+        dict: wiki_info, empty when there is no article, or None when a
+            lookup failed
+    """
     # Format the name for better search results
     name_formats = format_cardinal_name(cardinal_name)
     formatted_name = name_formats['full_name']
     simple_name = name_formats['simple_name']
-    distinctive_name = name_formats['distinctive_name']
     
-    logger.info(f"Searching Wikipedia for: {formatted_name} (simple: {simple_name})")
+    enrich_logger.info(f"Searching Wikipedia for: {formatted_name} (simple: {simple_name})")
     
     try:
         # Set up headers and timeout
@@ -114,125 +291,495 @@ def search_wikipedia(cardinal_name, country=None):
         headers = {"User-Agent": user_agent}
         timeout = 5  # 5-second timeout
         
-        # Try several search approaches
-        wiki_url = None
-        wiki_data = None
-        
-        # Approach 1: Direct API search with full name and "cardinal"
-        try:
-            search_query = f"{formatted_name} cardinal"
-            search_url = f"https://en.wikipedia.org/w/api.php?action=opensearch&search={search_query.replace(' ', '+')}&limit=1&namespace=0&format=json"
-            logger.info(f"Wikipedia search URL #1: {search_url}")
-            search_response = requests.get(search_url, headers=headers, timeout=timeout)
-            
-            if search_response.status_code == 200:
-                search_data = search_response.json()
-                logger.info(f"Wikipedia API response #1: {str(search_data)[:200]}...")
-                if search_data and len(search_data) > 3 and search_data[1] and search_data[3]:
-                    wiki_url = search_data[3][0]
-                    logger.info(f"Found Wikipedia URL: {wiki_url}")
-        except requests.exceptions.RequestException as e:
-            logger.warning(f"Error with first Wikipedia search approach: {str(e)}")
+        # Resolve the article with up to three opensearch queries
+        wiki_url = find_wikipedia_url(cardinal_name, country, headers, timeout)
         
-        # Approach 2: Try with simple name if full name didn't work
-        if not wiki_url:
-            try:
-                search_query = f"{simple_name} cardinal"
-                if country:
-                    search_query += f" {country}"
-                search_url = f"https://en.wikipedia.org/w/api.php?action=opensearch&search={search_query.replace(' ', '+')}&limit=1&namespace=0&format=json"
-                logger.info(f"Wikipedia search URL #2: {search_url}")
-                search_response = requests.get(search_url, headers=headers, timeout=timeout)
-                
-                if search_response.status_code == 200:
-                    search_data = search_response.json()
-                    logger.info(f"Wikipedia API response #2: {str(search_data)[:200]}...")
-                    if search_data and len(search_data) > 3 and search_data[1] and search_data[3]:
-                        wiki_url = search_data[3][0]
-                        logger.info(f"Found Wikipedia URL with simple name: {wiki_url}")
-            except requests.exceptions.RequestException as e:
-                logger.warning(f"Error with second Wikipedia search approach: {str(e)}")
-        
-        # Approach 3: Try with just the distinctive part of the name
-        if not wiki_url:
-            try:
-                search_query = f"{distinctive_name} cardinal"
-                if country:
-                    search_query += f" {country}"
-                search_url = f"https://en.wikipedia.org/w/api.php?action=opensearch&search={search_query.replace(' ', '+')}&limit=1&namespace=0&format=json"
-                logger.info(f"Wikipedia search URL #3: {search_url}")
-                search_response = requests.get(search_url, headers=headers, timeout=timeout)
-                
-                if search_response.status_code == 200:
-                    search_data = search_response.json()
-                    logger.info(f"Wikipedia API response #3: {str(search_data)[:200]}...")
-                    if search_data and len(search_data) > 3 and search_data[1] and search_data[3]:
-                        wiki_url = search_data[3][0]
-                        logger.info(f"Found Wikipedia URL with distinctive name: {wiki_url}")
-            except requests.exceptions.RequestException as e:
-                logger.warning(f"Error with third Wikipedia search approach: {str(e)}")
+        if wiki_url is None:
+            enrich_logger.warning(f"Wikipedia search failed for {formatted_name}")
+            return None
         
         # If we found a Wikipedia URL, fetch the page content
         if wiki_url:
             try:
-                logger.info(f"Fetching Wikipedia page: {wiki_url}")
-                page_response = requests.get(wiki_url, headers=headers, timeout=timeout)
-                if page_response.status_code == 200:
-                    soup = BeautifulSoup(page_response.text, 'html.parser')
-                    
-                    # Get the first paragraph (usually contains a brief biography)
-                    first_para = None
-                    for p in soup.find_all('p'):
-                        if p.text.strip():
-                            first_para = p.text.strip()
-                            break
-                    
-                    # Get the infobox data (right sidebar with key facts)
-                    infobox = soup.find('table', {'class': 'infobox'})
-                    infobox_data = {}
-                    
-                    if infobox:
-                        rows = infobox.find_all('tr')
-                        for row in rows:
-                            header = row.find('th')
-                            value = row.find('td')
-                            if header and value:
-                                header_text = header.text.strip()
-                                value_text = value.text.strip()
-                                infobox_data[header_text] = value_text
-                    
-                    # Get the image URL if available
-                    image_url = None
-                    if infobox:
-                        image = infobox.find('img')
-                        if image and 'src' in image.attrs:
-                            image_url = f"https:{image['src']}" if image['src'].startswith('//') else image['src']
-                    
-                    # Compile the results
-                    wiki_info = {
-                        'wikipedia_url': wiki_url,
-                        'wikipedia_summary': first_para,
-                        'wikipedia_infobox': infobox_data,
-                        'wikipedia_image': image_url
-                    }
-                    
-                    logger.info(f"Found Wikipedia information for {formatted_name}")
-                    return wiki_info
+                wiki_info = search_cache.get_or_fetch(
+                    'wikipedia_page', wiki_url, lambda: fetch_wikipedia_article(wiki_url, headers, timeout))
             except requests.exceptions.RequestException as e:
-                logger.warning(f"Error fetching Wikipedia page content: {str(e)}")
+                enrich_logger.warning(f"Error fetching Wikipedia page content: {str(e)}")
+                return None
+            if wiki_info is None:
+                enrich_logger.warning(f"Could not fetch the Wikipedia page of {formatted_name}")
+                return None
+            if wiki_info:
+                enrich_logger.info(f"Found Wikipedia information for {formatted_name}")
+                return wiki_info
         
-        logger.warning(f"No Wikipedia results found for {formatted_name}")
+        enrich_logger.warning(f"No Wikipedia results found for {formatted_name}")
         return {}
     
     except Exception as e:
-        logger.error(f"Error searching Wikipedia for {formatted_name}: {str(e)}")
+        enrich_logger.error(f"Error searching Wikipedia for {formatted_name}: {str(e)}")
+        return None
+
+# MediaWiki action API endpoint and the maximum number of titles per query
+WIKIPEDIA_API_URL = 'https://en.wikipedia.org/w/api.php'
+WIKIPEDIA_BATCH_SIZE = 50
+
+# Row labels the article pages show for the infobox template parameters
+# ({{Infobox Christian leader}} and its relatives), so the batched lookup
+# stores the same wikipedia_infobox keys as the page scraper. Parameters
+# sharing a label are joined in the order given here.
+INFOBOX_LABELS = {
+    'church': 'Church',
+    'archdiocese': 'Archdiocese',
+    'diocese': 'Diocese',
+    'province': 'Province',
+    'metropolis': 'Metropolis',
+    'see': 'See',
+    'title': 'Title',
+    'appointed': 'Appointed',
+    'elected': 'Elected',
+    'enthroned': 'Enthroned',
+    'installed': 'Installed',
+    'term_start': 'Term started',
+    'term_end': 'Term ended',
+    'ended': 'Term ended',
+    'quashed': 'Quashed',
+    'predecessor': 'Predecessor',
+    'successor': 'Successor',
+    'previous_post': 'Previous post(s)',
+    'other_post': 'Other post(s)',
+    'ordination': 'Ordination',
+    'ordained_by': 'Ordination',
+    'consecration': 'Consecration',
+    'consecrated_by': 'Consecration',
+    'cardinal': 'Created cardinal',
+    'created_cardinal_by': 'Created cardinal',
+    'rank': 'Rank',
+    'birth_name': 'Born',
+    'birth_date': 'Born',
+    'birth_place': 'Born',
+    'death_date': 'Died',
+    'death_place': 'Died',
+    'buried': 'Buried',
+    'nationality': 'Nationality',
+    'religion': 'Denomination',
+    'denomination': 'Denomination',
+    'residence': 'Residence',
+    'parents': 'Parents',
+    'occupation': 'Occupation',
+    'profession': 'Profession',
+    'education': 'Education',
+    'alma_mater': 'Alma mater',
+    'motto': 'Motto',
+    'feast_day': 'Feast day',
+    'venerated': 'Venerated in',
+    'beatified_date': 'Beatified',
+    'canonized_date': 'Canonized',
+}
+
+# Parameters that only hold images, captions or the heading, not infobox rows
+INFOBOX_HIDDEN = {'name', 'honorific-prefix', 'honorific_prefix', 'honorific-suffix', 'honorific_suffix',
+                  'image', 'image_size', 'imagesize', 'alt', 'caption', 'signature', 'signature_alt',
+                  'coat_of_arms', 'coat_of_arms_alt', 'embed', 'type', 'module'}
+
+# Parameters naming who performed an ordination, shown as "by ..." after its date
+INFOBOX_BY_PARAMETERS = {'ordained_by', 'consecrated_by', 'created_cardinal_by'}
+
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June', 'July',
+               'August', 'September', 'October', 'November', 'December']
+
+def wikipedia_title_from_name(cardinal_name):
+    """
+    Build the likely article title from a Vatican listing name
+    
+    "AVIZ Card. João Braz de" -> "João Braz de Aviz"
+    "AMBONGO BESUNGU_Card. Fridolin, O.F.M. Cap." -> "Fridolin Ambongo Besungu"
+    """
+    match = re.match(r'^(.*?)[\s_]*Card\.\s*(.*)$', cardinal_name)
+    if not match:
+        return format_cardinal_name(cardinal_name)['full_name']
+    surname = match.group(1).replace('_', ' ').strip().title()
+    # Drop religious order suffixes such as ", O.F.M. Cap."
+    given_names = match.group(2).split(',')[0].strip()
+    return f"{given_names} {surname}".strip()
+
+def wikipedia_api_query(params, headers=None, timeout=10):
+    """
+    Run an action=query request, following continuation until complete
+    
+    Returns:
+        tuple: (pages, redirects) where pages maps each page title to its merged
+            page object and redirects maps requested titles to their targets
+    """
+    base_params = {'action': 'query', 'format': 'json', 'formatversion': '2', 'redirects': '1'}
+    base_params.update(params)
+    pages = {}
+    redirects = {}
+    continuation = {}
+    while True:
+        query_params = dict(base_params)
+        query_params.update(continuation)
+        url = f"{WIKIPEDIA_API_URL}?{urlencode(query_params)}"
+        enrich_logger.info(f"Wikipedia query URL: {url[:200]}...")
+        response = http_client.get(url, headers=headers, timeout=timeout, cache=True)
+        response.raise_for_status()
+        data = response.json()
+        query = data.get('query', {})
+        for item in query.get('normalized', []) + query.get('redirects', []):
+            redirects[item['from']] = item['to']
+        for page in query.get('pages', []):
+            merged = pages.setdefault(page['title'], {})
+            for key, value in page.items():
+                if isinstance(value, list) and isinstance(merged.get(key), list):
+                    merged[key].extend(value)
+                else:
+                    merged[key] = value
+        if 'continue' not in data:
+            break
+        continuation = data['continue']
+    return pages, redirects
+
+def resolve_title(title, redirects):
+    """Follow normalization and redirect steps to the final page title"""
+    seen = set()
+    while title in redirects and title not in seen:
+        seen.add(title)
+        title = redirects[title]
+    return title
+
+def find_infobox_template(wikitext):
+    """Return the body of the first {{Infobox ...}} template in the wikitext"""
+    start = re.search(r'\{\{\s*Infobox', wikitext, re.IGNORECASE)
+    if not start:
+        return None
+    depth = 0
+    i = start.start()
+    while i < len(wikitext) - 1:
+        pair = wikitext[i:i+2]
+        if pair == '{{':
+            depth += 1
+            i += 2
+            continue
+        if pair == '}}':
+            depth -= 1
+            i += 2
+            if depth == 0:
+                return wikitext[start.start() + 2:i - 2]
+            continue
+        i += 1
+    return None
+
+def render_date_template(match):
+    """'{{birth date and age|1936|12|17}}' -> '17 December 1936'"""
+    parts = [part.strip() for part in match.group(1).split('|')[1:] if '=' not in part]
+    try:
+        year, month, day = int(parts[0]), int(parts[1]), int(parts[2])
+        return f"{day} {MONTH_NAMES[month - 1]} {year}"
+    except (IndexError, ValueError):
+        return match.group(0)
+
+def clean_wikitext(value):
+    """Reduce a wikitext value to plain text"""
+    value = re.sub(r'\{\{((?:birth|death) date(?: and age)?\|[^{}]*|[bd]da\|[^{}]*)\}\}',
+                   render_date_template, value, flags=re.IGNORECASE)
+    value = re.sub(r'<ref[^>]*/>', '', value)
+    value = re.sub(r'<ref[^>]*>.*?</ref>', '', value, flags=re.DOTALL)
+    value = re.sub(r'<br\s*/?>', ', ', value)
+    value = re.sub(r'<[^>]+>', '', value)
+    value = re.sub(r'\[\[(?:[^|\]]*\|)?([^\]]*)\]\]', r'\1', value)
+    value = re.sub(r"'{2,}", '', value)
+    return re.sub(r'\s+', ' ', value).strip()
+
+def parse_infobox(wikitext):
+    """Extract the parameters of an article's infobox as a dict of plain text values"""
+    template = find_infobox_template(wikitext or '')
+    if not template:
         return {}
+    # Split on top-level pipes only (not those inside links or nested templates)
+    params = []
+    depth = 0
+    current = ''
+    i = 0
+    while i < len(template):
+        pair = template[i:i+2]
+        if pair in ('{{', '[['):
+            depth += 1
+            current += pair
+            i += 2
+        elif pair in ('}}', ']]'):
+            depth -= 1
+            current += pair
+            i += 2
+        elif template[i] == '|' and depth == 0:
+            params.append(current)
+            current = ''
+            i += 1
+        else:
+            current += template[i]
+            i += 1
+    params.append(current)
+    
+    infobox_data = {}
+    for param in params[1:]:
+        key, sep, value = param.partition('=')
+        if not sep:
+            continue
+        value = clean_wikitext(value)
+        if value:
+            infobox_data[key.strip()] = value
+    return infobox_data
+
+def infobox_rows(params):
+    """
+    Infobox template parameters keyed by the row labels an article page
+    shows, the keys parse_wikipedia_article produces
+
+    Parameters without a known label are kept under their name with
+    underscores as spaces and the first letter capitalised; image and
+    caption parameters are dropped.
+    """
+    known = [name for name in INFOBOX_LABELS if name in params]
+    unknown = [name for name in params if name not in INFOBOX_LABELS and name not in INFOBOX_HIDDEN]
+    rows = {}
+    for name in known:
+        label = INFOBOX_LABELS[name]
+        value = f"by {params[name]}" if name in INFOBOX_BY_PARAMETERS else params[name]
+        rows[label] = f"{rows[label]}, {value}" if label in rows else value
+    for name in unknown:
+        label = name.replace('_', ' ').strip()
+        label = label[:1].upper() + label[1:]
+        if label and label not in rows:
+            rows[label] = params[name]
+    return rows
+
+def search_wikipedia_batch(cardinals):
+    """
+    Fetch Wikipedia information for many cardinals through the batched action=query API
+    
+    Titles are first guessed from the listing names and checked 50 at a time;
+    cardinals whose guess is missing or a disambiguation page fall back to the
+    opensearch lookup used by search_wikipedia. Extracts, page images, canonical
+    URLs and the lead wikitext (for the infobox) are then pulled for up to 50
+    titles per request.
+    
+    Args:
+        cardinals (list): Cardinal dicts with 'name' and optional 'country'
+        
+    Returns:
+        dict: cardinal name -> wiki_info with the same keys as search_wikipedia
+            (wikipedia_infobox keyed by the article's row labels, see
+            infobox_rows), empty when there is no article; cardinals whose
+            lookup failed are left out
+    """
+    headers = {"User-Agent": http_client.USER_AGENT}
+    results = {}
+    failed = set()
+    
+    # Step 1: check the guessed titles in batches
+    guesses = {cardinal['name']: wikipedia_title_from_name(cardinal['name']) for cardinal in cardinals}
+    resolved = {}
+    guessed_titles = list(dict.fromkeys(guesses.values()))
+    for start in range(0, len(guessed_titles), WIKIPEDIA_BATCH_SIZE):
+        batch = guessed_titles[start:start + WIKIPEDIA_BATCH_SIZE]
+        try:
+            pages, redirects = wikipedia_api_query({
+                'titles': '|'.join(batch),
+                'prop': 'pageprops',
+                'ppprop': 'disambiguation'
+            }, headers=headers)
+        except requests.exceptions.RequestException as e:
+            enrich_logger.warning(f"Error resolving Wikipedia titles: {str(e)}")
+            continue
+        for name, guess in guesses.items():
+            if guess not in batch:
+                continue
+            page = pages.get(resolve_title(guess, redirects))
+            if page and not page.get('missing') and 'disambiguation' not in page.get('pageprops', {}):
+                resolved[name] = page['title']
+    
+    # Fall back to opensearch for titles we could not guess
+    for cardinal in cardinals:
+        if cardinal['name'] in resolved:
+            continue
+        wiki_url = find_wikipedia_url(cardinal['name'], cardinal.get('country'), headers)
+        if wiki_url is None:
+            failed.add(cardinal['name'])
+        elif wiki_url and '/wiki/' in wiki_url:
+            resolved[cardinal['name']] = unquote(wiki_url.split('/wiki/', 1)[1]).replace('_', ' ')
+    enrich_logger.info(f"Resolved Wikipedia titles for {len(resolved)}/{len(cardinals)} cardinals")
+    
+    # Step 2: pull extracts, images and infobox wikitext in batches
+    titles = list(dict.fromkeys(resolved.values()))
+    page_data = {}
+    title_redirects = {}
+    for start in range(0, len(titles), WIKIPEDIA_BATCH_SIZE):
+        batch = titles[start:start + WIKIPEDIA_BATCH_SIZE]
+        try:
+            pages, redirects = wikipedia_api_query({
+                'titles': '|'.join(batch),
+                'prop': 'extracts|pageimages|revisions|info',
+                'exintro': '1',
+                'explaintext': '1',
+                'exlimit': 'max',
+                'piprop': 'thumbnail|original',
+                'pithumbsize': '220',
+                'pilimit': 'max',
+                'rvprop': 'content',
+                'rvslots': 'main',
+                'inprop': 'url'
+            }, headers=headers)
+        except requests.exceptions.RequestException as e:
+            enrich_logger.warning(f"Error fetching Wikipedia page data: {str(e)}")
+            failed.update(name for name, title in resolved.items() if title in batch)
+            continue
+        page_data.update(pages)
+        title_redirects.update(redirects)
+    
+    for cardinal in cardinals:
+        if cardinal['name'] not in failed:
+            results[cardinal['name']] = {}
+    for name, title in resolved.items():
+        page = page_data.get(resolve_title(title, title_redirects))
+        if name in failed or not page or page.get('missing'):
+            continue
+        summary = None
+        for paragraph in (page.get('extract') or '').split('\n'):
+            if paragraph.strip():
+                summary = paragraph.strip()
+                break
+        revisions = page.get('revisions') or [{}]
+        wikitext = revisions[0].get('slots', {}).get('main', {}).get('content', '')
+        image = page.get('thumbnail') or page.get('original') or {}
+        results[name] = {
+            'wikipedia_url': page.get('canonicalurl') or f"https://en.wikipedia.org/wiki/{quote(page['title'].replace(' ', '_'))}",
+            'wikipedia_summary': summary,
+            'wikipedia_infobox': infobox_rows(parse_infobox(wikitext)),
+            'wikipedia_image': image.get('source')
+        }
+    
+    enrich_logger.info(f"Found Wikipedia information for {sum(1 for info in results.values() if info)}/{len(cardinals)} "
+                       f"cardinals in batch mode ({len(failed)} lookups failed)")
+    return results
+
+def parse_news_results(html, url):
+    """Articles (title, link, source, date) on a Google News result page, at most 5"""
+    soup = parse_html(html, url)
+    
+    # Find news result divs
+    result_divs = soup.select('div.SoaBEf')
+    
+    # If we can't find results with that class, try some alternative selectors
+    if not result_divs:
+        result_divs = soup.select("div.y6IFtc")
+    
+    if not result_divs:
+        result_divs = soup.select("div.v7W49e")
+    
+    enrich_logger.info(f"Found {len(result_divs)} news result divs")
+    
+    articles = []
+    for div in result_divs[:5]:  # Limit to first 5 results
+        # Try to find the title element using different possible class names
+        title_element = div.select_one('div.mCBkyc, div.DY5T1d, h3.mCBkyc, h3.DY5T1d, a.mCBkyc, a.DY5T1d')
+        link_element = div.select_one('a')
+        
+        if title_element and link_element and link_element.attr('href') is not None:
+            title = title_element.text().strip()
+            link = link_element.attr('href')
+            
+            # Extract source and date if available
+            source = None
+            date = None
+            source_element = div.select_one('div.CEMjEf, div.UMOHqf, span.CEMjEf, span.UMOHqf')
+            if source_element:
+                source_text = source_element.text().strip()
+                if ' · ' in source_text:
+                    parts = source_text.split(' · ')
+                    source = parts[0]
+                    if len(parts) > 1:
+                        date = parts[1]
+                else:
+                    source = source_text
+            
+            articles.append({
+                'title': title,
+                'link': link,
+                'source': source,
+                'date': date
+            })
+    return articles
+
+def parse_google_results(html, url):
+    """Results (title, link, snippet) on a Google search result page, at most 3"""
+    soup = parse_html(html, url)
+    
+    # Extract search results - try multiple selectors
+    # Updated selector for Google search result containers
+    result_divs = soup.select('div.g, div.tF2Cxc')
+    
+    if not result_divs:
+        # Try alternative selectors
+        result_divs = soup.select("div.yuRUbf")
+    
+    if not result_divs:
+        # Try yet another selector that might contain results
+        result_divs = soup.select("div.v7W49e")
+    
+    enrich_logger.info(f"Found {len(result_divs)} Google result divs")
+    
+    search_results = []
+    for div in result_divs[:3]:  # Limit to first 3 results
+        # Find the title and link
+        title_element = div.select_one('h3')
+        link_element = div.select_one('a')
+        
+        if title_element and link_element and link_element.attr('href') is not None:
+            title = title_element.text().strip()
+            link = link_element.attr('href')
+            
+            # Find snippet
+            snippet = ""
+            snippet_div = div.select_one('div.VwiC3b, div.aCOpRe, div.yXK7lf, span.VwiC3b, span.aCOpRe, span.yXK7lf')
+            if snippet_div:
+                snippet = snippet_div.text().strip()
+            
+            search_results.append({
+                'title': title,
+                'link': link,
+                'snippet': snippet
+            })
+    return search_results
+
+def google_search(source, search_query, parse, headers=None, timeout=5):
+    """
+    Run one Google (source 'google') or Google News (source 'news') query
+    through the search cache
+    
+    Returns:
+        tuple: (search URL, parsed results; empty when nothing was found,
+            None when the request was refused)
+    """
+    url = f"https://www.google.com/search?q={search_query.replace(' ', '+')}"
+    if source == 'news':
+        url += "&tbm=nws"
+    def fetch():
+        enrich_logger.info(f"Google {'News ' if source == 'news' else ''}search URL: {url}")
+        response = http_client.get(url, headers=headers, timeout=timeout)
+        if response.status_code != 200:
+            return None
+        return parse(response.text, url)
+    return url, search_cache.get_or_fetch(source, search_query, fetch)
 
 def search_news(cardinal_name, country=None):
-    """Search for recent news about a cardinal"""
+    """
+    Search for recent news about a cardinal
+    
+    Returns:
+        dict: search_url and articles (empty when nothing was found), or
+            None when a search failed and found nothing
+    """
     # Format the name for better search results
     name_formats = format_cardinal_name(cardinal_name)
-    formatted_name = name_formats['full_name']
     simple_name = name_formats['simple_name']
     distinctive_name = name_formats['distinctive_name']
     
@@ -242,7 +789,7 @@ def search_news(cardinal_name, country=None):
         search_query += f" {country}"
     search_query += " news"
     
-    logger.info(f"Searching news for: {search_query}")
+    enrich_logger.info(f"Searching news for: {search_query}")
     
     try:
         # Set up request headers and timeout
@@ -251,118 +798,31 @@ def search_news(cardinal_name, country=None):
         timeout = 5  # Set a 5-second timeout for all requests
         
         # Use Google News search (more reliable)
-        url = f"https://www.google.com/search?q={search_query.replace(' ', '+')}&tbm=nws"
-        logger.info(f"Google News search URL #1: {url}")
-        articles = []
+        url = None
+        articles = None
+        failed = False
         
         try:
-            response = requests.get(url, headers=headers, timeout=timeout)
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Find news result divs
-                result_divs = soup.find_all('div', class_='SoaBEf')
-                
-                # If we can't find results with that class, try some alternative selectors
-                if not result_divs:
-                    result_divs = soup.select("div.y6IFtc")
-                
-                if not result_divs:
-                    result_divs = soup.select("div.v7W49e")
-                
-                logger.info(f"Found {len(result_divs)} news result divs with primary selectors")
-                
-                for div in result_divs[:5]:  # Limit to first 5 results
-                    # Try to find the title element using different possible class names
-                    title_element = div.find(['div', 'h3', 'a'], class_=['mCBkyc', 'DY5T1d'])
-                    link_element = div.find('a')
-                    
-                    if title_element and link_element and 'href' in link_element.attrs:
-                        title = title_element.text.strip()
-                        link = link_element['href']
-                        
-                        # Extract source and date if available
-                        source = None
-                        date = None
-                        source_element = div.find(['div', 'span'], class_=['CEMjEf', 'UMOHqf'])
-                        if source_element:
-                            source_text = source_element.text.strip()
-                            if ' · ' in source_text:
-                                parts = source_text.split(' · ')
-                                source = parts[0]
-                                if len(parts) > 1:
-                                    date = parts[1]
-                            else:
-                                source = source_text
-                        
-                        articles.append({
-                            'title': title,
-                            'link': link,
-                            'source': source,
-                            'date': date
-                        })
-                
-                logger.info(f"Found {len(articles)} news articles for {simple_name}")
-                
+            url, articles = google_search('news', search_query, parse_news_results, headers, timeout)
+            enrich_logger.info(f"Found {len(articles or [])} news articles for {simple_name}")
         except requests.exceptions.RequestException as e:
-            logger.warning(f"Error with Google News search for {simple_name}: {str(e)}")
+            enrich_logger.warning(f"Error with Google News search for {simple_name}: {str(e)}")
+        failed = articles is None
             
         # If Google search failed or returned no results, try with the distinctive name
         if not articles:
             try:
+                articles = None
                 alternative_query = f"{distinctive_name} cardinal news"
-                url = f"https://www.google.com/search?q={alternative_query.replace(' ', '+')}&tbm=nws"
-                logger.info(f"Google News search URL #2: {url}")
-                response = requests.get(url, headers=headers, timeout=timeout)
-                
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    
-                    # Similar processing as above
-                    result_divs = soup.find_all('div', class_='SoaBEf')
-                    
-                    if not result_divs:
-                        result_divs = soup.select("div.y6IFtc")
-                    
-                    if not result_divs:
-                        result_divs = soup.select("div.v7W49e")
-                    
-                    logger.info(f"Found {len(result_divs)} news result divs with alternative selectors")
-                    
-                    for div in result_divs[:5]:
-                        title_element = div.find(['div', 'h3', 'a'], class_=['mCBkyc', 'DY5T1d'])
-                        link_element = div.find('a')
-                        
-                        if title_element and link_element and 'href' in link_element.attrs:
-                            title = title_element.text.strip()
-                            link = link_element['href']
-                            
-                            # Extract source and date if available
-                            source = None
-                            date = None
-                            source_element = div.find(['div', 'span'], class_=['CEMjEf', 'UMOHqf'])
-                            if source_element:
-                                source_text = source_element.text.strip()
-                                if ' · ' in source_text:
-                                    parts = source_text.split(' · ')
-                                    source = parts[0]
-                                    if len(parts) > 1:
-                                        date = parts[1]
-                                else:
-                                    source = source_text
-                            
-                            articles.append({
-                                'title': title,
-                                'link': link,
-                                'source': source,
-                                'date': date
-                            })
-                    
-                    logger.info(f"Found {len(articles)} news articles for {distinctive_name}")
-                    
+                url, articles = google_search('news', alternative_query, parse_news_results, headers, timeout)
+                enrich_logger.info(f"Found {len(articles or [])} news articles for {distinctive_name}")
             except requests.exceptions.RequestException as e:
-                logger.warning(f"Error with alternative news search for {distinctive_name}: {str(e)}")
+                enrich_logger.warning(f"Error with alternative news search for {distinctive_name}: {str(e)}")
+            failed = failed or articles is None
+        
+        # A search that failed may have missed what the other one didn't find
+        if not articles and failed:
+            return None
         
         # Return the results, even if empty
         news_info = {
@@ -373,14 +833,19 @@ def search_news(cardinal_name, country=None):
         return news_info
     
     except Exception as e:
-        logger.error(f"Error searching news for {simple_name}: {str(e)}")
-        return {'articles': []}
+        enrich_logger.error(f"Error searching news for {simple_name}: {str(e)}")
+        return None
 
 def search_google(cardinal_name, country=None):
-    """Search Google for general information about the cardinal"""
+    """
+    Search Google for general information about the cardinal
+    
+    Returns:
+        dict: search_url and results (empty when nothing was found), or
+            None when a search failed and found nothing
+    """
     # Format the name for better search results
     name_formats = format_cardinal_name(cardinal_name)
-    formatted_name = name_formats['full_name']
     simple_name = name_formats['simple_name']
     distinctive_name = name_formats['distinctive_name']
     
@@ -389,112 +854,41 @@ def search_google(cardinal_name, country=None):
     if country:
         search_query += f" {country}"
     
-    logger.info(f"Searching Google for: {search_query}")
+    enrich_logger.info(f"Searching Google for: {search_query}")
     
     try:
         # Using a simple direct search
         user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         headers = {"User-Agent": user_agent}
         timeout = 5  # 5-second timeout
-        url = f"https://www.google.com/search?q={search_query.replace(' ', '+')}"
-        logger.info(f"Google search URL #1: {url}")
         
-        search_results = []
+        url = None
+        search_results = None
+        failed = False
         
         try:
-            response = requests.get(url, headers=headers, timeout=timeout)
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Extract search results - try multiple selectors
-                # Updated selector for Google search result containers
-                result_divs = soup.find_all('div', class_=['g', 'tF2Cxc'])
-                
-                if not result_divs:
-                    # Try alternative selectors
-                    result_divs = soup.select("div.yuRUbf")
-                
-                if not result_divs:
-                    # Try yet another selector that might contain results
-                    result_divs = soup.select("div.v7W49e")
-                
-                logger.info(f"Found {len(result_divs)} Google result divs with primary selectors")
-                
-                for div in result_divs[:3]:  # Limit to first 3 results
-                    # Find the title and link
-                    title_element = div.find('h3')
-                    link_element = div.find('a')
-                    
-                    if title_element and link_element and 'href' in link_element.attrs:
-                        title = title_element.text.strip()
-                        link = link_element['href']
-                        
-                        # Find snippet
-                        snippet = ""
-                        snippet_div = div.find(['div', 'span'], class_=['VwiC3b', 'aCOpRe', 'yXK7lf'])
-                        if snippet_div:
-                            snippet = snippet_div.text.strip()
-                        
-                        search_results.append({
-                            'title': title,
-                            'link': link,
-                            'snippet': snippet
-                        })
-                
-                logger.info(f"Found {len(search_results)} Google results for {simple_name}")
-        
+            url, search_results = google_search('google', search_query, parse_google_results, headers, timeout)
+            enrich_logger.info(f"Found {len(search_results or [])} Google results for {simple_name}")
         except requests.exceptions.RequestException as e:
-            logger.warning(f"Error with Google search for {simple_name}: {str(e)}")
+            enrich_logger.warning(f"Error with Google search for {simple_name}: {str(e)}")
+        failed = search_results is None
         
         # If the first search returned no results, try with the distinctive name only
         if not search_results:
             try:
+                search_results = None
                 alternative_query = f"{distinctive_name} cardinal"
                 if country:
                     alternative_query += f" {country}"
-                    
-                url = f"https://www.google.com/search?q={alternative_query.replace(' ', '+')}"
-                logger.info(f"Google search URL #2: {url}")
-                response = requests.get(url, headers=headers, timeout=timeout)
-                
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    
-                    # Similar processing as above
-                    result_divs = soup.find_all('div', class_=['g', 'tF2Cxc'])
-                    
-                    if not result_divs:
-                        result_divs = soup.select("div.yuRUbf")
-                    
-                    if not result_divs:
-                        result_divs = soup.select("div.v7W49e")
-                    
-                    logger.info(f"Found {len(result_divs)} Google result divs with alternative selectors")
-                    
-                    for div in result_divs[:3]:
-                        title_element = div.find('h3')
-                        link_element = div.find('a')
-                        
-                        if title_element and link_element and 'href' in link_element.attrs:
-                            title = title_element.text.strip()
-                            link = link_element['href']
-                            
-                            snippet = ""
-                            snippet_div = div.find(['div', 'span'], class_=['VwiC3b', 'aCOpRe', 'yXK7lf'])
-                            if snippet_div:
-                                snippet = snippet_div.text.strip()
-                            
-                            search_results.append({
-                                'title': title,
-                                'link': link,
-                                'snippet': snippet
-                            })
-                    
-                    logger.info(f"Found {len(search_results)} Google results for {distinctive_name}")
-                    
+                url, search_results = google_search('google', alternative_query, parse_google_results, headers, timeout)
+                enrich_logger.info(f"Found {len(search_results or [])} Google results for {distinctive_name}")
             except requests.exceptions.RequestException as e:
-                logger.warning(f"Error with alternative Google search for {distinctive_name}: {str(e)}")
+                enrich_logger.warning(f"Error with alternative Google search for {distinctive_name}: {str(e)}")
+            failed = failed or search_results is None
+        
+        # A search that failed may have missed what the other one didn't find
+        if not search_results and failed:
+            return None
         
         # Return the results
         google_info = {
@@ -505,35 +899,117 @@ def search_google(cardinal_name, country=None):
         return google_info
         
     except Exception as e:
-        logger.error(f"Error searching Google for {simple_name}: {str(e)}")
-        return {'results': []}
+        enrich_logger.error(f"Error searching Google for {simple_name}: {str(e)}")
+        return None
+
+def log_search_cache_stats():
+    """Log how many lookups of each source the search cache answered"""
+    for source, stats in search_cache.hit_rates().items():
+        logger.info(f"Search cache for {source}: {stats['hit_rate']:.0%} of {stats['lookups']} lookups "
+                    f"answered without a request ({stats.get('negative_hit', 0)} known misses)")
 
-def enhance_cardinal_data(cardinal):
-    """Enhance a cardinal's data with additional information from online sources"""
+def get_source_pool(source):
+    """Thread pool for one source, sized by its SOURCE_CONCURRENCY limit"""
+    with _source_pools_lock:
+        if source not in _source_pools:
+            _source_pools[source] = ThreadPoolExecutor(
+                max_workers=SOURCE_CONCURRENCY[source], thread_name_prefix=f"enhance-{source}")
+        return _source_pools[source]
+
+def enhance_cardinal_data(cardinal, sources=None, previous=None, prefetched=None):
+    """
+    Enhance a cardinal's data with additional information from online sources
+    
+    Args:
+        cardinal (dict): Cardinal record to enhance
+        sources (list): Sources to query (keys of SOURCES); defaults to all of them
+        previous (dict): Earlier enhanced record for this cardinal whose data is
+            kept for the sources that are not queried again
+        prefetched (dict): Results already fetched in batch, keyed by source;
+            those sources are not queried again
+        
+    A source is stamped in enhanced_at only when its lookup completed (with
+    data or a real "nothing found"); when it failed, the previous data and
+    timestamp are kept so the next run tries it again.
+        
+    Returns:
+        dict: Copy of the cardinal with additional_info and per-source enhanced_at timestamps
+    """
+    if sources is None:
+        sources = list(SOURCES)
     enhanced_cardinal = cardinal.copy()
     
     # Initialize additional_info if not already present
     if 'additional_info' not in enhanced_cardinal:
         enhanced_cardinal['additional_info'] = {}
+    enhanced_cardinal['enhanced_at'] = {}
+    
+    previous_info = (previous or {}).get('additional_info', {})
+    previous_times = (previous or {}).get('enhanced_at', {})
+    def keep_previous(source):
+        key = SOURCES[source]
+        if key in previous_info:
+            enhanced_cardinal['additional_info'][key] = previous_info[key]
+        if source in previous_times:
+            enhanced_cardinal['enhanced_at'][source] = previous_times[source]
+    
+    # Carry over what an earlier run found for the sources we are not refreshing
+    for source in SOURCES:
+        if source not in sources:
+            keep_previous(source)
+    
+    now = datetime.now().isoformat()
+    
+    # Query all sources at once, each through its own rate-limited pool
+    searches = {
+        'wikipedia': search_wikipedia,
+        'news': search_news,
+        'google': search_google
+    }
+    prefetched = prefetched or {}
+    def timed_search(source):
+        with metrics.timer('enrich', source):
+            return searches[source](cardinal['name'], cardinal.get('country'))
+    
+    futures = {
+        source: get_source_pool(source).submit(timed_search, source)
+        for source in SOURCES if source in sources and source not in prefetched
+    }
     
     # Search Wikipedia for additional information
-    wiki_info = search_wikipedia(cardinal['name'], cardinal.get('country'))
-    if wiki_info:
-        enhanced_cardinal['additional_info']['wikipedia'] = wiki_info
+    if 'wikipedia' in futures or 'wikipedia' in prefetched:
+        wiki_info = prefetched['wikipedia'] if 'wikipedia' in prefetched else futures['wikipedia'].result()
+        if wiki_info is None:
+            keep_previous('wikipedia')
+        else:
+            if wiki_info:
+                enhanced_cardinal['additional_info']['wikipedia'] = wiki_info
+            enhanced_cardinal['enhanced_at']['wikipedia'] = now
     
     # Search for recent news about the cardinal
-    news_info = search_news(cardinal['name'], cardinal.get('country'))
-    if news_info and news_info.get('articles'):
-        enhanced_cardinal['additional_info']['recent_news'] = news_info
+    if 'news' in futures:
+        news_info = futures['news'].result()
+        if news_info is None:
+            keep_previous('news')
+        else:
+            if news_info.get('articles'):
+                enhanced_cardinal['additional_info']['recent_news'] = news_info
+            enhanced_cardinal['enhanced_at']['news'] = now
     
     # Search Google for additional information
-    google_info = search_google(cardinal['name'], cardinal.get('country'))
-    if google_info and google_info.get('results'):
-        enhanced_cardinal['additional_info']['google_results'] = google_info
+    if 'google' in futures:
+        google_info = futures['google'].result()
+        if google_info is None:
+            keep_previous('google')
+        else:
+            if google_info.get('results'):
+                enhanced_cardinal['additional_info']['google_results'] = google_info
+            enhanced_cardinal['enhanced_at']['google'] = now
     
     # Extract structured information from biography text
     if 'biography_text' in cardinal:
-        structured_bio_info = extract_info_from_biography(cardinal['biography_text'])
+        with metrics.timer('parse', 'biography_text'):
+            structured_bio_info = extract_info_from_biography(cardinal['biography_text'])
         if structured_bio_info:
             enhanced_cardinal['additional_info']['structured_bio'] = structured_bio_info
     
@@ -541,87 +1017,228 @@ def enhance_cardinal_data(cardinal):
 
 def extract_info_from_biography(text):
     """Extract structured information from the biography text"""
-    info = {}
-    
-    # Extract birth place
-    birth_place_match = re.search(r'born (?:on [^,]+ )?in ([^,.]+)', text, re.IGNORECASE)
-    if birth_place_match:
-        info['birth_place'] = birth_place_match.group(1).strip()
-    
-    # Extract ordination date
-    ordination_match = re.search(r'ordained (?:a )?priest (?:on|in) ([^,.]+)', text, re.IGNORECASE)
-    if ordination_match:
-        info['ordination_date'] = ordination_match.group(1).strip()
-    
-    # Extract episcopal consecration date
-    consecration_match = re.search(r'(?:episcopal consecration|consecrated bishop) (?:on|in) ([^,.]+)', text, re.IGNORECASE)
-    if consecration_match:
-        info['episcopal_consecration_date'] = consecration_match.group(1).strip()
-    
-    # Extract cardinal creation date
-    cardinal_match = re.search(r'created (?:and proclaimed )?cardinal (?:by[^,.]*)? (?:on|in) ([^,.]+)', text, re.IGNORECASE)
-    if cardinal_match:
-        info['cardinal_creation_date'] = cardinal_match.group(1).strip()
+    return bio_extraction.extract_facts(text)
+
+def find_latest_enhanced_file(directory='data/enhanced'):
+    """Return the most recent final enhanced output (progress files are ignored)"""
+    files = [f for f in glob.glob(os.path.join(directory, 'cardinals_enhanced_*.json'))
+             if '_progress_' not in os.path.basename(f)]
+    if not files:
+        return None
+    # File names end in a sortable timestamp
+    return max(files)
+
+def sources_to_refresh(previous, max_age_days, fallback_time):
+    """
+    Decide which sources need to be queried again for a cardinal
     
-    # Extract education/degrees
-    education_matches = re.findall(r'(?:doctorate|licentiate|degree) in ([^,.]+)', text, re.IGNORECASE)
-    if education_matches:
-        info['education'] = [match.strip() for match in education_matches]
+    A source is refreshed when the earlier record has no data from it (never
+    queried, failed or nothing found) or when its data is older than
+    max_age_days. Records written before per-source timestamps existed are
+    dated by the modification time of their file.
     
-    # Extract languages
-    language_match = re.search(r'(?:speaks|fluent in) ([^,.]+)', text, re.IGNORECASE)
-    if language_match:
-        languages = language_match.group(1).strip()
-        info['languages'] = [lang.strip() for lang in languages.split('and') if lang.strip()]
+    Args:
+        previous (dict): Earlier enhanced record, or None
+        max_age_days (float): Maximum age of a source's data before it is refreshed
+        fallback_time (datetime): Age reference for records without timestamps
+        
+    Returns:
+        list: Names of the sources to query
+    """
+    if previous is None:
+        return list(SOURCES)
     
-    return info
+    enhanced_at = previous.get('enhanced_at', {})
+    previous_info = previous.get('additional_info', {})
+    now = datetime.now()
+    stale = []
+    for source, key in SOURCES.items():
+        if key not in previous_info:
+            stale.append(source)
+            continue
+        if source in enhanced_at:
+            fetched = datetime.fromisoformat(enhanced_at[source])
+        else:
+            fetched = fallback_time
+        if (now - fetched).total_seconds() > max_age_days * 86400:
+            stale.append(source)
+    return stale
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Enhance cardinal data with Wikipedia, news and Google results")
+    parser.add_argument('--input', default='data/backup/cardinals.json',
+                        help="Cardinals JSON file to enhance (default: data/backup/cardinals.json)")
+    parser.add_argument('--full', action='store_true',
+                        help="Re-enhance every cardinal instead of reusing the latest data/enhanced output")
+    parser.add_argument('--max-age-days', type=float, default=30,
+                        help="Refresh a source once its data is older than this many days (default: 30)")
+    parser.add_argument('--workers', type=int, default=4,
+                        help="Number of cardinals enhanced at the same time (default: 4)")
+    parser.add_argument('--source-limit', action='append', default=[], metavar='SOURCE=N',
+                        help="Maximum concurrent requests for one source, e.g. google=1 (repeatable)")
+    parser.add_argument('--wikipedia-batch', action='store_true',
+                        help="Fetch Wikipedia data for all cardinals through batched action=query requests")
+    parser.add_argument('--delay', type=float, default=0,
+                        help="Extra seconds each worker pauses after enhancing a cardinal, on top of the "
+                             "adaptive per-host pacing (default: 0)")
+    parser.add_argument('--diff', default=None,
+                        help="Only re-enhance the cardinals added or modified in this diff "
+                             "(the data/raw/cardinals_diff_*.json cardinal_scraper.py writes every run)")
+    parser.add_argument('--no-search-cache', action='store_true',
+                        help="Send every search query again instead of reusing results stored in data/cache/searches.json")
+    parser.add_argument('--metrics-file', default=None,
+                        help="Where to write the JSON run report (default: logs/enhance_cardinals_metrics_<timestamp>.json)")
+    parser.add_argument('--prometheus-file', default=None,
+                        help="Also write the run metrics in Prometheus text format to this file")
+    html_parser.add_backend_argument(parser)
+    log_setup.add_logging_arguments(parser)
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+
     # Set up logging
     global logger
-    logger = setup_logging()
+    logger = setup_logging(args.log_level, args.log_rate, args.log_sample)
+    html_parser.set_backend(args.html_parser)
     logger.info("Starting cardinal data enhancement")
     
     # Create directory structure
     create_directory_structure()
     
     # Load the cardinals data
-    cardinals = load_cardinals_data('data/backup/cardinals.json')
+    cardinals = load_cardinals_data(args.input)
     
     if not cardinals:
         logger.error("No cardinal data found. Exiting.")
         return
     
+    if args.no_search_cache:
+        search_cache.enabled = False
+    
+    # Reuse the latest enhanced output so only new or stale data is fetched again
+    previous_file = None if args.full else find_latest_enhanced_file()
+    previous_records = {}
+    previous_time = None
+    if previous_file:
+        previous_records = {record_key(c): c for c in load_cardinals_data(previous_file)}
+        previous_time = datetime.fromtimestamp(os.path.getmtime(previous_file))
+        logger.info(f"Merging into {previous_file} (refreshing sources older than {args.max_age_days} days)")
+    elif not args.full:
+        # The enhanced files may have been moved into the store (dataset_store.py import --remove)
+        store = dataset_store.DatasetStore()
+        manifest = store.latest('enhance')
+        if manifest:
+            previous_records = {record_key(c): c for c in store.read(manifest)}
+            previous_time = datetime.fromisoformat(manifest['created_at'])
+            logger.info(f"Merging into snapshot enhance/{manifest['id']} "
+                        f"(refreshing sources older than {args.max_age_days} days)")
+    
+    # With a scraper diff, only new and changed cardinals are enhanced again
+    changed = None
+    if args.diff:
+        changed = change_detection.changed_keys(change_detection.load_diff(args.diff))
+        logger.info(f"Re-enhancing the {len(changed)} cardinals added or modified in {args.diff}")
+    
+    def sources_for(cardinal):
+        previous = previous_records.get(record_key(cardinal))
+        if changed is not None and previous is not None:
+            return list(SOURCES) if record_key(cardinal) in changed else []
+        return sources_to_refresh(previous, args.max_age_days, previous_time)
+    
+    for limit in args.source_limit:
+        source, _, value = limit.partition('=')
+        if source not in SOURCE_CONCURRENCY or not value.isdigit():
+            logger.error(f"Invalid --source-limit {limit}")
+            return
+        SOURCE_CONCURRENCY[source] = int(value)
+    
+    # Fetch Wikipedia data for everyone that needs it in a handful of batched requests
+    wikipedia_batch = {}
+    if args.wikipedia_batch:
+        needs_wikipedia = [
+            cardinal for cardinal in cardinals
+            if 'wikipedia' in sources_for(cardinal)
+        ]
+        if needs_wikipedia:
+            with metrics.timer('enrich', 'wikipedia_batch'):
+                found = search_wikipedia_batch(needs_wikipedia)
+            # Cardinals whose batch lookup failed are searched one by one instead
+            wikipedia_batch = {record_key(c): found[c['name']] for c in needs_wikipedia if c['name'] in found}
+    
     # Enhance each cardinal's data
-    enhanced_cardinals = []
     total_cardinals = len(cardinals)
+    enhanced_cardinals = [None] * total_cardinals
+    completed = 0
     
-    for i, cardinal in enumerate(cardinals):
+    def enhance_one(i, cardinal):
         cardinal_name = cardinal.get('name', f"Cardinal {i+1}")
+        previous = previous_records.get(record_key(cardinal))
+        sources = sources_for(cardinal)
+        if not sources:
+            logger.info(f"Skipping {cardinal_name} ({i+1}/{total_cardinals}) - already enhanced")
+            return enhance_cardinal_data(cardinal, sources, previous)
+        
         name_formats = format_cardinal_name(cardinal_name)
-        logger.info(f"Enhancing data for {cardinal_name} ({i+1}/{total_cardinals}) - Simplified to: {name_formats['simple_name']}")
+        logger.info(f"Enhancing data for {cardinal_name} ({i+1}/{total_cardinals}) - Simplified to: {name_formats['simple_name']} - Sources: {', '.join(sources)}")
         
         # Enhance the cardinal's data
-        enhanced_cardinal = enhance_cardinal_data(cardinal)
-        enhanced_cardinals.append(enhanced_cardinal)
+        prefetched = {}
+        if record_key(cardinal) in wikipedia_batch:
+            prefetched['wikipedia'] = wikipedia_batch[record_key(cardinal)]
+        enhanced_cardinal = enhance_cardinal_data(cardinal, sources, previous, prefetched)
         
-        # Save progress periodically (every 10 cardinals)
-        if (i + 1) % 10 == 0 or (i + 1) == total_cardinals:
-            progress_file = f'data/enhanced/cardinals_enhanced_progress_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-            with open(progress_file, 'w', encoding='utf-8') as f:
-                json.dump(enhanced_cardinals, f, ensure_ascii=False, indent=2)
-            logger.info(f"Saved progress ({i+1}/{total_cardinals}) to {progress_file}")
-        
-        # Add a delay to avoid overwhelming the servers
-        time.sleep(2)
+        # Requests are paced per host by http_client; this is an optional extra pause
+        if args.delay:
+            metrics.sleep(args.delay)
+        return enhanced_cardinal
     
-    # Save the final enhanced data
-    output_file = f'data/enhanced/cardinals_enhanced_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-    with open(output_file, 'w', encoding='utf-8') as f:
+    logger.info(f"Enhancing with {args.workers} workers, source limits: {SOURCE_CONCURRENCY}")
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(enhance_one, i, cardinal): i for i, cardinal in enumerate(cardinals)}
+        for future in as_completed(futures):
+            enhanced_cardinals[futures[future]] = future.result()
+            completed += 1
+            
+            # Save progress periodically (every 10 cardinals) as a snapshot: only
+            # the records enhanced since the last one take up space
+            if completed % 10 == 0 or completed == total_cardinals:
+                with metrics.timer('serialize'):
+                    progress = dataset_store.commit_dataset(
+                        'enhance_progress', [c for c in enhanced_cardinals if c is not None], source='enhance_cardinals')
+                search_cache.save()
+                logger.info(f"Saved progress ({completed}/{total_cardinals}) to snapshot {progress}")
+    
+    # Save the final enhanced data, merging into the file we resumed from
+    output_file = previous_file or f'data/enhanced/cardinals_enhanced_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+    tmp_file = f"{output_file}.tmp"
+    with metrics.timer('serialize'), open(tmp_file, 'w', encoding='utf-8') as f:
         json.dump(enhanced_cardinals, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, output_file)
+    snapshot = dataset_store.commit_dataset('enhance', enhanced_cardinals, source=output_file)
+    
+    # Keep the search index in step with the dataset; only changed records are re-tokenized
+    stats = search_index.build_index(enhanced_cardinals, dataset=snapshot)
+    logger.info(f"Search index updated: {stats['added']} added, {stats['changed']} changed, "
+                f"{stats['removed']} removed")
+    
+    http_client.save_cache()
+    search_cache.save()
+    log_search_cache_stats()
     
     logger.info(f"Enhancement complete. Processed {len(enhanced_cardinals)} cardinals")
-    logger.info(f"Final enhanced data saved to {output_file}")
+    logger.info(f"Final enhanced data saved to {output_file} (snapshot {snapshot})")
+    
+    # Write the run report
+    metrics_file = args.metrics_file or metrics.default_report_file('enhance_cardinals')
+    metrics.write_report(metrics_file, {'script': 'enhance_cardinals', 'cardinals': len(enhanced_cardinals), 'output_file': output_file,
+                                        'snapshot': snapshot,
+                                        'hosts': http_client.rate_controller.snapshot(),
+                                        'search_cache': search_cache.hit_rates()})
+    logger.info(f"Run metrics saved to {metrics_file}")
+    if args.prometheus_file:
+        metrics.write_prometheus(args.prometheus_file)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
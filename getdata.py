@@ -1,27 +1,19 @@
-import requests
-from bs4 import BeautifulSoup
 import os
 import json
 import time
-import logging
 from datetime import datetime
-import re
+import http_client
+import html_parser
+import metrics
+import log_setup
+import bio_extraction
+
+# Per-item messages go to the fetch stage logger
+fetch_logger = log_setup.stage_logger('fetch')
 
 # Set up logging
 def setup_logging():
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
-    
-    log_file = f'logs/cardinal_scraper_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log'
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler()
-        ]
-    )
-    return logging.getLogger(__name__)
+    return log_setup.setup_logging('getdata', __name__)
 
 def create_directory_structure():
     """Create the necessary directory structure for storing data"""
@@ -38,14 +30,12 @@ def create_directory_structure():
             os.makedirs(directory)
             logger.info(f"Created directory: {directory}")
 
-def get_page_content(url):
-    """Get the content of a page with error handling"""
+def get_page_content(url, retries=3):
+    """Get the content of a page, retrying failures with exponential backoff"""
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.text
+        return http_client.get_text(url, retries=retries)
     except Exception as e:
-        logger.error(f"Error fetching {url}: {str(e)}")
+        fetch_logger.error(f"Error fetching {url}: {str(e)}")
         return None
 
 def extract_cardinal_info(bio_url):
@@ -54,55 +44,43 @@ def extract_cardinal_info(bio_url):
     if not content:
         return None
     
-    soup = BeautifulSoup(content, 'html.parser')
+    parse_started = time.perf_counter()
+    info = parse_cardinal_info(content)
+    metrics.observe('parse', 'vatican', time.perf_counter() - parse_started)
+    return info
+
+def parse_cardinal_info(content):
+    """Photo URL, name, biography and facts from a biography page"""
+    soup = html_parser.parse(content)
     info = {}
     
     # Extract photo URL
-    img = soup.find('img', {'class': 'foto'})
-    if img and 'src' in img.attrs:
-        photo_url = img['src']
+    img = soup.select_one('img.foto')
+    if img and img.attr('src') is not None:
+        photo_url = img.attr('src')
         if not photo_url.startswith('http'):
             photo_url = f"https://press.vatican.va{photo_url}"
         info['photo_url'] = photo_url
     
     # Extract biographical information
-    content_div = soup.find('div', {'class': 'content'})
+    content_div = soup.select_one('div.content')
     if content_div:
         # Extract name and title
-        name_elem = content_div.find('h1')
+        name_elem = content_div.select_one('h1')
         if name_elem:
-            info['full_name'] = name_elem.get_text(strip=True)
+            info['full_name'] = name_elem.text(strip=True)
         
         # Extract biographical text
-        paragraphs = content_div.find_all('p')
+        paragraphs = content_div.select('p')
         bio_text = []
         for p in paragraphs:
-            text = p.get_text(strip=True)
+            text = p.text(strip=True)
             if text:
                 bio_text.append(text)
         info['biography'] = '\n'.join(bio_text)
         
-        # Try to extract specific information using regex
-        for text in bio_text:
-            # Extract birth date
-            birth_match = re.search(r'born on (\d{1,2} [A-Za-z]+ \d{4})', text)
-            if birth_match:
-                info['birth_date'] = birth_match.group(1)
-            
-            # Extract birth place
-            birth_place_match = re.search(r'born in ([^,\.]+)', text)
-            if birth_place_match:
-                info['birth_place'] = birth_place_match.group(1)
-            
-            # Extract ordination date
-            ordination_match = re.search(r'ordained priest on (\d{1,2} [A-Za-z]+ \d{4})', text)
-            if ordination_match:
-                info['ordination_date'] = ordination_match.group(1)
-            
-            # Extract cardinal creation date
-            cardinal_match = re.search(r'created cardinal on (\d{1,2} [A-Za-z]+ \d{4})', text)
-            if cardinal_match:
-                info['cardinal_creation_date'] = cardinal_match.group(1)
+        # Extract birth, ordination and creation facts in one pass over the paragraphs
+        info.update(bio_extraction.extract_page_facts(bio_text))
     
     return info
 
@@ -113,17 +91,18 @@ def get_all_cardinals():
     if not content:
         return []
     
-    soup = BeautifulSoup(content, 'html.parser')
+    with metrics.timer('parse', 'vatican'):
+        soup = html_parser.parse(content)
+        links = soup.select('a[href]')
     cardinals = []
     
     # Find all links to cardinal biographies
-    links = soup.find_all('a', href=True)
     for link in links:
-        if 'card_bio' in link['href']:
-            full_url = f"https://press.vatican.va{link['href']}"
-            cardinal_name = link.get_text(strip=True)
+        if 'card_bio' in link.attr('href'):
+            full_url = f"https://press.vatican.va{link.attr('href')}"
+            cardinal_name = link.text(strip=True)
             
-            logger.info(f"Processing cardinal: {cardinal_name}")
+            fetch_logger.info(f"Processing cardinal: {cardinal_name}")
             
             # Get detailed information
             cardinal_info = extract_cardinal_info(full_url)
@@ -131,9 +110,6 @@ def get_all_cardinals():
                 cardinal_info['name'] = cardinal_name
                 cardinal_info['biography_url'] = full_url
                 cardinals.append(cardinal_info)
-            
-            # Add delay to avoid overwhelming the server
-            time.sleep(1)
     
     return cardinals
 
@@ -151,11 +127,18 @@ def main():
     
     # Save raw data
     raw_data_file = f'data/raw/cardinals_raw_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-    with open(raw_data_file, 'w', encoding='utf-8') as f:
+    with metrics.timer('serialize'), open(raw_data_file, 'w', encoding='utf-8') as f:
         json.dump(cardinals, f, ensure_ascii=False, indent=2)
     
+    http_client.save_cache()
+    
     logger.info(f"Found {len(cardinals)} cardinals")
     logger.info(f"Raw data saved to {raw_data_file}")
+    
+    # Write the run report
+    metrics_file = metrics.default_report_file('getdata')
+    metrics.write_report(metrics_file, {'script': 'getdata', 'cardinals': len(cardinals), 'output_file': raw_data_file})
+    logger.info(f"Run metrics saved to {metrics_file}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
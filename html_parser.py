@@ -0,0 +1,131 @@
+import os
+import logging
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+logger = logging.getLogger(__name__)
+
+# Backends in order of preference; 'auto' picks the first one that is installed
+BACKENDS = ['selectolax', 'bs4']
+
+# Backend used when parse() isn't given one; worker processes inherit it through the environment
+BACKEND_ENV = 'VIBEPOPE_HTML_PARSER'
+
+def available_backends():
+    """Backends that can be used in this environment"""
+    return [backend for backend in BACKENDS if backend != 'selectolax' or LexborHTMLParser is not None]
+
+def resolve_backend(name=None):
+    """
+    Name of the backend to use for name ('auto' or None: selectolax when
+    installed, else bs4)
+    """
+    name = name or os.environ.get(BACKEND_ENV) or 'auto'
+    if name == 'auto':
+        return available_backends()[0]
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown HTML parser backend {name!r} (choose from auto, {', '.join(BACKENDS)})")
+    if name not in available_backends():
+        raise RuntimeError(f"HTML parser backend {name} is not installed (pip install {name})")
+    return name
+
+def set_backend(name):
+    """Use this backend for every later parse() in this process and its workers"""
+    os.environ[BACKEND_ENV] = resolve_backend(name)
+
+def add_backend_argument(parser):
+    """--html-parser option shared by the scripts; apply it with set_backend"""
+    parser.add_argument('--html-parser', choices=['auto'] + BACKENDS, default='auto',
+                        help="HTML parser backend (default: auto, selectolax when installed, else bs4)")
+
+class SelectolaxNode:
+    """Element of a selectolax (lexbor) tree"""
+
+    __slots__ = ('node',)
+
+    def __init__(self, node):
+        self.node = node
+
+    @property
+    def tag(self):
+        return self.node.tag
+
+    def select(self, css):
+        return [SelectolaxNode(node) for node in self.node.css(css)]
+
+    def select_one(self, css):
+        node = self.node.css_first(css)
+        return SelectolaxNode(node) if node is not None else None
+
+    def text(self, strip=False):
+        if strip:
+            return self.node.text(deep=True, separator='', strip=True)
+        return self.node.text(deep=True)
+
+    def attr(self, name):
+        return self.node.attributes.get(name)
+
+    def closest(self, tag):
+        node = self.node.parent
+        while node is not None and node.tag != tag:
+            node = node.parent
+        return SelectolaxNode(node) if node is not None else None
+
+class SoupNode:
+    """Element of a BeautifulSoup (html.parser) tree"""
+
+    __slots__ = ('node',)
+
+    def __init__(self, node):
+        self.node = node
+
+    @property
+    def tag(self):
+        return self.node.name
+
+    def select(self, css):
+        return [SoupNode(node) for node in self.node.select(css)]
+
+    def select_one(self, css):
+        node = self.node.select_one(css)
+        return SoupNode(node) if node is not None else None
+
+    def text(self, strip=False):
+        if strip:
+            return self.node.get_text(strip=True)
+        return self.node.get_text()
+
+    def attr(self, name):
+        value = self.node.get(name)
+        # BeautifulSoup splits multi-valued attributes such as class
+        return ' '.join(value) if isinstance(value, list) else value
+
+    def closest(self, tag):
+        node = self.node.find_parent(tag)
+        return SoupNode(node) if node is not None else None
+
+def parse(html, backend=None):
+    """
+    Parse an HTML document
+
+    Both backends offer the same small interface: select/select_one with CSS
+    selectors, text(strip) with BeautifulSoup's get_text semantics, attr and
+    closest. selectolax (lexbor, C) is used when installed; BeautifulSoup
+    with html.parser is the fallback and the reference the other backend is
+    checked against (python -m benchmarks.parser_equivalence).
+
+    Args:
+        html (str or bytes): The document
+        backend (str): 'selectolax', 'bs4' or 'auto' (default: set_backend's
+            choice, else auto)
+
+    Returns:
+        SelectolaxNode or SoupNode: The document root
+    """
+    if resolve_backend(backend) == 'selectolax':
+        return SelectolaxNode(LexborHTMLParser(html).root)
+    from bs4 import BeautifulSoup
+    return SoupNode(BeautifulSoup(html, 'html.parser'))
@@ -0,0 +1,320 @@
+import codecs
+import os
+import threading
+import time
+import logging
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from response_cache import ResponseCache
+from rate_control import RateController, CircuitOpenError, backoff_delay, parse_retry_after
+import metrics
+import log_setup
+
+logger = logging.getLogger(__name__)
+
+# Retries are per-item messages of the fetch stage
+fetch_logger = log_setup.stage_logger('fetch')
+
+# Default timeout (seconds) applied to every request that doesn't set one
+DEFAULT_TIMEOUT = 15
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+# Size of the keep-alive connection pool kept for each host
+POOL_SIZE = 16
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Return the shared requests session, creating it on first use"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update({"User-Agent": USER_AGENT})
+                _session = session
+    return _session
+
+page_cache = ResponseCache()
+
+# Paces the requests that go to the network, per host
+rate_controller = RateController()
+
+# Characters (bytes on the wire) handed out per chunk by stream_text
+STREAM_CHUNK_SIZE = 16 * 1024
+
+# Statuses get_text retries after a backoff
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# When set, every cached request is answered from the cache and nothing goes to the network
+_offline = False
+
+# When cleared, the response cache is neither read nor written
+_cache_enabled = True
+
+# Base URL of a local replay server that receives every request instead of the real host
+_replay_url = os.environ.get('VIBEPOPE_REPLAY_URL')
+
+# Header telling the replay server which host a request was meant for
+REPLAY_HOST_HEADER = 'X-Replay-Host'
+
+class OfflineCacheMiss(requests.exceptions.ConnectionError):
+    """Raised in offline mode when a URL is not in the response cache"""
+
+def set_offline(offline=True):
+    """Serve cached requests only from the on-disk cache"""
+    global _offline
+    _offline = offline
+
+def is_offline():
+    return _offline
+
+def set_cache_enabled(enabled=True):
+    """Turn the on-disk response cache on or off"""
+    global _cache_enabled
+    _cache_enabled = enabled
+
+def set_replay_server(base_url):
+    """
+    Send every request to a local replay server (or stop doing so with None)
+
+    The scheme and host of each URL are replaced by base_url; the original
+    host goes along in the X-Replay-Host header.
+    """
+    global _replay_url
+    _replay_url = base_url.rstrip('/') if base_url else None
+
+def _route(url, headers):
+    """Rewrite a request for the replay server when one is configured"""
+    if not _replay_url:
+        return url
+    parts = urlsplit(url)
+    headers[REPLAY_HOST_HEADER] = parts.netloc
+    path = parts.path or '/'
+    return f"{_replay_url}{path}?{parts.query}" if parts.query else f"{_replay_url}{path}"
+
+def configure_cache(ttls=None, max_bytes=None):
+    """Override per-host TTLs (seconds) and the cache size cap (bytes)"""
+    if ttls:
+        page_cache.ttls.update(ttls)
+    if max_bytes is not None:
+        page_cache.max_bytes = max_bytes
+
+def configure_rate_control(rate=None, min_rate=None, max_rate=None):
+    """Set the starting rate and the bounds (requests per second) of the per-host pacing"""
+    rate_controller.configure(rate, min_rate, max_rate)
+
+def _response_from_cache(url, body, entry):
+    """Build a 200 response from a cached body"""
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response.encoding = 'utf-8'
+    response._content = body.encode('utf-8')
+    content_type = entry.get('headers', {}).get('content_type')
+    if content_type:
+        response.headers['Content-Type'] = content_type
+    response.from_cache = True
+    return response
+
+def get(url, headers=None, timeout=None, cache=False, cache_file=None):
+    """
+    Fetch a URL through the shared keep-alive session
+
+    Args:
+        url (str): URL to fetch
+        headers (dict): Extra request headers
+        timeout (float): Timeout in seconds, defaults to DEFAULT_TIMEOUT
+        cache (bool): Use the on-disk response cache: fresh entries are served
+            without a request, stale ones are revalidated with
+            If-None-Match/If-Modified-Since and served again on a 304
+        cache_file (str): Archive file the cached body is stored in
+
+    Every call is counted in the requests_total metric of its source and
+    network round trips are timed as the fetch stage. Requests that go to
+    the network are paced by rate_controller, which adapts to each response.
+
+    Raises:
+        CircuitOpenError: The host has failed repeatedly and is not being asked
+
+    Returns:
+        requests.Response: The response; cached bodies come back as a 200
+    """
+    source = metrics.source_for_url(url)
+    entry = None
+    if timeout is None:
+        timeout = DEFAULT_TIMEOUT
+    cache = cache and _cache_enabled
+    if cache or _offline:
+        entry = page_cache.lookup(url, cache_file)
+
+    if _offline:
+        if not entry:
+            metrics.increment('requests_total', source, 'offline_miss')
+            raise OfflineCacheMiss(f"{url} is not in the response cache")
+        metrics.increment('requests_total', source, 'offline')
+        return _response_from_cache(url, page_cache.read(url, entry), entry)
+
+    request_headers = dict(headers or {})
+    if entry:
+        if page_cache.is_fresh(url, entry):
+            metrics.increment('requests_total', source, 'cache')
+            return _response_from_cache(url, page_cache.read(url, entry), entry)
+        validators = entry.get('headers', {})
+        if validators.get('etag'):
+            request_headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            request_headers['If-Modified-Since'] = validators['last_modified']
+
+    host = urlsplit(url).netloc
+    rate_controller.acquire(host, source)
+    started = time.perf_counter()
+    try:
+        response = get_session().get(_route(url, request_headers), headers=request_headers, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        elapsed = time.perf_counter() - started
+        rate_controller.record(host, None, elapsed)
+        metrics.observe('fetch', source, elapsed)
+        metrics.increment('requests_total', source, type(e).__name__)
+        raise
+    elapsed = time.perf_counter() - started
+    rate_controller.record(host, response.status_code, elapsed, parse_retry_after(response.headers.get('Retry-After')))
+    metrics.observe('fetch', source, elapsed)
+    metrics.increment('requests_total', source, str(response.status_code))
+    metrics.increment('response_bytes_total', source, amount=len(response.content))
+
+    if response.status_code == 304 and entry:
+        logger.info(f"Not modified: {url}")
+        page_cache.revalidated(url, entry)
+        return _response_from_cache(url, page_cache.read(url, entry), entry)
+
+    response.from_cache = False
+    if cache and response.status_code == 200:
+        page_cache.store(url, response.text, response.headers, cache_file)
+    return response
+
+def get_text(url, headers=None, timeout=None, cache=True, cache_file=None, retries=1, backoff=1.0):
+    """
+    Fetch a URL and return its text, raising for HTTP errors
+
+    Connection errors, timeouts and 429/5xx responses are retried up to
+    retries times in all, after an exponential backoff with jitter starting
+    at backoff seconds; a Retry-After header additionally holds back every
+    request to the host through rate_controller. Offline cache misses and
+    open circuits are raised straight away.
+    """
+    source = metrics.source_for_url(url)
+    for attempt in range(retries):
+        last_attempt = attempt == retries - 1
+        try:
+            response = get(url, headers=headers, timeout=timeout, cache=cache, cache_file=cache_file)
+        except (OfflineCacheMiss, CircuitOpenError):
+            raise
+        except requests.exceptions.RequestException as e:
+            if last_attempt:
+                raise
+            fetch_logger.warning(f"Error fetching {url} (attempt {attempt + 1}/{retries}): {str(e)}")
+        else:
+            if last_attempt or response.status_code not in RETRY_STATUSES:
+                response.raise_for_status()
+                return response.text
+            fetch_logger.warning(f"Got {response.status_code} for {url} (attempt {attempt + 1}/{retries})")
+        metrics.increment('retries_total', source)
+        metrics.sleep(backoff_delay(attempt, backoff), source)
+
+def stream_text(url, headers=None, timeout=None, cache=True, cache_file=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Fetch a URL and yield its text in pieces as it arrives
+
+    Goes through the response cache, the offline mode and the rate
+    controller like get(); cached bodies are read from disk in pieces and a
+    fetched body is written to the cache while it streams through. HTTP
+    errors are raised before the first piece. There are no retries, since
+    part of the body may already have been consumed.
+
+    Yields:
+        str: Decoded pieces of the body
+    """
+    source = metrics.source_for_url(url)
+    entry = None
+    if timeout is None:
+        timeout = DEFAULT_TIMEOUT
+    cache = cache and _cache_enabled
+    if cache or _offline:
+        entry = page_cache.lookup(url, cache_file)
+
+    if _offline:
+        if not entry:
+            metrics.increment('requests_total', source, 'offline_miss')
+            raise OfflineCacheMiss(f"{url} is not in the response cache")
+        metrics.increment('requests_total', source, 'offline')
+        yield from page_cache.read_chunks(url, entry, chunk_size)
+        return
+
+    request_headers = dict(headers or {})
+    if entry:
+        if page_cache.is_fresh(url, entry):
+            metrics.increment('requests_total', source, 'cache')
+            yield from page_cache.read_chunks(url, entry, chunk_size)
+            return
+        validators = entry.get('headers', {})
+        if validators.get('etag'):
+            request_headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            request_headers['If-Modified-Since'] = validators['last_modified']
+
+    host = urlsplit(url).netloc
+    rate_controller.acquire(host, source)
+    started = time.perf_counter()
+    try:
+        response = get_session().get(_route(url, request_headers), headers=request_headers, timeout=timeout, stream=True)
+    except requests.exceptions.RequestException as e:
+        elapsed = time.perf_counter() - started
+        rate_controller.record(host, None, elapsed)
+        metrics.observe('fetch', source, elapsed)
+        metrics.increment('requests_total', source, type(e).__name__)
+        raise
+    # Latency up to the response headers; the body is timed by whoever consumes it
+    elapsed = time.perf_counter() - started
+    rate_controller.record(host, response.status_code, elapsed, parse_retry_after(response.headers.get('Retry-After')))
+    metrics.observe('fetch', source, elapsed)
+    metrics.increment('requests_total', source, str(response.status_code))
+
+    with response:
+        if response.status_code == 304 and entry:
+            logger.info(f"Not modified: {url}")
+            page_cache.revalidated(url, entry)
+            yield from page_cache.read_chunks(url, entry, chunk_size)
+            return
+        response.raise_for_status()
+
+        received = 0
+        def decoded():
+            nonlocal received
+            decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+            for raw in response.iter_content(chunk_size):
+                received += len(raw)
+                text = decoder.decode(raw)
+                if text:
+                    yield text
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                yield tail
+
+        chunks = decoded()
+        if cache and response.status_code == 200:
+            chunks = page_cache.store_stream(url, chunks, response.headers, cache_file)
+        try:
+            yield from chunks
+        finally:
+            metrics.increment('response_bytes_total', source, amount=received)
+
+def save_cache():
+    """Persist the response cache index"""
+    page_cache.save()
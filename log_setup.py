@@ -0,0 +1,160 @@
+import argparse
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Stages with their own logger (vibepope.<stage>) for per-item messages
+STAGES = ['fetch', 'parse', 'enrich']
+
+_listener = None
+_queue_handler = None
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def stage_logger(stage):
+    """Logger for the per-item messages of one pipeline stage"""
+    return logging.getLogger(f'vibepope.{stage}')
+
+class LocalQueueHandler(QueueHandler):
+    """
+    Puts records on the queue as they are.
+
+    The stock QueueHandler formats each record on the calling thread so it
+    can be pickled; the queue here never leaves the process, so all of the
+    formatting is left to the listener thread.
+    """
+
+    def prepare(self, record):
+        return record
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets at most `rate` records below WARNING per second through (token
+    bucket with a burst of `burst`); the next record that passes mentions how
+    many were dropped. Warnings and errors always pass.
+    """
+
+    def __init__(self, rate, burst=None):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.tokens = float(self.burst)
+        self.last = time.monotonic()
+        self.suppressed = 0
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            if self.tokens < 1:
+                self.suppressed += 1
+                return False
+            self.tokens -= 1
+            suppressed, self.suppressed = self.suppressed, 0
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar messages suppressed)"
+            record.args = None
+        return True
+
+class SampleFilter(logging.Filter):
+    """Lets one in every `every` records below WARNING through"""
+
+    def __init__(self, every):
+        super().__init__()
+        self.every = every
+        self.seen = 0
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        with self.lock:
+            self.seen += 1
+            return (self.seen - 1) % self.every == 0
+
+def parse_stage_level(value):
+    """argparse type for STAGE=LEVEL, e.g. parse=WARNING"""
+    stage, _, level = value.partition('=')
+    if stage not in STAGES + ['main'] or not isinstance(logging.getLevelName(level.upper()), int):
+        raise argparse.ArgumentTypeError(f"expected STAGE=LEVEL with STAGE one of {', '.join(STAGES + ['main'])}")
+    return stage, level.upper()
+
+def add_logging_arguments(parser):
+    """Logging options shared by the scripts"""
+    parser.add_argument('--log-level', type=parse_stage_level, action='append', default=[], metavar='STAGE=LEVEL',
+                        help=f"Verbosity of one stage ({', '.join(STAGES)}) or of main, e.g. parse=WARNING (repeatable)")
+    parser.add_argument('--log-rate', type=float, default=None,
+                        help="At most this many per-item info messages per second and stage")
+    parser.add_argument('--log-sample', type=int, default=None,
+                        help="Only log one in N per-item info messages of each stage")
+
+def setup_logging(script, logger_name, stage_levels=None, rate_limit=None, sample_every=None):
+    """
+    Log to logs/<script>_<timestamp>.log and the console through a queue
+
+    Records are queued by the threads that log them and written by a single
+    listener thread, so crawler workers never wait on the file or terminal.
+
+    Args:
+        script (str): Prefix of the log file name
+        logger_name (str): Name of the logger to return (the script's own)
+        stage_levels (list): (stage, level) pairs; 'main' sets the script's logger
+        rate_limit (float): Per-stage cap on info messages per second
+        sample_every (int): Keep one in N info messages per stage
+
+    Returns:
+        logging.Logger: The script's logger
+    """
+    global _listener, _queue_handler
+    if not os.path.exists('logs'):
+        os.makedirs('logs')
+
+    log_file = f'logs/{script}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log'
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.FileHandler(log_file), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    if _listener is None:
+        atexit.register(_stop_listener)
+    else:
+        _stop_listener()
+        root.removeHandler(_queue_handler)
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    _queue_handler = LocalQueueHandler(log_queue)
+    root.addHandler(_queue_handler)
+    root.setLevel(logging.INFO)
+
+    levels = dict(stage_levels or [])
+    for stage in STAGES:
+        logger = stage_logger(stage)
+        logger.setLevel(levels.get(stage, logging.NOTSET))
+        for existing in list(logger.filters):
+            logger.removeFilter(existing)
+        if sample_every and sample_every > 1:
+            logger.addFilter(SampleFilter(sample_every))
+        if rate_limit:
+            logger.addFilter(RateLimitFilter(rate_limit))
+
+    logger = logging.getLogger(logger_name)
+    if 'main' in levels:
+        logger.setLevel(levels['main'])
+    return logger
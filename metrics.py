@@ -0,0 +1,215 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlsplit, parse_qs
+
+# Pipeline stages the scripts report on
+STAGES = ['fetch', 'parse', 'enrich', 'thumbnail', 'serialize', 'sleep']
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float('inf')]
+
+# Label used for work that isn't tied to one source
+ALL_SOURCES = 'all'
+
+def source_for_url(url):
+    """
+    Name the source a URL belongs to: vatican, wikipedia_search,
+    wikipedia_api, wikipedia_page, google_news, google, or the host itself
+    """
+    parts = urlsplit(url)
+    host = parts.netloc
+    if host == 'press.vatican.va':
+        return 'vatican'
+    if host == 'en.wikipedia.org':
+        if parts.path == '/w/api.php':
+            action = parse_qs(parts.query).get('action', [''])[0]
+            return 'wikipedia_search' if action == 'opensearch' else 'wikipedia_api'
+        return 'wikipedia_page'
+    if host == 'www.google.com':
+        return 'google_news' if parse_qs(parts.query).get('tbm') == ['nws'] else 'google'
+    return host
+
+class Histogram:
+    """Latency histogram with fixed buckets, plus count, sum and max"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, fraction):
+        """Upper bound of the bucket holding the given quantile (max for the last bucket)"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total_seconds': round(self.sum, 6),
+            'mean_seconds': round(self.sum / self.count, 6) if self.count else 0.0,
+            'p50_seconds': self.quantile(0.50),
+            'p95_seconds': self.quantile(0.95),
+            'p99_seconds': self.quantile(0.99),
+            'max_seconds': round(self.max, 6),
+            'buckets': {('+Inf' if bound == float('inf') else str(bound)): count
+                        for bound, count in zip(self.buckets, self.counts)}
+        }
+
+class MetricsRegistry:
+    """
+    Per-stage latency histograms and counters, labelled by source.
+
+    Thread-safe; one registry is shared by everything in the process (see the
+    module-level helpers below).
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def observe(self, stage, source, seconds):
+        with self.lock:
+            key = (stage, source or ALL_SOURCES)
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(seconds)
+
+    def increment(self, name, source=None, outcome=None, amount=1):
+        with self.lock:
+            key = (name, source or ALL_SOURCES, outcome)
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def report(self, extra=None):
+        """
+        Returns:
+            dict: Run times, stages -> source -> histogram summary, counters
+                -> source -> outcome -> value, and any extra fields
+        """
+        with self.lock:
+            stages = {}
+            for (stage, source), histogram in sorted(self.histograms.items()):
+                stages.setdefault(stage, {})[source] = histogram.to_dict()
+            counters = {}
+            for (name, source, outcome), value in sorted(self.counters.items(), key=lambda item: str(item[0])):
+                counters.setdefault(name, {}).setdefault(source, {})[outcome or 'total'] = value
+        report = {
+            'started_at': self.started_at.isoformat(),
+            'finished_at': datetime.now().isoformat(),
+            'wall_seconds': round(time.perf_counter() - self.started, 6),
+            'stage_totals': {stage: round(sum(h['total_seconds'] for h in sources.values()), 6)
+                             for stage, sources in stages.items()},
+            'stages': stages,
+            'counters': counters
+        }
+        if extra:
+            report.update(extra)
+        return report
+
+    def prometheus_text(self, prefix='vibepope'):
+        """Render the registry in the Prometheus text exposition format"""
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent per pipeline stage and source",
+            f"# TYPE {prefix}_stage_seconds histogram"
+        ]
+        with self.lock:
+            for (stage, source), histogram in sorted(self.histograms.items()):
+                labels = f'stage="{stage}",source="{source}"'
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{prefix}_stage_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_seconds_sum{{{labels}}} {histogram.sum}')
+                lines.append(f'{prefix}_stage_seconds_count{{{labels}}} {histogram.count}')
+            names = sorted({name for name, _, _ in self.counters})
+            for name in names:
+                lines.append(f"# TYPE {prefix}_{name} counter")
+                for (counter, source, outcome), value in sorted(self.counters.items(), key=lambda item: str(item[0])):
+                    if counter != name:
+                        continue
+                    labels = f'source="{source}"' + (f',outcome="{outcome}"' if outcome else '')
+                    lines.append(f'{prefix}_{name}{{{labels}}} {value}')
+        return '\n'.join(lines) + '\n'
+
+registry = MetricsRegistry()
+
+def observe(stage, source, seconds):
+    """Record one timing of a stage for a source"""
+    registry.observe(stage, source, seconds)
+
+def increment(name, source=None, outcome=None, amount=1):
+    """Add to a counter, e.g. increment('requests_total', 'vatican', '200')"""
+    registry.increment(name, source, outcome, amount)
+
+@contextmanager
+def timer(stage, source=None):
+    """Time the body of a with block as one observation of a stage"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(stage, source, time.perf_counter() - started)
+
+def sleep(seconds, source=None):
+    """time.sleep that is accounted to the sleep stage"""
+    registry.observe('sleep', source, seconds)
+    time.sleep(seconds)
+
+def timed_call(function, *args):
+    """
+    Call function(*args) and time it; for work done in a worker process,
+    whose timings are recorded by the parent
+
+    Returns:
+        tuple: (result, seconds)
+    """
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+def default_report_file(script):
+    """logs/<script>_metrics_<timestamp>.json"""
+    return f'logs/{script}_metrics_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+
+def write_report(path, extra=None):
+    """Write the JSON run report"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(registry.report(extra), f, indent=2)
+
+def write_prometheus(path):
+    """Write the registry as a Prometheus text file (e.g. for the node_exporter textfile collector)"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write(registry.prometheus_text())
+    os.replace(tmp_file, path)
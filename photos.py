@@ -0,0 +1,311 @@
+"""
+Downloads the cardinals' photos and makes thumbnails of them.
+
+Each distinct image is stored once under its content hash, however many
+URLs it was found at:
+
+    data/photos/originals/<sha256>.<ext>
+    data/photos/thumbs/<size>/<sha256>.jpg   longest side at most <size> px
+    data/photos/manifest.json                {"urls": {url: {sha256, ...}},
+                                              "images": {sha256: {path, width,
+                                              height, thumbnails}}}
+
+The dataset gets a `photo` entry next to photo_url (and `wikipedia_photo`
+next to additional_info.wikipedia.wikipedia_image) with the local paths and
+dimensions. A later run only downloads URLs that are not in the manifest
+yet. Thumbnails are made in a process pool as the downloads come in and
+need Pillow; without it the originals are still downloaded and recorded.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from datetime import datetime
+from urllib.parse import urlsplit
+import http_client
+import rate_control
+import metrics
+import log_setup
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+PHOTOS_DIR = 'data/photos'
+
+# Longest side, in pixels, of each thumbnail
+THUMBNAIL_SIZES = [96, 240, 480]
+
+THUMBNAIL_QUALITY = 85
+
+# File extension of an original by Content-Type, for URLs without a usable one
+EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+    'image/svg+xml': '.svg'
+}
+
+fetch_logger = log_setup.stage_logger('fetch')
+
+logger = logging.getLogger(__name__)
+
+def photo_fields(cardinal):
+    """
+    The photo URLs of a cardinal and the record each one's local copy goes in
+
+    Returns:
+        list: (record, field, url) triples
+    """
+    found = []
+    if cardinal.get('photo_url'):
+        found.append((cardinal, 'photo', cardinal['photo_url']))
+    wikipedia = cardinal.get('additional_info', {}).get('wikipedia')
+    if isinstance(wikipedia, dict) and wikipedia.get('wikipedia_image'):
+        found.append((wikipedia, 'wikipedia_photo', wikipedia['wikipedia_image']))
+    return found
+
+def extension_for(url, content_type):
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    if content_type in EXTENSIONS:
+        return EXTENSIONS[content_type]
+    extension = os.path.splitext(urlsplit(url).path)[1].lower()
+    return extension if extension in EXTENSIONS.values() or extension == '.jpeg' else '.img'
+
+def load_manifest(photos_dir=PHOTOS_DIR):
+    path = os.path.join(photos_dir, 'manifest.json')
+    if not os.path.exists(path):
+        return {'urls': {}, 'images': {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_manifest(manifest, photos_dir=PHOTOS_DIR):
+    path = os.path.join(photos_dir, 'manifest.json')
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, path)
+
+def download_photo(url, retries=3, delay=1):
+    """
+    Fetch an image, retrying failures with exponential backoff starting at delay seconds
+
+    Returns:
+        tuple: (body bytes, content type), or (None, None) when it could not be fetched
+    """
+    for attempt in range(retries):
+        try:
+            response = http_client.get(url)
+        except Exception as e:
+            fetch_logger.error(f"Error fetching {url} (attempt {attempt + 1}/{retries}): {str(e)}")
+            if attempt < retries - 1:
+                metrics.sleep(rate_control.backoff_delay(attempt, delay), metrics.source_for_url(url))
+            continue
+        content_type = response.headers.get('Content-Type', '')
+        if response.status_code != 200 or not content_type.startswith('image/'):
+            fetch_logger.error(f"Not an image: {url} ({response.status_code}, {content_type or 'no Content-Type'})")
+            return None, None
+        return response.content, content_type
+    return None, None
+
+def store_original(data, url, content_type, photos_dir=PHOTOS_DIR):
+    """
+    Write an image under its content hash unless an identical one is already there
+
+    Returns:
+        tuple: (sha256, path)
+    """
+    sha256 = hashlib.sha256(data).hexdigest()
+    path = os.path.join(photos_dir, 'originals', f"{sha256}{extension_for(url, content_type)}")
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_file = f"{path}.tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_file, path)
+    return sha256, path
+
+def make_thumbnails(original_path, sha256, sizes, photos_dir=PHOTOS_DIR):
+    """
+    Re-encode an original as a JPEG per size, its longest side at most that
+    size (never enlarged)
+
+    This is a pure function (no logging) so it can run in a worker process.
+
+    Returns:
+        tuple: (image info with width, height and thumbnails, seconds taken)
+    """
+    started = time.perf_counter()
+    thumbnails = {}
+    with Image.open(original_path) as image:
+        width, height = image.size
+        image = image.convert('RGB')
+        for size in sizes:
+            path = os.path.join(photos_dir, 'thumbs', str(size), f"{sha256}.jpg")
+            thumbnail = image.copy()
+            thumbnail.thumbnail((size, size), Image.LANCZOS)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_file = f"{path}.tmp"
+            thumbnail.save(tmp_file, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True, progressive=True)
+            os.replace(tmp_file, path)
+            thumbnails[str(size)] = {'path': path, 'width': thumbnail.width, 'height': thumbnail.height}
+    return {'width': width, 'height': height, 'thumbnails': thumbnails}, time.perf_counter() - started
+
+def needs_thumbnails(image, sizes):
+    thumbnails = image.get('thumbnails', {})
+    return any(str(size) not in thumbnails or not os.path.exists(thumbnails[str(size)]['path']) for size in sizes)
+
+def fetch_photos(cardinals, manifest, workers=4, processes=None, sizes=THUMBNAIL_SIZES, photos_dir=PHOTOS_DIR, refresh=False):
+    """
+    Download every photo that isn't in the manifest yet and make the missing
+    thumbnails, updating the manifest in place
+
+    Thumbnails are submitted to the process pool as each download finishes,
+    and each distinct image is only stored and resized once.
+
+    Returns:
+        dict: Counts of downloaded, reused, failed and thumbnailed images
+    """
+    urls = []
+    for cardinal in cardinals:
+        for _, _, url in photo_fields(cardinal):
+            known = manifest['urls'].get(url)
+            image = manifest['images'].get(known['sha256']) if known else None
+            if refresh or not image or not os.path.exists(image['path']):
+                if url not in urls:
+                    urls.append(url)
+    stats = {'downloaded': 0, 'duplicates': 0, 'failed': 0, 'thumbnailed': 0}
+
+    thumbnail_pool = ProcessPoolExecutor(max_workers=processes) if Image is not None else None
+    thumbnail_jobs = {}
+
+    def submit_thumbnails(sha256):
+        image = manifest['images'][sha256]
+        if thumbnail_pool is None or sha256 in thumbnail_jobs or not needs_thumbnails(image, sizes):
+            return
+        thumbnail_jobs[sha256] = thumbnail_pool.submit(make_thumbnails, image['path'], sha256, sizes, photos_dir)
+
+    try:
+        logger.info(f"Downloading {len(urls)} photos with {workers} workers")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(download_photo, url): url for url in urls}
+            for future in as_completed(futures):
+                url = futures[future]
+                data, content_type = future.result()
+                if data is None:
+                    stats['failed'] += 1
+                    continue
+                sha256, path = store_original(data, url, content_type, photos_dir)
+                if sha256 in manifest['images']:
+                    stats['duplicates'] += 1
+                else:
+                    manifest['images'][sha256] = {'path': path, 'bytes': len(data)}
+                    stats['downloaded'] += 1
+                manifest['urls'][url] = {
+                    'sha256': sha256,
+                    'content_type': content_type,
+                    'downloaded_at': datetime.now().isoformat()
+                }
+                fetch_logger.info(f"Stored {url} as {path}")
+                submit_thumbnails(sha256)
+
+        # Images downloaded by an earlier run may still lack some sizes
+        for sha256 in list(manifest['images']):
+            submit_thumbnails(sha256)
+        for sha256, job in thumbnail_jobs.items():
+            try:
+                info, seconds = job.result()
+            except Exception as e:
+                logger.error(f"Could not make thumbnails of {manifest['images'][sha256]['path']}: {str(e)}")
+                continue
+            metrics.observe('thumbnail', None, seconds)
+            manifest['images'][sha256].update(info)
+            stats['thumbnailed'] += 1
+    finally:
+        if thumbnail_pool is not None:
+            thumbnail_pool.shutdown()
+    return stats
+
+def annotate(cardinals, manifest):
+    """
+    Add the local copy of each photo next to its URL
+
+    Returns:
+        int: Number of photos annotated
+    """
+    annotated = 0
+    for cardinal in cardinals:
+        for record, field, url in photo_fields(cardinal):
+            known = manifest['urls'].get(url)
+            image = manifest['images'].get(known['sha256']) if known else None
+            if not image:
+                record.pop(field, None)
+                continue
+            record[field] = {
+                'sha256': known['sha256'],
+                'path': image['path'],
+                'width': image.get('width'),
+                'height': image.get('height'),
+                'thumbnails': image.get('thumbnails', {})
+            }
+            annotated += 1
+    return annotated
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Download the cardinals' photos and make thumbnails of them")
+    parser.add_argument('input', nargs='?', default='data/backup/cardinals.json',
+                        help="Cardinals JSON file (default: data/backup/cardinals.json)")
+    parser.add_argument('--output', default=None,
+                        help="Where to write the dataset with the local photo paths (default: update the input)")
+    parser.add_argument('--photos-dir', default=PHOTOS_DIR, help=f"Where to store the images (default: {PHOTOS_DIR})")
+    parser.add_argument('--workers', type=int, default=4, help="Concurrent downloads (default: 4)")
+    parser.add_argument('--processes', type=int, default=None,
+                        help="Worker processes making thumbnails (default: one per CPU)")
+    parser.add_argument('--sizes', default=','.join(str(size) for size in THUMBNAIL_SIZES),
+                        help=f"Comma-separated longest sides of the thumbnails (default: {','.join(str(size) for size in THUMBNAIL_SIZES)})")
+    parser.add_argument('--refresh', action='store_true', help="Download every photo again")
+    parser.add_argument('--metrics-file', default=None,
+                        help="Where to write the JSON run report (default: logs/photos_metrics_<timestamp>.json)")
+    log_setup.add_logging_arguments(parser)
+    args = parser.parse_args()
+    try:
+        args.sizes = sorted({int(size) for size in args.sizes.split(',')})
+    except ValueError:
+        parser.error(f"--sizes must be comma-separated integers, not {args.sizes}")
+    return args
+
+def main():
+    args = parse_args()
+    global logger
+    logger = log_setup.setup_logging('photos', __name__, args.log_level, args.log_rate, args.log_sample)
+    if Image is None:
+        logger.warning("Pillow is not installed (pip install Pillow): downloading originals without thumbnails or dimensions")
+    os.makedirs(args.photos_dir, exist_ok=True)
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        cardinals = json.load(f)
+    manifest = load_manifest(args.photos_dir)
+    stats = fetch_photos(cardinals, manifest, args.workers, args.processes, args.sizes, args.photos_dir, args.refresh)
+    save_manifest(manifest, args.photos_dir)
+    annotated = annotate(cardinals, manifest)
+
+    output_file = args.output or args.input
+    tmp_file = f"{output_file}.tmp"
+    with metrics.timer('serialize'), open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(cardinals, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, output_file)
+
+    logger.info(f"Photos: {stats['downloaded']} downloaded, {stats['duplicates']} duplicates, {stats['failed']} failed, "
+                f"{stats['thumbnailed']} thumbnailed; {annotated} photos recorded in {output_file}")
+    metrics_file = args.metrics_file or metrics.default_report_file('photos')
+    metrics.write_report(metrics_file, {'script': 'photos', 'output_file': output_file, **stats})
+    logger.info(f"Run metrics saved to {metrics_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+"""
+Streaming pipeline: listing -> fetch -> parse -> enrich -> sink.
+
+Every stage is a generator over the records of the stage before it, so a
+cardinal is written out as soon as it has been through all of them instead
+of after the whole crawl. Stages with workers run them on threads between
+two bounded queues: when a later stage falls behind, the queues fill up and
+the earlier stages block on them, so no more than a few queues' worth of
+records is in flight however large the dataset.
+
+Records reach the sink in the order they finish, not in listing order.
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import http_client
+import html_parser
+import metrics
+import log_setup
+import cardinal_scraper
+import enhance_cardinals
+import dataset_store
+import search_index
+
+# Records each queue between two stages holds before the stage feeding it blocks
+DEFAULT_QUEUE_SIZE = 16
+
+# Seconds a blocked put/get waits before checking whether the pipeline was stopped
+POLL_INTERVAL = 0.1
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+class _Failure:
+    """Carries an exception of the upstream iterator to the consuming thread"""
+
+    def __init__(self, error):
+        self.error = error
+
+def run_stage(name, function, items, workers=1, queue_size=DEFAULT_QUEUE_SIZE):
+    """
+    Apply function to every item on worker threads, yielding the results as
+    they finish
+
+    A feeder thread moves items from the upstream iterator into a bounded
+    input queue and the workers put their results into a bounded output
+    queue, so the stage never runs more than queue_size items ahead of its
+    consumer. Items for which function raises are logged and dropped, as
+    are None results; an exception of the upstream iterator is re-raised
+    here. Closing the generator stops the workers and closes the upstream
+    iterator.
+
+    Args:
+        name (str): Stage name, used for logs and the pipeline_records counter
+        function (callable): Takes one item and returns the result or None
+        items (iterable): Upstream records
+        workers (int): Number of worker threads
+        queue_size (int): Capacity of the input and output queues
+
+    Yields:
+        The non-None results of function
+    """
+    inbox = queue.Queue(maxsize=queue_size)
+    outbox = queue.Queue(maxsize=queue_size)
+    stopped = threading.Event()
+
+    def put(target, item):
+        while not stopped.is_set():
+            try:
+                target.put(item, timeout=POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(source):
+        while not stopped.is_set():
+            try:
+                return source.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def feed():
+        try:
+            for item in items:
+                if not put(inbox, item):
+                    break
+        except Exception as e:
+            put(outbox, _Failure(e))
+        finally:
+            # The upstream generator is closed on the thread that iterates it
+            if hasattr(items, 'close'):
+                items.close()
+            for _ in range(workers):
+                put(inbox, _DONE)
+
+    def work():
+        while True:
+            item = get(inbox)
+            if item is _DONE:
+                break
+            try:
+                result = function(item)
+            except Exception as e:
+                logger.exception(f"{name}: dropping a record after {type(e).__name__}: {str(e)}")
+                metrics.increment('pipeline_records', name, 'error')
+                continue
+            if result is None:
+                metrics.increment('pipeline_records', name, 'dropped')
+                continue
+            metrics.increment('pipeline_records', name, 'ok')
+            if not put(outbox, result):
+                break
+        put(outbox, _DONE)
+
+    threads = [threading.Thread(target=feed, name=f"{name}-feed", daemon=True)]
+    threads += [threading.Thread(target=work, name=f"{name}-{i}", daemon=True) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    try:
+        finished = 0
+        while finished < workers:
+            result = outbox.get()
+            if result is _DONE:
+                finished += 1
+            elif isinstance(result, _Failure):
+                raise result.error
+            else:
+                yield result
+    finally:
+        stopped.set()
+
+def listing():
+    """Cardinals of the Vatican listing page, one record per row as the page downloads"""
+    yield from cardinal_scraper.stream_cardinals()
+
+def fetch(cardinal):
+    """
+    Returns:
+        tuple: (cardinal, html), html None when the page could not be fetched
+    """
+    bio_url = cardinal.get('biography_url')
+    if not bio_url:
+        return cardinal, None
+    cardinal_scraper.fetch_logger.info(f"Extracting biography from {bio_url}")
+    html_content = cardinal_scraper.get_page_content(bio_url, cache_file=cardinal_scraper.biography_archive_file(bio_url))
+    if not html_content:
+        cardinal_scraper.fetch_logger.error(f"Failed to get content from {bio_url}")
+    return cardinal, html_content
+
+def make_parse(pool=None):
+    """
+    Parse stage function; with a process pool the parsing runs there and the
+    stage's threads only wait for it
+
+    Returns:
+        callable: (cardinal, html) -> cardinal with the biography fields
+    """
+    def parse(page):
+        cardinal, html_content = page
+        if not html_content:
+            return dict(cardinal)
+        if pool is None:
+            with metrics.timer('parse', 'vatican'):
+                bio_info = cardinal_scraper.parse_biography_html(html_content)
+        else:
+            bio_info, seconds = pool.submit(metrics.timed_call, cardinal_scraper.parse_biography_html, html_content).result()
+            metrics.observe('parse', 'vatican', seconds)
+        cardinal_scraper.log_biography(cardinal['biography_url'], bio_info)
+        return {**cardinal, **bio_info}
+    return parse
+
+def make_enrich(sources=None, delay=0):
+    """
+    Enrich stage function
+
+    Args:
+        sources (list): Sources to query (keys of enhance_cardinals.SOURCES; default all)
+        delay (float): Seconds each worker pauses after a cardinal
+
+    Returns:
+        callable: cardinal -> enhanced cardinal
+    """
+    def enrich(cardinal):
+        enhance_cardinals.enrich_logger.info(f"Enhancing data for {cardinal['name']}")
+        enhanced_cardinal = enhance_cardinals.enhance_cardinal_data(cardinal, sources)
+        if delay:
+            metrics.sleep(delay)
+        return enhanced_cardinal
+    return enrich
+
+class JsonSink:
+    """
+    Writes records as they arrive: one JSON document per line for a .jsonl
+    path, otherwise a JSON array written element by element. The file is
+    flushed after every record so it can be followed while the pipeline runs.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lines = path.endswith('.jsonl')
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, 'w', encoding='utf-8')
+        if not self.lines:
+            self.file.write('[')
+        self.count = 0
+        self.first_record_at = None
+
+    def write(self, record):
+        with metrics.timer('serialize'):
+            if self.lines:
+                self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            else:
+                self.file.write((',\n' if self.count else '\n') + json.dumps(record, ensure_ascii=False, indent=2))
+            self.file.flush()
+        if self.first_record_at is None:
+            self.first_record_at = time.perf_counter()
+        self.count += 1
+
+    def close(self):
+        if not self.lines:
+            self.file.write('\n]\n' if self.count else ']\n')
+        self.file.close()
+
+def build_pipeline(fetch_workers=8, parse_workers=2, enrich_workers=4, queue_size=DEFAULT_QUEUE_SIZE,
+                   parse_pool=None, enrich=True, sources=None, enrich_delay=0, limit=None):
+    """
+    Chain the stages into one generator of finished records
+
+    Args:
+        fetch_workers (int): Threads fetching biography pages
+        parse_workers (int): Threads parsing them (or waiting on parse_pool)
+        enrich_workers (int): Cardinals enhanced at the same time
+        queue_size (int): Capacity of each queue between two stages
+        parse_pool (ProcessPoolExecutor): Parse in these processes instead of on the threads
+        enrich (bool): Run the enrich stage
+        sources (list): Sources the enrich stage queries (default all)
+        enrich_delay (float): Seconds each enrich worker pauses after a cardinal
+        limit (int): Only process the first N cardinals of the listing
+
+    Returns:
+        generator: Finished cardinal records
+    """
+    records = listing()
+    if limit:
+        records = (cardinal for _, cardinal in zip(range(limit), records))
+    records = run_stage('fetch', fetch, records, fetch_workers, queue_size)
+    records = run_stage('parse', make_parse(parse_pool), records, parse_workers, queue_size)
+    if enrich:
+        records = run_stage('enrich', make_enrich(sources, enrich_delay), records, enrich_workers, queue_size)
+    return records
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Scrape, parse and enhance the cardinals as one streaming pipeline")
+    parser.add_argument('--output', default=None,
+                        help="Output file; .jsonl for one record per line, otherwise a JSON array "
+                             "(default: data/enhanced/cardinals_pipeline_<timestamp>.jsonl)")
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help=f"Records each queue between two stages holds (default: {DEFAULT_QUEUE_SIZE})")
+    parser.add_argument('--fetch-workers', type=int, default=8,
+                        help="Threads fetching biography pages (default: 8)")
+    parser.add_argument('--parse-workers', type=int, default=2,
+                        help="Threads parsing biography pages (default: 2)")
+    parser.add_argument('--parse-processes', type=int, default=0,
+                        help="Parse in a pool of this many processes instead of on the parse threads")
+    parser.add_argument('--enrich-workers', type=int, default=4,
+                        help="Cardinals enhanced at the same time (default: 4)")
+    parser.add_argument('--enrich-delay', type=float, default=0,
+                        help="Extra seconds each enrich worker pauses after a cardinal, on top of the "
+                             "adaptive per-host pacing (default: 0)")
+    parser.add_argument('--sources', default=None,
+                        help=f"Comma-separated sources to enrich from ({', '.join(enhance_cardinals.SOURCES)}; default all)")
+    parser.add_argument('--skip-enrich', action='store_true',
+                        help="Stop after parsing the biography pages")
+    parser.add_argument('--limit', type=int, default=None,
+                        help="Only process the first N cardinals of the listing")
+    parser.add_argument('--offline', action='store_true',
+                        help="Serve every request from the response cache; never touch the network")
+    parser.add_argument('--metrics-file', default=None,
+                        help="Where to write the JSON run report (default: logs/pipeline_metrics_<timestamp>.json)")
+    parser.add_argument('--prometheus-file', default=None,
+                        help="Also write the run metrics in Prometheus text format to this file")
+    html_parser.add_backend_argument(parser)
+    log_setup.add_logging_arguments(parser)
+    args = parser.parse_args()
+    if args.sources:
+        args.sources = args.sources.split(',')
+        unknown = [source for source in args.sources if source not in enhance_cardinals.SOURCES]
+        if unknown:
+            parser.error(f"unknown sources: {', '.join(unknown)}")
+    return args
+
+def main():
+    args = parse_args()
+    global logger
+    logger = log_setup.setup_logging('pipeline', __name__, args.log_level, args.log_rate, args.log_sample)
+    html_parser.set_backend(args.html_parser)
+    cardinal_scraper.create_directory_structure()
+    if args.offline:
+        logger.info("Offline mode: reading all pages from the response cache")
+        http_client.set_offline()
+
+    output_file = args.output or f'data/enhanced/cardinals_pipeline_{datetime.now().strftime("%Y%m%d_%H%M%S")}.jsonl'
+    logger.info(f"Streaming to {output_file} (queues of {args.queue_size}, workers: fetch {args.fetch_workers}, "
+                f"parse {args.parse_workers}, enrich {0 if args.skip_enrich else args.enrich_workers})")
+
+    started = time.perf_counter()
+    parse_pool = ProcessPoolExecutor(max_workers=args.parse_processes) if args.parse_processes else None
+    sink = JsonSink(output_file)
+    # Records go into the store as they stream out; the snapshot is committed once the run completes
+    snapshot = dataset_store.DatasetStore().snapshot('pipeline')
+    records = build_pipeline(args.fetch_workers, args.parse_workers, args.enrich_workers, args.queue_size,
+                             parse_pool, not args.skip_enrich, args.sources, args.enrich_delay, args.limit)
+    try:
+        for record in records:
+            sink.write(record)
+            snapshot.add(record)
+            if sink.count == 1:
+                logger.info(f"First record written after {sink.first_record_at - started:.2f}s")
+    finally:
+        records.close()
+        sink.close()
+        if parse_pool is not None:
+            parse_pool.shutdown()
+
+    snapshot_ref = snapshot.commit(source=output_file)
+    # The records have streamed on; read them back from the store to bring the search index up to date
+    if sink.count:
+        stats = search_index.build_index(dataset_store.read_dataset(snapshot_ref), dataset=snapshot_ref)
+        logger.info(f"Search index updated: {stats['added']} added, {stats['changed']} changed, "
+                    f"{stats['removed']} removed")
+    http_client.save_cache()
+    enhance_cardinals.search_cache.save()
+    first_record_seconds = round(sink.first_record_at - started, 6) if sink.first_record_at else None
+    logger.info(f"Pipeline complete: {sink.count} records written to {output_file} (snapshot {snapshot_ref}) "
+                f"in {time.perf_counter() - started:.2f}s")
+
+    metrics_file = args.metrics_file or metrics.default_report_file('pipeline')
+    metrics.write_report(metrics_file, {'script': 'pipeline', 'cardinals': sink.count, 'output_file': output_file,
+                                        'snapshot': snapshot_ref,
+                                        'first_record_seconds': first_record_seconds,
+                                        'hosts': http_client.rate_controller.snapshot(),
+                                        'search_cache': enhance_cardinals.search_cache.hit_rates()})
+    logger.info(f"Run metrics saved to {metrics_file}")
+    if args.prometheus_file:
+        metrics.write_prometheus(args.prometheus_file)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import random
+import threading
+import time
+import logging
+from email.utils import parsedate_to_datetime
+import requests
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Requests per second a host starts at and the bounds it is kept within
+DEFAULT_RATE = 1.0
+MIN_RATE = 0.05
+MAX_RATE = 8.0
+
+# Rate used for a host that should not be paced until it pushes back
+UNLIMITED_RATE = 1000.0
+
+# Factor the rate is multiplied by after each healthy response until the
+# host first pushes back, so a healthy host reaches the cap within a few requests
+RATE_RAMP = 2.0
+
+# Requests per second added after each healthy response once the host has
+# pushed back, and the factor the rate is multiplied by when a host
+# throttles us or slows down
+RATE_INCREASE = 0.25
+RATE_DECREASE = 0.5
+
+# A response slower than this multiple of the host's usual latency counts as
+# congestion, unless it still took less than CONGESTION_MIN_LATENCY seconds
+LATENCY_FACTOR = 3.0
+CONGESTION_MIN_LATENCY = 0.5
+
+# Statuses that mean the host wants us to slow down
+THROTTLE_STATUSES = {429, 503}
+
+# Consecutive failures before a host's circuit opens, and how long it stays
+# open at first (doubled every time a probe fails, up to MAX_COOLDOWN)
+FAILURE_THRESHOLD = 5
+COOLDOWN = 30.0
+MAX_COOLDOWN = 600.0
+
+# Exponential backoff between retries: BACKOFF_BASE * 2**attempt, capped, with full jitter
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request to a host whose circuit is open"""
+
+def parse_retry_after(value):
+    """
+    Seconds to wait from a Retry-After header (delta-seconds or HTTP date)
+
+    Returns:
+        float: Seconds, or None when the header is missing or malformed
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """Exponential backoff with full jitter for the given retry attempt (0-based)"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+class HostState:
+    """Pacing and circuit breaker state of one host"""
+
+    def __init__(self, rate, source):
+        self.rate = rate
+        self.source = source
+        self.next_start = 0.0
+        self.latency = None
+        self.ramping = True
+        self.failures = 0
+        self.open_until = None
+        self.cooldown = COOLDOWN
+        self.probing = False
+
+class RateController:
+    """
+    Adaptive per-host request pacing.
+
+    Requests to a host start at least 1/rate seconds apart. The rate doubles
+    with every healthy response until the host first pushes back and grows
+    additively after that; it is cut multiplicatively on 429/503 or when
+    latency climbs well above its moving average; a
+    Retry-After header holds the host back for as long as it asks.
+    After FAILURE_THRESHOLD consecutive failures the host's circuit opens and
+    requests fail fast with CircuitOpenError until the cooldown has passed,
+    when a single probe request decides whether it closes again.
+
+    Thread-safe; the callers sleep outside the lock.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, min_rate=MIN_RATE, max_rate=MAX_RATE,
+                 failure_threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def configure(self, rate=None, min_rate=None, max_rate=None):
+        """Change the starting rate and the bounds; hosts already seen restart at the new rate"""
+        with self.lock:
+            if rate is not None:
+                self.rate = rate
+            if min_rate is not None:
+                self.min_rate = min_rate
+            if max_rate is not None:
+                self.max_rate = max_rate
+            for state in self.hosts.values():
+                state.rate = min(self.max_rate, max(self.min_rate, self.rate if rate is not None else state.rate))
+
+    def _state(self, host, source):
+        state = self.hosts.get(host)
+        if state is None:
+            state = HostState(min(self.max_rate, max(self.min_rate, self.rate)), source)
+            self.hosts[host] = state
+        return state
+
+    def acquire(self, host, source=None):
+        """
+        Wait until a request to host may start
+
+        Raises:
+            CircuitOpenError: The host's circuit is open
+        """
+        with self.lock:
+            state = self._state(host, source)
+            now = time.monotonic()
+            if state.open_until is not None:
+                if now < state.open_until or state.probing:
+                    metrics.increment('rate_control', source, 'circuit_open')
+                    raise CircuitOpenError(f"Circuit open for {host}, not sending requests")
+                # Cooldown is over: let one probe through
+                state.probing = True
+            wait = state.next_start - now
+            state.next_start = max(now, state.next_start) + 1.0 / state.rate
+        if wait > 0:
+            metrics.sleep(wait, source)
+
+    def record(self, host, status=None, latency=None, retry_after=None):
+        """
+        Adapt a host's rate to the outcome of a request
+
+        Args:
+            host (str): Host the request went to
+            status (int): HTTP status, None when no response arrived
+            latency (float): Seconds the request took
+            retry_after (float): Seconds the host asked us to wait
+        """
+        with self.lock:
+            state = self._state(host, None)
+            now = time.monotonic()
+            if retry_after:
+                state.next_start = max(state.next_start, now + retry_after)
+
+            failed = status is None or status >= 500 or status in THROTTLE_STATUSES
+            if status in THROTTLE_STATUSES or (status is not None and self._congested(state, latency)):
+                state.rate = max(self.min_rate, state.rate * RATE_DECREASE)
+                state.ramping = False
+                metrics.increment('rate_control', state.source, 'backoff')
+                logger.info(f"Slowing down {host} to {state.rate:.2f} req/s ({status})")
+            elif not failed:
+                increased = state.rate * RATE_RAMP if state.ramping else state.rate + RATE_INCREASE
+                state.rate = min(self.max_rate, increased)
+            if latency is not None and not failed:
+                state.latency = latency if state.latency is None else 0.8 * state.latency + 0.2 * latency
+
+            if not failed:
+                if state.open_until is not None:
+                    logger.info(f"Circuit closed for {host}")
+                state.failures = 0
+                state.open_until = None
+                state.probing = False
+                state.cooldown = self.cooldown
+                return
+            state.failures += 1
+            if state.probing:
+                # The probe failed: stay open for twice as long
+                state.cooldown = min(MAX_COOLDOWN, state.cooldown * 2)
+                self._open(host, state, now)
+            elif state.open_until is None and state.failures >= self.failure_threshold:
+                self._open(host, state, now)
+
+    def _congested(self, state, latency):
+        return (latency is not None and state.latency is not None
+                and latency > max(CONGESTION_MIN_LATENCY, LATENCY_FACTOR * state.latency))
+
+    def _open(self, host, state, now):
+        state.open_until = now + state.cooldown
+        state.probing = False
+        metrics.increment('rate_control', state.source, 'circuit_opened')
+        logger.warning(f"Circuit opened for {host} after {state.failures} failures, retrying in {state.cooldown:.0f}s")
+
+    def snapshot(self):
+        """Current rate, failure count and circuit state of every host"""
+        with self.lock:
+            now = time.monotonic()
+            return {
+                host: {
+                    'rate': round(state.rate, 3),
+                    'failures': state.failures,
+                    'circuit': 'closed' if state.open_until is None
+                               else ('open' if now < state.open_until else 'half_open')
+                }
+                for host, state in self.hosts.items()
+            }
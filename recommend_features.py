@@ -0,0 +1,345 @@
+"""
+Recommendation features precomputed from the cardinals dataset.
+
+server.js scores every cardinal for each /api/recommend request by scanning
+its biography text for keywords (calculateMatchScores). The scan only
+depends on the cardinal, so it is done once here: each cardinal becomes a
+row of small integers (birth date, country and region codes, one flag per
+interest, the education and social-justice flags) and a request is scored
+for all cardinals at once with a few array operations.
+
+The keyword tables and point values mirror server.js; match_scores is a
+line-by-line port of calculateMatchScores used to check the vectorized
+scores against it.
+"""
+import argparse
+import json
+import os
+import random
+import re
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+FEATURES_FILE = 'data/processed/recommend_features.json'
+MATRIX_FILE = 'data/processed/recommend_features.npz'
+
+# Keywords of each interest, matched as lowercase substrings (interestKeywords in server.js)
+INTEREST_KEYWORDS = {
+    'Theology': ['theology', 'theological', 'doctrine', 'faith', 'biblical', 'scripture'],
+    'Social Justice': ['justice', 'peace', 'social', 'human rights', 'rights', 'poverty', 'equality'],
+    'Church History': ['history', 'historical', 'tradition', 'council', 'synod'],
+    'Philosophy': ['philosophy', 'philosophical', 'ethics', 'moral'],
+    'Ecumenism': ['ecumenism', 'ecumenical', 'dialogue', 'unity', 'interfaith'],
+    'Missionary Work': ['mission', 'missionary', 'evangelize', 'evangelization'],
+    'Education': ['education', 'teaching', 'academic', 'university', 'school', 'college', 'seminary', 'professor'],
+    'Interfaith Dialogue': ['interfaith', 'interreligious', 'dialogue', 'religious leaders'],
+    'Scripture Studies': ['scripture', 'biblical', 'bible', 'exegesis'],
+    'Liturgy': ['liturgy', 'liturgical', 'worship', 'rite', 'sacrament'],
+    'Music': ['music', 'musical', 'choir', 'sing'],
+    'Art': ['art', 'artistic', 'cultural'],
+    'Architecture': ['architecture', 'building', 'construction'],
+    'Environmental Issues': ['environment', 'environmental', 'ecology', 'climate', 'conservation'],
+    'Youth Ministry': ['youth', 'young', 'adolescent', 'children'],
+    'Media & Communications': ['media', 'communication', 'digital', 'internet', 'press'],
+    'Monastic Life': ['monastic', 'monastery', 'monk', 'contemplative', 'prayer'],
+    'Healthcare': ['health', 'medical', 'hospital', 'care', 'healing', 'sick'],
+    'Technology': ['technology', 'technological', 'innovation', 'digital']
+}
+INTERESTS = list(INTEREST_KEYWORDS)
+
+# Interests that make the education background count (hasEducationMatch)
+EDUCATION_INTERESTS = ['Education', 'Philosophy', 'Theology', 'Scripture Studies']
+EDUCATION_KEYWORDS = [
+    'education', 'university', 'degree', 'doctorate', 'phd', 'licentiate',
+    'academy', 'institute', 'college', 'seminary', 'study', 'studies'
+]
+SOCIAL_JUSTICE_KEYWORDS = [
+    'justice', 'peace', 'rights', 'equality', 'diversity', 'inclusion',
+    'dialogue', 'poor', 'marginalized', 'vulnerable', 'dignity'
+]
+
+# Region of each country as it is spelled in the Vatican listing
+REGIONS = ['Africa', 'Asia', 'Europe', 'Latin America', 'North America', 'Oceania']
+COUNTRY_REGIONS = {
+    'Algeria': 'Africa', 'Burkina Faso': 'Africa', 'Cape Verde': 'Africa', 'Central African Republic': 'Africa',
+    'Democratic Republic of the Congo': 'Africa', 'Ethiopia': 'Africa', 'Ghana': 'Africa', 'Guinea': 'Africa',
+    'Ivory Coast': 'Africa', 'Kenya': 'Africa', 'Madagascar': 'Africa', 'Marocco': 'Africa', 'Nigeria': 'Africa',
+    'Rwanda': 'Africa', 'South Africa': 'Africa', 'Sud Sudan': 'Africa', 'Tanzania': 'Africa',
+    'Cina': 'Asia', 'East Timor': 'Asia', 'Gerusalemme': 'Asia', 'Giappone': 'Asia', 'India': 'Asia',
+    'Indonesia': 'Asia', 'Iran': 'Asia', 'Iraq': 'Asia', 'Korea': 'Asia', 'Malaysia': 'Asia', 'Mongolia': 'Asia',
+    'Myanmar': 'Asia', 'Pakistan': 'Asia', 'Philippines': 'Asia', 'Singapore': 'Asia', 'Sri Lanka': 'Asia',
+    'Thailandia': 'Asia',
+    'Belgium': 'Europe', 'Bosnia and Herzegovina': 'Europe', 'Croatia': 'Europe', 'France': 'Europe',
+    'Germany': 'Europe', 'Hungary': 'Europe', 'Italy': 'Europe', 'Lithuania': 'Europe', 'Luxembourg': 'Europe',
+    'Malta': 'Europe', 'Netherlands': 'Europe', 'Poland': 'Europe', 'Portugal': 'Europe', 'Serbia': 'Europe',
+    'Spain': 'Europe', 'Sweden': 'Europe', 'Switzerland': 'Europe', 'United Kingdom': 'Europe',
+    'Argentina': 'Latin America', 'Brazil': 'Latin America', 'Chile': 'Latin America', 'Colombia': 'Latin America',
+    'Cuba': 'Latin America', 'Ecuador': 'Latin America', 'Guatemala': 'Latin America', 'Haiti': 'Latin America',
+    'Mexico': 'Latin America', 'Nicaragua': 'Latin America', 'Paraguay': 'Latin America', 'Peru': 'Latin America',
+    'Uruguay': 'Latin America',
+    'Canada': 'North America', 'United States of America': 'North America',
+    'Australia': 'Oceania', 'New Zealand': 'Oceania', 'Papua Nuova Guinea': 'Oceania', 'Tonga': 'Oceania'
+}
+
+# Birth date format understood by getCardinalAge
+BIRTH_DATE_PATTERN = re.compile(r'(\d{1,2})[.-](\d{1,2})[.-](\d{4})')
+
+# Matrix columns before the interest flags
+BASE_COLUMNS = ['birth_year', 'birth_month', 'birth_day', 'country', 'region', 'education', 'social_justice']
+COLUMNS = BASE_COLUMNS + [f"interest:{interest}" for interest in INTERESTS]
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError("Recommendation features need numpy (pip install numpy)")
+
+def parse_birth_date(birth_date):
+    """
+    Returns:
+        tuple: (year, month, day), or None when getCardinalAge finds no date
+    """
+    match = BIRTH_DATE_PATTERN.search(birth_date or '')
+    if not match:
+        return None
+    return int(match.group(3)), int(match.group(2)), int(match.group(1))
+
+def age_on(birth, today):
+    """Age in whole years the way getCardinalAge computes it"""
+    year, month, day = birth
+    age = today.year - year
+    if today.month < month or (today.month == month and today.day < day):
+        age -= 1
+    return age
+
+def education_list(cardinal):
+    return ((cardinal.get('additional_info') or {}).get('structured_bio') or {}).get('education') or []
+
+def cardinal_flags(cardinal):
+    """
+    Returns:
+        tuple: (interest flags in INTERESTS order, education flag, social justice flag)
+    """
+    biography = (cardinal.get('biography_text') or '').lower()
+    education = education_list(cardinal)
+    combined = (biography + ' ' + ' '.join(education)).lower()
+    interests = [any(keyword in combined for keyword in INTEREST_KEYWORDS[interest]) for interest in INTERESTS]
+    has_education = any(keyword in biography for keyword in EDUCATION_KEYWORDS) or len(education) > 0
+    social_justice = any(keyword in biography for keyword in SOCIAL_JUSTICE_KEYWORDS)
+    return interests, has_education, social_justice
+
+def build_features(cardinals):
+    """
+    Compute the feature matrix of a dataset
+
+    Returns:
+        dict: matrix (int32 array, one row per cardinal, COLUMNS), countries
+            (code -> name) and names
+    """
+    require_numpy()
+    countries = sorted({cardinal.get('country') for cardinal in cardinals if cardinal.get('country')})
+    country_codes = {country: code for code, country in enumerate(countries)}
+    matrix = np.zeros((len(cardinals), len(COLUMNS)), dtype=np.int32)
+    for row, cardinal in enumerate(cardinals):
+        birth = parse_birth_date(cardinal.get('birth_date'))
+        if birth:
+            matrix[row, 0:3] = birth
+        country = cardinal.get('country')
+        matrix[row, 3] = country_codes.get(country, -1)
+        region = COUNTRY_REGIONS.get(country)
+        matrix[row, 4] = REGIONS.index(region) if region else -1
+        interests, has_education, social_justice = cardinal_flags(cardinal)
+        matrix[row, 5] = has_education
+        matrix[row, 6] = social_justice
+        matrix[row, len(BASE_COLUMNS):] = interests
+    return {
+        'matrix': matrix,
+        'countries': countries,
+        'names': [cardinal.get('name') for cardinal in cardinals]
+    }
+
+def preference_vector(preferences, features):
+    """
+    Encode a /api/recommend request body
+
+    Returns:
+        dict: country code, age, interest weights (0/1 per INTERESTS),
+            education interest and male flag
+    """
+    interests = preferences.get('interests') or []
+    countries = features['countries']
+    country = preferences.get('country')
+    return {
+        'country': countries.index(country) if country in countries else -2,
+        'age': float(preferences.get('age')),
+        'interests': np.array([1 if interest in interests else 0 for interest in INTERESTS], dtype=np.int32),
+        'education_interest': any(interest in EDUCATION_INTERESTS for interest in interests),
+        'male': preferences.get('gender') == 'male'
+    }
+
+def score_all(features, preferences, today=None):
+    """
+    Score every cardinal against a request in one pass over the matrix
+
+    Args:
+        features (dict): Output of build_features or load_features
+        preferences (dict): Request body with gender, age, country and interests
+        today (date): Date ages are computed on (default: today)
+
+    Returns:
+        dict: Arrays country, ageGroup, interests, education, gender and total,
+            one entry per cardinal (the components of calculateMatchScores)
+    """
+    require_numpy()
+    today = today or date.today()
+    matrix = features['matrix']
+    vector = preference_vector(preferences, features)
+
+    country = np.where(matrix[:, 3] == vector['country'], 25, 0)
+
+    year, month, day = matrix[:, 0], matrix[:, 1], matrix[:, 2]
+    before_birthday = (today.month < month) | ((today.month == month) & (today.day < day))
+    age = today.year - year - before_birthday
+    difference = np.abs(vector['age'] - age)
+    age_group = np.select(
+        [difference <= 5, difference <= 10, difference <= 20, difference <= 30],
+        [20, 15, 10, 5], default=0)
+    age_group = np.where(year > 0, age_group, 0)
+
+    flags = matrix[:, len(BASE_COLUMNS):]
+    interests = np.minimum(flags @ vector['interests'] * 10, 35)
+
+    education = matrix[:, 5] * 10 if vector['education_interest'] else np.zeros(len(matrix), dtype=np.int32)
+    gender = np.full(len(matrix), 10) if vector['male'] else matrix[:, 6] * 10
+
+    total = country + age_group + interests + education + gender
+    return {
+        'country': country,
+        'ageGroup': age_group,
+        'interests': interests,
+        'education': education,
+        'gender': gender,
+        'total': total
+    }
+
+def rank(features, preferences, top=3, today=None):
+    """
+    Rows of the best matching cardinals, best first; ties keep dataset order
+    like the stable sort in server.js
+
+    Returns:
+        list: (row, total score) pairs
+    """
+    total = score_all(features, preferences, today)['total']
+    order = np.argsort(-total, kind='stable')[:top]
+    return [(int(row), int(total[row])) for row in order]
+
+def match_scores(preferences, cardinal, today=None):
+    """Plain Python port of calculateMatchScores in server.js, for checking score_all"""
+    today = today or date.today()
+    interests = preferences.get('interests') or []
+    scores = {'country': 0, 'ageGroup': 0, 'interests': 0, 'education': 0, 'gender': 0}
+    if cardinal.get('country') == preferences.get('country'):
+        scores['country'] = 25
+    birth = parse_birth_date(cardinal.get('birth_date'))
+    if birth:
+        difference = abs(float(preferences.get('age')) - age_on(birth, today))
+        for limit, points in ((5, 20), (10, 15), (20, 10), (30, 5)):
+            if difference <= limit:
+                scores['ageGroup'] = points
+                break
+    flags, has_education, social_justice = cardinal_flags(cardinal)
+    matches = sum(1 for interest, flag in zip(INTERESTS, flags) if flag and interest in interests)
+    # Interests the server doesn't know have no keywords and never match
+    if matches:
+        scores['interests'] = min(matches * 10, 35)
+    if any(interest in EDUCATION_INTERESTS for interest in interests) and has_education:
+        scores['education'] = 10
+    if preferences.get('gender') == 'male' or social_justice:
+        scores['gender'] = 10
+    return scores
+
+def save_features(features, json_file=FEATURES_FILE, matrix_file=MATRIX_FILE):
+    """
+    Write the features as JSON for the server (row-major integer rows plus
+    the column, country, region and interest names) and as a NumPy .npz
+    """
+    for path in (json_file, matrix_file):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    export = {
+        'columns': COLUMNS,
+        'countries': features['countries'],
+        'regions': REGIONS,
+        'interests': INTERESTS,
+        'education_interests': EDUCATION_INTERESTS,
+        'names': features['names'],
+        'rows': features['matrix'].tolist()
+    }
+    with open(json_file, 'w', encoding='utf-8') as f:
+        json.dump(export, f, ensure_ascii=False, separators=(',', ':'))
+    np.savez_compressed(matrix_file, matrix=features['matrix'],
+                        countries=np.array(features['countries']), names=np.array(features['names']))
+
+def load_features(matrix_file=MATRIX_FILE):
+    require_numpy()
+    with np.load(matrix_file) as data:
+        return {
+            'matrix': data['matrix'],
+            'countries': [str(country) for country in data['countries']],
+            'names': [str(name) for name in data['names']]
+        }
+
+def check_against_reference(cardinals, features, samples=200, seed=0):
+    """
+    Compare score_all with match_scores on random requests
+
+    Returns:
+        int: Number of (request, cardinal) pairs whose scores differ
+    """
+    generator = random.Random(seed)
+    countries = features['countries'] + ['Nowhere']
+    mismatches = 0
+    for _ in range(samples):
+        preferences = {
+            'gender': generator.choice(['male', 'female', 'other']),
+            'age': generator.randint(15, 95),
+            'country': generator.choice(countries),
+            'interests': generator.sample(INTERESTS, generator.randint(0, 5))
+        }
+        vectorized = score_all(features, preferences)
+        for row, cardinal in enumerate(cardinals):
+            expected = match_scores(preferences, cardinal)
+            if any(int(vectorized[key][row]) != value for key, value in expected.items()):
+                mismatches += 1
+    return mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the recommendation feature matrix of the cardinals dataset")
+    parser.add_argument('input', nargs='?', default='data/backup/cardinals.json',
+                        help="Cardinals JSON file (default: data/backup/cardinals.json)")
+    parser.add_argument('--output', default=FEATURES_FILE, help=f"JSON export for the server (default: {FEATURES_FILE})")
+    parser.add_argument('--matrix', default=MATRIX_FILE, help=f"NumPy export (default: {MATRIX_FILE})")
+    parser.add_argument('--check', action='store_true',
+                        help="Check the vectorized scores against a port of calculateMatchScores")
+    args = parser.parse_args()
+    if np is None:
+        parser.error("numpy is required (pip install numpy)")
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        cardinals = json.load(f)
+    features = build_features(cardinals)
+    save_features(features, args.output, args.matrix)
+    print(f"Wrote {features['matrix'].shape[0]}x{features['matrix'].shape[1]} feature matrix to {args.output} and {args.matrix}")
+
+    if args.check:
+        mismatches = check_against_reference(cardinals, features)
+        if mismatches:
+            raise SystemExit(f"Check failed: {mismatches} scores differ from calculateMatchScores")
+        print("Check passed: vectorized scores match calculateMatchScores")
+
+if __name__ == "__main__":
+    main()
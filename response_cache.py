@@ -0,0 +1,246 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import logging
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Index of cached responses (URL -> file, fetch time, headers, last access)
+INDEX_FILE = 'data/cache/index.json'
+
+# Where responses without an explicit archive file are stored
+PAGES_DIR = 'data/cache/pages'
+
+# How long (seconds) a cached response is served without asking the server again
+DEFAULT_TTLS = {
+    'press.vatican.va': 24 * 3600,
+    'en.wikipedia.org': 7 * 24 * 3600,
+}
+FALLBACK_TTL = 3600
+
+# Total size of cached bodies before least recently used entries are evicted
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+class ResponseCache:
+    """
+    On-disk HTTP response cache keyed by URL.
+
+    Bodies are plain files (the scraper's data/raw archive pages or files under
+    PAGES_DIR); the index records when each one was fetched, its validators and
+    when it was last used so stale entries can be revalidated and the least
+    recently used ones evicted once the cache grows past max_bytes. Only the
+    bodies under pages_dir belong to the cache: archive pages are never
+    deleted and don't count towards max_bytes.
+    """
+
+    def __init__(self, index_file=INDEX_FILE, pages_dir=PAGES_DIR, ttls=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.index_file = index_file
+        self.pages_dir = pages_dir
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.max_bytes = max_bytes
+        self.entries = None
+        self.dirty = False
+        self.lock = threading.RLock()
+
+    def _load(self):
+        if self.entries is not None:
+            return
+        self.entries = {}
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except Exception as e:
+                logger.warning(f"Could not read cache index {self.index_file}: {str(e)}")
+
+    def default_path(self, url):
+        """File used for a URL that has no explicit archive file"""
+        digest = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.pages_dir, f"{digest}.html")
+
+    def owns(self, entry):
+        """Whether an entry's body is a cache file (under pages_dir) rather than an archive page"""
+        pages_dir = os.path.abspath(self.pages_dir)
+        return os.path.commonpath([pages_dir, os.path.abspath(entry['path'])]) == pages_dir
+
+    def ttl_for(self, url):
+        """TTL in seconds for the host serving this URL"""
+        return self.ttls.get(urlparse(url).netloc, FALLBACK_TTL)
+
+    def lookup(self, url, path=None):
+        """
+        Find the cache entry for a URL
+
+        If the index has no entry but an archive file already exists at path
+        (e.g. a data/raw page saved by an earlier run), it is adopted using the
+        file's modification time as its fetch time.
+
+        Returns:
+            dict: The cache entry, or None if the URL is not cached
+        """
+        with self.lock:
+            self._load()
+            entry = self.entries.get(url)
+            if entry and not os.path.exists(entry['path']):
+                del self.entries[url]
+                self.dirty = True
+                entry = None
+            if entry is None and path and os.path.exists(path):
+                stat = os.stat(path)
+                entry = {
+                    'path': path,
+                    'fetched_at': stat.st_mtime,
+                    'last_access': stat.st_mtime,
+                    'size': stat.st_size,
+                    'headers': {}
+                }
+                self.entries[url] = entry
+                self.dirty = True
+            return entry
+
+    def is_fresh(self, url, entry):
+        """Whether an entry is still within its host's TTL"""
+        return time.time() - entry['fetched_at'] < self.ttl_for(url)
+
+    def read(self, url, entry):
+        """Read a cached body and mark the entry as recently used"""
+        with open(entry['path'], 'r', encoding='utf-8') as f:
+            body = f.read()
+        with self.lock:
+            entry['last_access'] = time.time()
+            self.dirty = True
+        return body
+
+    def revalidated(self, url, entry):
+        """Record that the server confirmed a cached entry is unchanged (304)"""
+        with self.lock:
+            entry['fetched_at'] = time.time()
+            self.dirty = True
+
+    def store(self, url, body, headers, path=None):
+        """
+        Write a response body to disk and index it
+
+        Args:
+            url (str): URL the body was fetched from
+            body (str): Response text
+            headers (Mapping): Response headers
+            path (str): Archive file to write; defaults to a file under pages_dir
+        """
+        with self.lock:
+            self._load()
+            previous = self.entries.get(url)
+            if path is None:
+                path = previous['path'] if previous else self.default_path(url)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(body)
+        self._index(url, path, headers)
+
+    def store_stream(self, url, chunks, headers, path=None):
+        """
+        Write a response body to disk as it streams in, passing each chunk on
+
+        The body goes to a .part file that replaces the archive file and is
+        indexed once the stream is complete, so an interrupted stream leaves
+        the previous entry in place.
+
+        Args:
+            url (str): URL the body is fetched from
+            chunks (iterable): Pieces of the response text
+            headers (Mapping): Response headers
+            path (str): Archive file to write; defaults to a file under pages_dir
+
+        Yields:
+            str: The chunks, after each one has been written
+        """
+        with self.lock:
+            self._load()
+            previous = self.entries.get(url)
+            if path is None:
+                path = previous['path'] if previous else self.default_path(url)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        part_file = f"{path}.part"
+        try:
+            with open(part_file, 'w', encoding='utf-8') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+        except BaseException:
+            os.remove(part_file)
+            raise
+        os.replace(part_file, path)
+        self._index(url, path, headers)
+
+    def read_chunks(self, url, entry, chunk_size):
+        """Read a cached body in pieces of chunk_size characters and mark the entry as recently used"""
+        with open(entry['path'], 'r', encoding='utf-8') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        with self.lock:
+            entry['last_access'] = time.time()
+            self.dirty = True
+
+    def _index(self, url, path, headers):
+        """Record a body just written to path as the cache entry of url"""
+        now = time.time()
+        with self.lock:
+            self.entries[url] = {
+                'path': path,
+                'fetched_at': now,
+                'last_access': now,
+                'size': os.path.getsize(path),
+                'headers': {
+                    'etag': headers.get('ETag'),
+                    'last_modified': headers.get('Last-Modified'),
+                    'content_type': headers.get('Content-Type')
+                }
+            }
+            self.dirty = True
+            self.evict()
+        logger.info(f"Cached {url} in {path}")
+
+    def evict(self):
+        """Delete least recently used cache files until they fit in max_bytes"""
+        with self.lock:
+            self._load()
+            owned = [(url, entry) for url, entry in self.entries.items() if self.owns(entry)]
+            total = sum(entry['size'] for _, entry in owned)
+            if total <= self.max_bytes:
+                return
+            for url, entry in sorted(owned, key=lambda item: item[1]['last_access']):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(entry['path'])
+                except OSError:
+                    pass
+                total -= entry['size']
+                del self.entries[url]
+                self.dirty = True
+                logger.info(f"Evicted {url} from cache")
+
+    def save(self):
+        """Persist the index"""
+        with self.lock:
+            if not self.dirty:
+                return
+            os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+            tmp_file = f"{self.index_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False)
+            os.replace(tmp_file, self.index_file)
+            self.dirty = False
+            logger.info(f"Saved cache index with {len(self.entries)} entries to {self.index_file}")
@@ -0,0 +1,169 @@
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+import logging
+from concurrent.futures import Future
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Results of search queries, keyed by source and normalized query
+CACHE_FILE = 'data/cache/searches.json'
+
+# Sources whose lookups are keyed by a URL rather than a free-text query; the
+# URL is used as is, since article titles differing only in case are different pages
+URL_SOURCES = {'wikipedia_page'}
+
+# How long (seconds) a result is reused: news goes stale quickly, articles don't
+DEFAULT_TTLS = {
+    'news': 6 * 3600,
+    'google': 7 * 24 * 3600,
+    'wikipedia': 30 * 24 * 3600,
+    'wikipedia_page': 30 * 24 * 3600,
+}
+FALLBACK_TTL = 24 * 3600
+
+# How long a search that found nothing is remembered before it is tried again
+NEGATIVE_TTLS = {
+    'news': 6 * 3600,
+    'google': 24 * 3600,
+    'wikipedia': 7 * 24 * 3600,
+    'wikipedia_page': 7 * 24 * 3600,
+}
+
+def normalize_query(query):
+    """Case-, Unicode-form- and whitespace-insensitive form of a query"""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFKC', query)).strip().casefold()
+
+def is_negative(result):
+    """Whether a search result is empty (nothing found)"""
+    return not result
+
+class SearchCache:
+    """
+    Persistent cache of search results keyed by (source, normalized query),
+    or by (source, URL) for the URL_SOURCES.
+
+    Empty results are stored too (with their own, usually shorter, TTL) so a
+    query that found nothing isn't sent again on every run. Concurrent
+    lookups of the same query wait for the one request in flight instead of
+    sending their own. Hits and misses are counted per source in the
+    search_cache metric.
+    """
+
+    def __init__(self, cache_file=CACHE_FILE, ttls=None, negative_ttls=None, enabled=True):
+        self.cache_file = cache_file
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.negative_ttls = dict(NEGATIVE_TTLS)
+        if negative_ttls:
+            self.negative_ttls.update(negative_ttls)
+        self.enabled = enabled
+        self.entries = None
+        self.in_flight = {}
+        self.stats = {}
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def _load(self):
+        if self.entries is not None:
+            return
+        self.entries = {}
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except Exception as e:
+                logger.warning(f"Could not read search cache {self.cache_file}: {str(e)}")
+
+    def ttl_for(self, source, result):
+        if is_negative(result):
+            return self.negative_ttls.get(source, FALLBACK_TTL)
+        return self.ttls.get(source, FALLBACK_TTL)
+
+    def _count(self, source, outcome):
+        self.stats.setdefault(source, {}).setdefault(outcome, 0)
+        self.stats[source][outcome] += 1
+        metrics.increment('search_cache', source, outcome)
+
+    def get_or_fetch(self, source, query, fetch):
+        """
+        Return the cached result of a query, or run fetch() and cache it
+
+        Args:
+            source (str): Search source (news, google, wikipedia) or
+                wikipedia_page for articles fetched by URL
+            query (str): Query or URL the result depends on
+            fetch (callable): Runs the search; returns the result (empty for
+                nothing found) or None when it failed and must not be cached.
+                Exceptions propagate and are not cached either.
+        """
+        if not self.enabled:
+            return fetch()
+        key = f"{source}\t{query if source in URL_SOURCES else normalize_query(query)}"
+        with self.lock:
+            self._load()
+            entry = self.entries.get(key)
+            if entry and time.time() - entry['fetched_at'] < self.ttl_for(source, entry['result']):
+                self._count(source, 'negative_hit' if is_negative(entry['result']) else 'hit')
+                return entry['result']
+            future = self.in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self.in_flight[key] = Future()
+                self._count(source, 'miss')
+            else:
+                self._count(source, 'shared')
+        if not owner:
+            return future.result()
+
+        try:
+            result = fetch()
+        except BaseException as e:
+            with self.lock:
+                del self.in_flight[key]
+            future.set_exception(e)
+            raise
+        with self.lock:
+            del self.in_flight[key]
+            if result is not None:
+                self.entries[key] = {'fetched_at': time.time(), 'result': result}
+                self.dirty = True
+        future.set_result(result)
+        return result
+
+    def hit_rates(self):
+        """
+        Returns:
+            dict: source -> lookup counts by outcome and the fraction served
+                without a request
+        """
+        with self.lock:
+            rates = {}
+            for source, counts in sorted(self.stats.items()):
+                lookups = sum(counts.values())
+                served = lookups - counts.get('miss', 0)
+                rates[source] = dict(counts, lookups=lookups, hit_rate=round(served / lookups, 3) if lookups else 0.0)
+            return rates
+
+    def save(self):
+        """Persist the cache, dropping entries that have expired"""
+        with self.lock:
+            if not self.dirty:
+                return
+            now = time.time()
+            self.entries = {
+                key: entry for key, entry in self.entries.items()
+                if now - entry['fetched_at'] < self.ttl_for(key.split('\t', 1)[0], entry['result'])
+            }
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp_file = f"{self.cache_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False)
+            os.replace(tmp_file, self.cache_file)
+            self.dirty = False
+            logger.info(f"Saved search cache with {len(self.entries)} entries to {self.cache_file}")
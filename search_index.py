@@ -0,0 +1,323 @@
+"""
+Inverted token index over the cardinals dataset.
+
+Indexes name, country, appointing_pope and biography_text. Tokens are
+accent-folded and case-folded, so "Bergoglio", "BERGOGLIO" and "bérgoglio"
+are the same term. Terms are kept sorted so a prefix query is a range of
+the term list. Each term's postings are (doc id delta, field mask) pairs
+stored as LEB128 varints, base64-encoded in the JSON file:
+
+    {"version": 2, "fields": [...], "dataset": snapshot reference or file,
+     "docs": [[key, content hash, row], ...], "terms": [...],
+     "postings": [base64 per term]}
+
+The field mask has bit i set when the term occurs in fields[i]; row is the
+record's position in the dataset the index was last built from (dataset),
+and the
+content hash is the sha256 of the record's indexed fields. A rebuild only
+re-tokenizes records whose content hash changed. Version 1 indexes (sha1
+hashes) are discarded and built again from scratch.
+"""
+import argparse
+import base64
+import bisect
+import hashlib
+import json
+import os
+import re
+import unicodedata
+import dataset_store
+from dataset_store import record_key
+
+INDEX_VERSION = 2
+
+INDEX_FILE = 'data/processed/search_index.json'
+
+# Indexed fields; the order defines the bits of the field mask
+FIELDS = ['name', 'country', 'appointing_pope', 'biography_text']
+
+# Score of a match in each field, so a hit on the name outranks a mention in a biography
+FIELD_WEIGHTS = {'name': 8, 'country': 4, 'appointing_pope': 2, 'biography_text': 1}
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+def fold(text):
+    """Lowercase and strip accents: 'Évora' -> 'evora'"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(fold(text))
+
+def encode_varints(numbers):
+    """Unsigned LEB128: 7 bits per byte, high bit set on all but the last byte"""
+    out = bytearray()
+    for number in numbers:
+        while number >= 0x80:
+            out.append((number & 0x7f) | 0x80)
+            number >>= 7
+        out.append(number)
+    return bytes(out)
+
+def decode_varints(data):
+    numbers = []
+    number = 0
+    shift = 0
+    for byte in data:
+        number |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            numbers.append(number)
+            number = 0
+            shift = 0
+    return numbers
+
+def encode_postings(postings):
+    """{doc id: field mask} -> base64 of varint (delta, mask) pairs in doc id order"""
+    numbers = []
+    previous = 0
+    for doc_id in sorted(postings):
+        numbers.append(doc_id - previous)
+        numbers.append(postings[doc_id])
+        previous = doc_id
+    return base64.b64encode(encode_varints(numbers)).decode('ascii')
+
+def decode_postings(encoded):
+    numbers = decode_varints(base64.b64decode(encoded))
+    postings = {}
+    doc_id = 0
+    for i in range(0, len(numbers), 2):
+        doc_id += numbers[i]
+        postings[doc_id] = numbers[i + 1]
+    return postings
+
+def record_hash(cardinal):
+    """Hash of the indexed fields of a record"""
+    content = json.dumps([cardinal.get(field) or '' for field in FIELDS], ensure_ascii=False)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+class SearchIndex:
+    """
+    In-memory form of the index: term -> {doc id: field mask}, plus the
+    doc table (key -> doc id, content hash, row).
+    """
+
+    def __init__(self):
+        self.terms = {}
+        self.docs = {}
+        self.dataset = None
+        self.next_doc_id = 0
+        self.sorted_terms = None
+        self.doc_rows = None
+
+    @classmethod
+    def load(cls, path=INDEX_FILE):
+        index = cls()
+        if not os.path.exists(path):
+            return index
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != INDEX_VERSION or data.get('fields') != FIELDS:
+            # Built by another version; start over
+            return index
+        index.dataset = data.get('dataset')
+        for doc_id, (key, content_hash, row) in enumerate(data['docs']):
+            index.docs[key] = {'id': doc_id, 'hash': content_hash, 'row': row}
+        index.next_doc_id = len(data['docs'])
+        for term, encoded in zip(data['terms'], data['postings']):
+            index.terms[term] = decode_postings(encoded)
+        return index
+
+    def _add(self, doc_id, cardinal):
+        for bit, field in enumerate(FIELDS):
+            value = cardinal.get(field)
+            if not value:
+                continue
+            for token in set(tokenize(value)):
+                postings = self.terms.setdefault(token, {})
+                postings[doc_id] = postings.get(doc_id, 0) | (1 << bit)
+
+    def _remove(self, doc_ids):
+        for term in list(self.terms):
+            postings = self.terms[term]
+            for doc_id in doc_ids:
+                postings.pop(doc_id, None)
+            if not postings:
+                del self.terms[term]
+
+    def update(self, cardinals):
+        """
+        Bring the index up to date with a dataset, re-tokenizing only the
+        records that are new or whose indexed fields changed
+
+        Returns:
+            dict: Counts of added, changed, removed and unchanged records
+        """
+        seen = set()
+        stale = []
+        fresh = []
+        stats = {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 0}
+        for row, cardinal in enumerate(cardinals):
+            key = record_key(cardinal)
+            seen.add(key)
+            content_hash = record_hash(cardinal)
+            doc = self.docs.get(key)
+            if doc and doc['hash'] == content_hash:
+                doc['row'] = row
+                stats['unchanged'] += 1
+                continue
+            if doc:
+                stale.append(doc['id'])
+                stats['changed'] += 1
+            else:
+                stats['added'] += 1
+            fresh.append((key, content_hash, row, cardinal))
+
+        for key in [key for key in self.docs if key not in seen]:
+            stale.append(self.docs.pop(key)['id'])
+            stats['removed'] += 1
+
+        if stale:
+            self._remove(set(stale))
+        for key, content_hash, row, cardinal in fresh:
+            doc = self.docs.get(key)
+            doc_id = doc['id'] if doc else self.next_doc_id
+            if not doc:
+                self.next_doc_id += 1
+            self.docs[key] = {'id': doc_id, 'hash': content_hash, 'row': row}
+            self._add(doc_id, cardinal)
+        self.sorted_terms = None
+        self.doc_rows = None
+        return stats
+
+    def compacted(self):
+        """Copy of the index with doc ids renumbered densely by row"""
+        index = SearchIndex()
+        index.dataset = self.dataset
+        ordered = sorted(self.docs.items(), key=lambda item: item[1]['row'])
+        renumber = {}
+        for new_id, (key, doc) in enumerate(ordered):
+            renumber[doc['id']] = new_id
+            index.docs[key] = {'id': new_id, 'hash': doc['hash'], 'row': doc['row']}
+        index.next_doc_id = len(ordered)
+        for term, postings in self.terms.items():
+            index.terms[term] = {renumber[doc_id]: mask for doc_id, mask in postings.items()}
+        return index
+
+    def save(self, path=INDEX_FILE):
+        """Write the index (compacted, so removed docs leave no gaps)"""
+        index = self.compacted()
+        docs = [None] * index.next_doc_id
+        for key, doc in index.docs.items():
+            docs[doc['id']] = [key, doc['hash'], doc['row']]
+        terms = sorted(index.terms)
+        data = {
+            'version': INDEX_VERSION,
+            'fields': FIELDS,
+            'dataset': index.dataset,
+            'docs': docs,
+            'terms': terms,
+            'postings': [encode_postings(index.terms[term]) for term in terms]
+        }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_file = f"{path}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_file, path)
+
+    def _matching_terms(self, token, prefix):
+        if not prefix:
+            return [token] if token in self.terms else []
+        if self.sorted_terms is None:
+            self.sorted_terms = sorted(self.terms)
+        start = bisect.bisect_left(self.sorted_terms, token)
+        end = bisect.bisect_left(self.sorted_terms, token + '\U0010ffff')
+        return self.sorted_terms[start:end]
+
+    def search(self, query, prefix=True, limit=None):
+        """
+        Find the records containing every token of the query
+
+        Args:
+            query (str): Free text; accents and case are ignored
+            prefix (bool): Let the last token match as a prefix ("berg" finds "bergoglio")
+            limit (int): Maximum number of results
+
+        Returns:
+            list: (row, score) pairs, best first
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        scores = None
+        for i, token in enumerate(tokens):
+            matches = {}
+            for term in self._matching_terms(token, prefix and i == len(tokens) - 1):
+                for doc_id, mask in self.terms[term].items():
+                    weight = sum(FIELD_WEIGHTS[field] for bit, field in enumerate(FIELDS) if mask & (1 << bit))
+                    matches[doc_id] = max(matches.get(doc_id, 0), weight)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {doc_id: score + matches[doc_id] for doc_id, score in scores.items() if doc_id in matches}
+            if not scores:
+                return []
+        if self.doc_rows is None:
+            self.doc_rows = {doc['id']: doc['row'] for doc in self.docs.values()}
+        results = sorted(((self.doc_rows[doc_id], score) for doc_id, score in scores.items()), key=lambda item: (-item[1], item[0]))
+        return results[:limit] if limit else results
+
+def build_index(cardinals, path=INDEX_FILE, full=False, dataset=None):
+    """
+    Update (or with full=True rebuild) the index file for a dataset
+
+    Args:
+        cardinals (list): Records of the dataset, in order
+        dataset (str): Snapshot reference or file the records came from;
+            the rows of query results point into it
+
+    Returns:
+        dict: Counts of added, changed, removed and unchanged records
+    """
+    index = SearchIndex() if full else SearchIndex.load(path)
+    stats = index.update(cardinals)
+    index.dataset = dataset
+    index.save(path)
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the inverted search index of the cardinals dataset")
+    parser.add_argument('--index', default=INDEX_FILE, help=f"Index file (default: {INDEX_FILE})")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help="Bring the index up to date with a dataset")
+    build.add_argument('input', nargs='?', default='data/backup/cardinals.json',
+                       help="Cardinals JSON file (default: data/backup/cardinals.json)")
+    build.add_argument('--full', action='store_true', help="Rebuild from scratch instead of updating")
+    query = subparsers.add_parser('query', help="Search the index")
+    query.add_argument('text', help="Search text")
+    query.add_argument('--input', default=None,
+                       help="Dataset the index was built from, to show names (default: the snapshot "
+                            "or file recorded in the index)")
+    query.add_argument('--limit', type=int, default=10, help="Maximum results (default: 10)")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        with open(args.input, 'r', encoding='utf-8') as f:
+            cardinals = json.load(f)
+        stats = build_index(cardinals, args.index, args.full, dataset=args.input)
+        print(f"Index {args.index}: {stats['added']} added, {stats['changed']} changed, "
+              f"{stats['removed']} removed, {stats['unchanged']} unchanged")
+    else:
+        index = SearchIndex.load(args.index)
+        dataset = args.input or index.dataset
+        cardinals = dataset_store.read_dataset(dataset) if dataset else None
+        if cardinals is None:
+            parser.error(f"dataset {dataset} not found; pass --input")
+        for row, score in index.search(args.text, limit=args.limit):
+            print(f"{score:>4}  {cardinals[row]['name']}")
+
+if __name__ == "__main__":
+    main()
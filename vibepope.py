@@ -0,0 +1,76 @@
+"""
+One entry point for the data scripts.
+
+    python vibepope.py scrape --offline
+    python vibepope.py reparse --parse-workers 4
+    python vibepope.py export --verify
+    python vibepope.py bench startup
+
+Only the module of the chosen subcommand is imported, so commands that
+never fetch or parse HTML (export, index, store, bench startup) start without
+loading requests or BeautifulSoup. Everything after the subcommand goes to
+that script's own argument parser: `python vibepope.py <command> --help`
+lists its options.
+"""
+import importlib
+import sys
+
+# Subcommand -> (module, arguments passed before the user's, description)
+COMMANDS = {
+    'scrape': ('cardinal_scraper', [], "Scrape the Vatican listing and biography pages"),
+    'reparse': ('cardinal_scraper', ['--reparse'], "Re-parse the archived biography pages without network access"),
+    'enrich': ('enhance_cardinals', [], "Add Wikipedia, news and Google results to the dataset"),
+    'pipeline': ('pipeline', [], "Scrape, parse and enrich as one streaming pipeline"),
+    'photos': ('photos', [], "Download the photos and make thumbnails of them"),
+    'export': ('columnar_export', [], "Export the dataset in a columnar layout"),
+    'index': ('search_index', [], "Build or query the search index"),
+    'store': ('dataset_store', [], "List, diff, check out or garbage collect dataset snapshots"),
+    'bench': (None, [], "Run a benchmark: startup, parsers, equivalence or crawl")
+}
+
+BENCHMARKS = {
+    'startup': 'benchmarks.startup',
+    'parsers': 'benchmarks.parsers',
+    'equivalence': 'benchmarks.parser_equivalence',
+    'crawl': 'benchmarks.crawl_harness'
+}
+
+def usage():
+    lines = ["usage: vibepope <command> [options]", "", "commands:"]
+    lines += [f"  {name:10} {description}" for name, (_, _, description) in COMMANDS.items()]
+    lines += ["", "Run `vibepope <command> --help` for the options of a command."]
+    return '\n'.join(lines)
+
+def run(command, argv):
+    """
+    Import the module behind a subcommand and run its main() with argv
+
+    Returns:
+        int: Exit status
+    """
+    module_name, prefix, _ = COMMANDS[command]
+    prog = f"vibepope {command}"
+    if module_name is None:
+        if not argv or argv[0] not in BENCHMARKS:
+            print(f"usage: {prog} {{{','.join(BENCHMARKS)}}} [options]", file=sys.stderr)
+            return 2
+        module_name = BENCHMARKS[argv[0]]
+        prog = f"{prog} {argv[0]}"
+        argv = argv[1:]
+    module = importlib.import_module(module_name)
+    # The scripts parse sys.argv themselves; prog keeps their usage lines right
+    sys.argv = [prog] + prefix + argv
+    return module.main() or 0
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return 0 if argv else 2
+    if argv[0] not in COMMANDS:
+        print(f"vibepope: unknown command {argv[0]!r}\n\n{usage()}", file=sys.stderr)
+        return 2
+    return run(argv[0], argv[1:])
+
+if __name__ == "__main__":
+    sys.exit(main())